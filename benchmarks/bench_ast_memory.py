@@ -0,0 +1,135 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Measure the memory footprint of tracing a program into the HeteroCL AST.
+
+Two designs are traced: a LeNet-style network and a polybench jacobi-2d
+kernel whose time loop is unrolled in Python, which creates many nodes.
+
+Usage: python benchmarks/bench_ast_memory.py [--steps 64]
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+
+import heterocl as hcl
+from heterocl.ast import ast
+
+
+def lenet(batch_size=1):
+    hcl.init(hcl.Float())
+    image = hcl.placeholder((batch_size, 1, 28, 28), "input_image")
+    w_conv1 = hcl.placeholder((20, 1, 5, 5), "weight_conv1")
+    w_conv2 = hcl.placeholder((50, 20, 5, 5), "weight_conv2")
+    w_fc1 = hcl.placeholder((500, 800), "weight_fc1")
+    w_fc2 = hcl.placeholder((10, 500), "weight_fc2")
+
+    def conv2d(data, weight, name):
+        n, c, h, w = data.shape
+        k, _, kh, kw = weight.shape
+        rc = hcl.reduce_axis(0, c, "rc")
+        rh = hcl.reduce_axis(0, kh, "rh")
+        rw = hcl.reduce_axis(0, kw, "rw")
+        return hcl.compute(
+            (n, k, h - kh + 1, w - kw + 1),
+            lambda nn, ff, yy, xx: hcl.sum(
+                data[nn, rc, yy + rh, xx + rw] * weight[ff, rc, rh, rw],
+                axis=[rc, rh, rw],
+            ),
+            name,
+        )
+
+    def max_pool(data, name):
+        n, c, h, w = data.shape
+        rh = hcl.reduce_axis(0, 2, "rh")
+        rw = hcl.reduce_axis(0, 2, "rw")
+        return hcl.compute(
+            (n, c, h // 2, w // 2),
+            lambda i, j, y, x: hcl.max(
+                data[i, j, y * 2 + rh, x * 2 + rw], axis=[rh, rw]
+            ),
+            name,
+        )
+
+    def dense(data, weight, name):
+        k = hcl.reduce_axis(0, weight.shape[1], "k")
+        return hcl.compute(
+            (data.shape[0], weight.shape[0]),
+            lambda i, j: hcl.sum(data[i, k] * weight[j, k], axis=k),
+            name,
+        )
+
+    def kernel(image, w_conv1, w_conv2, w_fc1, w_fc2):
+        conv1 = conv2d(image, w_conv1, "conv1")
+        tanh1 = hcl.compute(conv1.shape, lambda *x: hcl.tanh(conv1[x]), "tanh1")
+        pool1 = max_pool(tanh1, "pool1")
+        conv2 = conv2d(pool1, w_conv2, "conv2")
+        tanh2 = hcl.compute(conv2.shape, lambda *x: hcl.tanh(conv2[x]), "tanh2")
+        pool2 = max_pool(tanh2, "pool2")
+        flat = hcl.compute(
+            (batch_size, 800),
+            lambda i, j: pool2[i, j // 16, j // 4 % 4, j % 4],
+            "flat",
+        )
+        fc1 = dense(flat, w_fc1, "fc1")
+        tanh3 = hcl.compute(fc1.shape, lambda *x: hcl.tanh(fc1[x]), "tanh3")
+        return dense(tanh3, w_fc2, "fc2")
+
+    return hcl.create_schedule([image, w_conv1, w_conv2, w_fc1, w_fc2], kernel)
+
+
+def jacobi_2d(steps, n=32):
+    hcl.init(hcl.Float())
+    A = hcl.placeholder((n, n), "A")
+    B = hcl.placeholder((n, n), "B")
+
+    def kernel(A, B):
+        def update(dst, src):
+            with hcl.for_(1, n - 1, name="i") as i:
+                with hcl.for_(1, n - 1, name="j") as j:
+                    dst[i, j] = 0.2 * (
+                        src[i, j]
+                        + src[i, j - 1]
+                        + src[i, j + 1]
+                        + src[i + 1, j]
+                        + src[i - 1, j]
+                    )
+
+        for _ in range(steps):
+            update(B, A)
+            update(A, B)
+
+    return hcl.create_schedule([A, B], kernel)
+
+
+def count_nodes():
+    return sum(isinstance(obj, (ast.Operation, ast.Expr)) for obj in gc.get_objects())
+
+
+def measure(name, trace):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    schedule = trace()
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    n_nodes = count_nodes()
+    print(
+        f"{name:<12} nodes: {n_nodes:>8}  time: {elapsed:7.3f} s  "
+        f"retained: {current / 2**20:8.2f} MiB  peak: {peak / 2**20:8.2f} MiB"
+    )
+    return schedule
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--steps", type=int, default=64)
+    args = parser.parse_args()
+    measure("lenet", lenet)
+    measure("jacobi-2d", lambda: jacobi_2d(args.steps))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Measure the narrowing of integer arithmetic to the ranges of its values.
+
+The kernel is a FIR filter over 8-bit samples with small constant taps,
+followed by a weighted sum of its outputs and their positions, whose
+intermediate types the type rules widen at every operation. It is built
+and run on the CPU, and generated for Vivado HLS, with and without
+`hcl.init(passes={"minimize_bitwidth": True})`. The bits removed from
+the operations of each stage are reported by the pass, and the widest
+arbitrary precision integer of the HLS code is reported with the bits of
+all the ap_int and ap_uint declarations.
+
+Usage: python benchmarks/bench_bitwidth.py [--size 4096] [--taps 16]
+"""
+
+import argparse
+import re
+import time
+
+import numpy as np
+
+import heterocl as hcl
+from heterocl.passes.pass_manager import PassManager
+from heterocl.passes.bitwidth import MinimizeBitwidth
+
+
+def fir(size, taps):
+    A = hcl.placeholder((size,), "A", hcl.UInt(8))
+
+    def kernel(A):
+        out = size - taps + 1
+
+        def filt(i):
+            acc = A[i]
+            for t in range(1, taps):
+                acc = acc + A[i + t] * (t % 5 + 1)
+            return acc
+
+        B = hcl.compute((out,), filt, "B", hcl.Int(32))
+        return hcl.compute((out,), lambda i: B[i] * 3 + i * 2 - 7, "C", hcl.Int(32))
+
+    return hcl.create_schedule([A], kernel)
+
+
+def ap_bits(code):
+    """The widths of the arbitrary precision integers of the HLS code."""
+    return [int(bits) for bits in re.findall(r"ap_u?int<(\d+)>", code)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=4096)
+    parser.add_argument("--taps", type=int, default=16)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    hcl.init()
+    pm = PassManager()
+    pm.add_pass(MinimizeBitwidth)
+    pm.run(fir(args.size, args.taps).ast)
+    saved = pm.records[-1]["stats"]["bits_saved"]
+    print(f"bits saved: {', '.join(f'{s}: {b}' for s, b in saved.items())}")
+
+    np_A = np.random.randint(0, 256, size=(args.size,))
+    out = args.size - args.taps + 1
+    outputs = {}
+    for narrow in [False, True]:
+        hcl.init(passes={"minimize_bitwidth": narrow})
+        f = hcl.build(fir(args.size, args.taps))
+        hcl_A = hcl.asarray(np_A, hcl.UInt(8))
+        hcl_C = hcl.asarray(np.zeros((out,)))
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            f(hcl_A, hcl_C)
+            best = min(best, time.perf_counter() - start)
+        outputs[narrow] = hcl_C.asnumpy()
+
+        hcl.init(passes={"minimize_bitwidth": narrow})
+        bits = ap_bits(str(hcl.build(fir(args.size, args.taps), target="vhls")))
+        print(
+            f"minimize_bitwidth={narrow!s:<5}  cpu: {best * 1e3:8.2f} ms  "
+            f"hls widest ap_int: {max(bits, default=0):4d}  "
+            f"total ap_int bits: {sum(bits)}"
+        )
+    assert np.array_equal(outputs[False], outputs[True])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Compare ast.clone with copy.deepcopy on a traced design.
+
+The design is a jacobi-2d kernel whose time loop is unrolled in Python.
+Both copies preserve the sharing between nodes; copy.deepcopy also
+copies the types, locations, and whatever else the nodes refer to.
+
+Usage: python benchmarks/bench_clone.py [--steps 64] [--repeat 5]
+"""
+
+import argparse
+import copy
+import sys
+import time
+
+from heterocl.ast import ast
+
+from bench_ast_memory import jacobi_2d
+
+
+def bench(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--steps", type=int, default=64)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    sys.setrecursionlimit(100000)
+
+    schedule = jacobi_2d(args.steps)
+    top_func = schedule.ast.top_func
+    t_deepcopy = bench(lambda: copy.deepcopy(top_func), args.repeat)
+    t_clone = bench(lambda: ast.clone(top_func), args.repeat)
+    memo = {}
+    ast.clone(top_func, memo)
+    print(f"nodes:     {len(memo)}")
+    print(f"deepcopy:  {t_deepcopy:.3f} s")
+    print(f"clone:     {t_clone:.3f} s")
+    print(f"speedup:   {t_deepcopy / t_clone:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Measure the introspection of fcompute when tracing many compute stages.
+
+A chain of small elementwise stages, as generated by a loop over layers,
+is traced with the cached introspection of `compute_body`, and with the
+`inspect.getclosurevars` and `inspect.getfullargspec` calls it replaces.
+
+Usage: python benchmarks/bench_compute_body.py [--stages 5000] [--repeat 5]
+"""
+
+import argparse
+import gc
+import inspect
+import time
+
+import heterocl as hcl
+from heterocl import operation
+
+
+def uncached_closure_vars(fcompute):
+    return inspect.getclosurevars(fcompute).nonlocals
+
+
+def uncached_arg_names(fcompute):
+    return inspect.getfullargspec(fcompute).args
+
+
+def chain(stages):
+    hcl.init()
+    A = hcl.placeholder((16, 16), "A")
+    B = hcl.placeholder((16, 16), "B")
+
+    def kernel(A, B):
+        for _ in range(stages):
+            A = hcl.compute(A.shape, lambda x, y: A[x, y] + B[x, y])
+        return A
+
+    return hcl.create_schedule([A, B], kernel)
+
+
+def bench(stages, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        chain(stages)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stages", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    t_cached = bench(args.stages, args.repeat)
+    closure_vars, arg_names = operation._closure_vars, operation._arg_names_of
+    operation._closure_vars = uncached_closure_vars
+    operation._arg_names_of = uncached_arg_names
+    try:
+        t_inspect = bench(args.stages, args.repeat)
+    finally:
+        operation._closure_vars, operation._arg_names_of = closure_vars, arg_names
+    print(f"stages:  {args.stages}")
+    print(f"inspect: {t_inspect:.3f} s")
+    print(f"cached:  {t_cached:.3f} s  speedup: {t_inspect / t_cached:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Measure IR build time and peak memory of large constant tensors,
+e.g., the weights of a convolution layer embedded in the kernel, and the
+bytes saved when several stages use the same table.
+
+Usage: python benchmarks/bench_const_tensor.py [--bits 8] [--shape 256 256 3 3]
+                                               [--copies 1]
+"""
+
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+import heterocl as hcl
+
+
+def _accumulate(w, prev):
+    return lambda *x: w[x] + prev[x]
+
+
+def bench(shape, dtype, copies):
+    hcl.init(dtype)
+    weights = np.random.randint(-64, 64, size=shape)
+
+    def kernel():
+        # each stage embeds its own copy of the same table
+        w = hcl.const_tensor(weights, "w0", dtype)
+        out = hcl.compute(shape, lambda *x: w[x] + 1, "out0")
+        for i in range(1, copies):
+            w = hcl.const_tensor(weights, f"w{i}", dtype)
+            out = hcl.compute(shape, _accumulate(w, out), f"out{i}")
+        return out
+
+    s = hcl.create_schedule([], kernel)
+    tracemalloc.start()
+    start = time.perf_counter()
+    hcl.lower(s)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, s.dedup_const_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bits", type=int, default=8)
+    parser.add_argument("--shape", type=int, nargs="+", default=[256, 256, 3, 3])
+    parser.add_argument("--copies", type=int, default=1)
+    args = parser.parse_args()
+    shape = tuple(args.shape)
+    nbytes = int(np.prod(shape)) * ((args.bits + 7) // 8)
+    elapsed, peak, shared = bench(shape, hcl.Int(args.bits), args.copies)
+    print(f"constant tensor: {shape} Int({args.bits}), {nbytes / 2**20:.2f} MiB")
+    print(f"copies:          {args.copies}")
+    print(f"lowering time:   {elapsed:.3f} s")
+    print(f"peak memory:     {peak / 2**20:.2f} MiB")
+    print(f"deduplicated:    {shared / 2**20:.2f} MiB")
+
+
+if __name__ == "__main__":
+    main()
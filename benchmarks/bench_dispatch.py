@@ -0,0 +1,74 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Measure node dispatch in the AST visitors and the IR builder.
+
+Every node of a large design (a jacobi-2d kernel with its time loop
+unrolled in Python) is dispatched through the cached type table, and
+through a linear `isinstance` scan of the same table, which is what the
+visitors used to do. The whole lowering of the design is timed as well.
+
+Usage: python benchmarks/bench_dispatch.py [--steps 32] [--repeat 20]
+"""
+
+import argparse
+import gc
+import time
+
+import heterocl as hcl
+from heterocl.ast import ast
+from heterocl.ast.ast_visitor import ASTVisitor
+from heterocl.ast.ir_builder import IRBuilder
+
+from bench_ast_memory import jacobi_2d
+
+
+def scan(table, op):
+    for cls, handler in table:
+        if isinstance(op, cls):
+            return handler
+    return None
+
+
+def cached(dispatcher, op):
+    cls = type(op)
+    cache = dispatcher.cache
+    return cache[cls] if cls in cache else dispatcher.resolve(cls)
+
+
+def bench(fn, dispatcher, nodes, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for op in nodes:
+            fn(dispatcher, op)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--steps", type=int, default=32)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    schedule = jacobi_2d(args.steps)
+    nodes = [
+        obj for obj in gc.get_objects() if isinstance(obj, (ast.Operation, ast.Expr))
+    ]
+    print(f"nodes: {len(nodes)}")
+    for name, dispatcher in [
+        ("visitor", ASTVisitor.dispatcher),
+        ("builder", IRBuilder.dispatcher),
+    ]:
+        t_scan = bench(lambda d, op: scan(d.table, op), dispatcher, nodes, args.repeat)
+        t_cached = bench(cached, dispatcher, nodes, args.repeat)
+        print(
+            f"{name:<8} isinstance: {t_scan:.3f} s  table: {t_cached:.3f} s  "
+            f"speedup: {t_scan / t_cached:.1f}x"
+        )
+
+    start = time.perf_counter()
+    hcl.lower(schedule)
+    print(f"lower:   {time.perf_counter() - start:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
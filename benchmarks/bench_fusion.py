@@ -0,0 +1,129 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Measure the fusion of elementwise stages on the LeNet inference model.
+
+The model of `samples/lenet` is traced, with the layers of `hcl.op.nn`
+and a bias add after the fully connected layers, then built and run with
+and without `hcl.init(passes={"fuse": True})`. The intermediate buffers
+are counted on the AST after the passes, and the outputs must match.
+
+Usage: python benchmarks/bench_fusion.py [--batch 100] [--repeat 5]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+import heterocl as hcl
+from heterocl.ast import ast
+from heterocl.op import nn
+
+
+def tanh(data, name):
+    return hcl.compute(data.shape, lambda *i: hcl.tanh(data[i]), name)
+
+
+def max_pool(data, name):
+    batch, channel, height, width = data.shape
+    kh = hcl.reduce_axis(0, 2)
+    kw = hcl.reduce_axis(0, 2)
+    return hcl.compute(
+        (batch, channel, height // 2, width // 2),
+        lambda n, c, h, w: hcl.max(
+            data[n, c, h * 2 + kh, w * 2 + kw], axis=[kh, kw], dtype=data.dtype
+        ),
+        name,
+    )
+
+
+def softmax(out, x):
+    m, n = x.shape
+    k = hcl.reduce_axis(0, n)
+    max_elem = hcl.compute((m,), lambda i: hcl.max(x[i, k], axis=k))
+    k = hcl.reduce_axis(0, n)
+    expsum = hcl.compute(
+        (m,), lambda i: hcl.sum(hcl.exp(x[i, k] - max_elem[i]), axis=k)
+    )
+    return hcl.update(out, lambda i, j: hcl.exp(x[i, j] - max_elem[i]) / expsum[i])
+
+
+def build_lenet(image, conv1_w, conv2_w, fc1_w, fc1_b, fc2_w, fc2_b, lenet):
+    conv1 = nn.conv2d_nchw(image, conv1_w, name="conv1")
+    pool1 = max_pool(tanh(conv1, "tanh1"), "pool1")
+    conv2 = nn.conv2d_nchw(pool1, conv2_w, name="conv2")
+    pool2 = max_pool(tanh(conv2, "tanh2"), "pool2")
+    flat = nn.flatten(pool2)
+    tanh3 = tanh(nn.dense(flat, fc1_w, fc1_b, name="fc1"), "tanh3")
+    fc2 = nn.dense(tanh3, fc2_w, fc2_b, name="fc2")
+    return softmax(lenet, fc2)
+
+
+def shapes(batch):
+    return [
+        (batch, 1, 28, 28),
+        (20, 1, 5, 5),
+        (50, 20, 5, 5),
+        (500, 800),
+        (500,),
+        (10, 500),
+        (10,),
+        (batch, 10),
+    ]
+
+
+def intermediate_bytes(schedule):
+    """The number and total size of the tensors created by the stages."""
+    tensors = {}
+
+    def visit(op):
+        if isinstance(op, ast.ComputeOp) and op.kind == "compute":
+            tensors[id(op.tensor)] = op.tensor
+
+    # the stages are outlined into functions by lowering
+    for func in schedule.ast.region:
+        ast.walk(func, ast.body_ops, pre=visit)
+    size = sum(
+        int(np.prod(t.shape)) * ((t.dtype.bits + 7) // 8) for t in tensors.values()
+    )
+    return len(tensors), size
+
+
+def measure(batch, repeat, fuse, inputs):
+    hcl.init(hcl.Float(), passes={"fuse": fuse})
+    placeholders = [
+        hcl.placeholder(shape, f"arg{i}") for i, shape in enumerate(shapes(batch))
+    ]
+    s = hcl.create_schedule(placeholders, build_lenet)
+    f = hcl.build(s)
+    buffers = intermediate_bytes(s)
+    args = [hcl.asarray(x) for x in inputs]
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        f(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, buffers, args[-1].asnumpy()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    inputs = [rng.uniform(-1, 1, size=shape) for shape in shapes(args.batch)]
+    results = {}
+    for fuse in [False, True]:
+        elapsed, (count, size), out = measure(args.batch, args.repeat, fuse, inputs)
+        results[fuse] = out
+        print(
+            f"fuse={fuse!s:<5}  run: {elapsed * 1e3:8.2f} ms  "
+            f"intermediate buffers: {count} ({size / 2**20:.2f} MiB)"
+        )
+    assert np.allclose(results[False], results[True], rtol=1e-4, atol=1e-5)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Measure the default AST pass pipeline on deeply nested if/elif chains.
+
+A kernel nests if/elif/else chains to a given depth, in the elif or in
+the else branches. Its AST goes through the default pipeline of
+`hcl.lower`, as the separate NestElseIf, PromoteFunc, and ExpandFunc
+passes, and as the single LegalizeAndExpand traversal. The time per AST
+node should stay flat as the depth grows.
+
+Usage: python benchmarks/bench_legalize.py [--depths 250 500 1000 2000]
+"""
+
+import argparse
+import gc
+import sys
+import time
+
+import heterocl as hcl
+from heterocl.passes.pass_manager import PassManager, ast_fingerprint
+from heterocl.passes.nest_if import NestElseIf
+from heterocl.passes.promote_func import PromoteFunc
+from heterocl.passes.expand_func import ExpandFunc
+from heterocl.passes.legalize import LegalizeAndExpand
+
+
+def nested_chains(depth, branch):
+    A = hcl.placeholder((10,), "A")
+
+    def kernel(A):
+        B = hcl.compute(A.shape, lambda i: A[i] + 1, "B")
+
+        def nest(i, k):
+            with hcl.if_(A[i] == k):
+                B[i] = k
+            with hcl.elif_(A[i] == -k):
+                if branch == "elif" and k < depth:
+                    nest(i, k + 1)
+                else:
+                    B[i] = -k
+            with hcl.else_():
+                if branch == "else" and k < depth:
+                    nest(i, k + 1)
+                else:
+                    B[i] = 0
+
+        def body(A, B):
+            with hcl.for_(0, 10, name="i") as i:
+                nest(i, 0)
+
+        hcl.mutate((1,), lambda _: body(A, B), "M")
+        return B
+
+    return hcl.create_schedule([A], kernel)
+
+
+def measure(depth, branch, passes, repeat):
+    best, nodes = float("inf"), 0
+    for _ in range(repeat):
+        hcl.init()
+        s = nested_chains(depth, branch)
+        nodes = ast_fingerprint(s.ast)[1]
+        pm = PassManager(instrument=False)
+        for pass_class in passes:
+            pm.add_pass(pass_class)
+        # as timeit does, the collector does not run while timing
+        gc.collect()
+        gc.disable()
+        start = time.perf_counter()
+        pm.run(s.ast)
+        best = min(best, time.perf_counter() - start)
+        gc.enable()
+    return best, nodes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--depths", type=int, nargs="+", default=[250, 500, 1000, 2000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # tracing the kernel recurses once per level
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 20 * max(args.depths)))
+    pipelines = {
+        "separate": (NestElseIf, PromoteFunc, ExpandFunc),
+        "fused": (LegalizeAndExpand,),
+    }
+    for branch in ["elif", "else"]:
+        for depth in args.depths:
+            for name, passes in pipelines.items():
+                elapsed, nodes = measure(depth, branch, passes, args.repeat)
+                print(
+                    f"{branch:<4}  depth {depth:5d}  {name:<8}  "
+                    f"{elapsed * 1e3:8.2f} ms  {elapsed / nodes * 1e6:6.2f} us/node"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Measure loop-invariant code motion on the CPU and in the HLS code.
+
+The kernel scales a stencil by coefficients loaded from scalars and cast
+in the loop body, as hand-written imperative kernels often do. It is
+built and run on the CPU, and generated for Vivado HLS, with and without
+`hcl.init(passes={"licm": True})`. For the HLS code, the operations left
+in the innermost loop are counted.
+
+Usage: python benchmarks/bench_licm.py [--size 512] [--repeat 5]
+"""
+
+import argparse
+import re
+import time
+
+import numpy as np
+
+import heterocl as hcl
+
+
+def stencil(size):
+    A = hcl.placeholder((size, size), "A", hcl.Float())
+    coef = hcl.placeholder((4,), "coef", hcl.Float())
+
+    def kernel(A, coef):
+        def body(A, coef, B):
+            with hcl.for_(1, size - 1, name="y") as y:
+                with hcl.for_(1, size - 1, name="x") as x:
+                    scale = hcl.sqrt(coef[0] * coef[0] + coef[1]) / hcl.cast(
+                        hcl.Float(), size
+                    )
+                    row = hcl.exp(coef[2] * hcl.cast(hcl.Float(), y))
+                    B[y, x] = (
+                        A[y - 1, x] + A[y + 1, x] + A[y, x - 1] + A[y, x + 1]
+                    ) * scale * row + coef[3]
+
+        B = hcl.compute(A.shape, lambda y, x: 0.0, "B", hcl.Float())
+        hcl.mutate((1,), lambda _: body(A, coef, B), "stencil")
+        return B
+
+    return hcl.create_schedule([A, coef], kernel)
+
+
+def innermost_ops(code):
+    """Count the statements of the innermost loops of the HLS code."""
+    count = 0
+    for loop in re.findall(r"for \([^{]*\{([^{}]*)\}", code):
+        count += sum(";" in line for line in loop.splitlines())
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=512)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    np_A = np.random.rand(args.size, args.size)
+    np_coef = np.random.rand(4)
+    outputs = {}
+    for licm in [False, True]:
+        hcl.init(hcl.Float(), passes={"licm": licm})
+        f = hcl.build(stencil(args.size))
+        hcl_A, hcl_coef = hcl.asarray(np_A), hcl.asarray(np_coef)
+        hcl_B = hcl.asarray(np.zeros((args.size, args.size)))
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            f(hcl_A, hcl_coef, hcl_B)
+            best = min(best, time.perf_counter() - start)
+        outputs[licm] = hcl_B.asnumpy()
+
+        hcl.init(hcl.Float(), passes={"licm": licm})
+        code = str(hcl.build(stencil(args.size), target="vhls"))
+        print(
+            f"licm={licm!s:<5}  cpu: {best * 1e3:8.2f} ms  "
+            f"hls innermost statements: {innermost_ops(code)}"
+        )
+    assert np.allclose(outputs[False], outputs[True])
+
+
+if __name__ == "__main__":
+    main()
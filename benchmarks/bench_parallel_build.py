@@ -0,0 +1,55 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Measure the IR building of the outlined stages in worker processes.
+
+A chain of 2-D stages is traced and lowered with `hcl.init(build_jobs=n)`
+for an increasing number of workers. The lowered modules must be
+identical whatever the number of workers.
+
+Usage: python benchmarks/bench_parallel_build.py [--stages 200] [--jobs 1 2 4 8]
+"""
+
+import argparse
+import time
+
+import heterocl as hcl
+
+
+def chain(stages, size=32):
+    A = hcl.placeholder((size, size), "A")
+
+    def kernel(A):
+        for _ in range(stages):
+            A = hcl.compute(
+                A.shape,
+                lambda y, x: A[y, x] * 3 + A[y, (x + 1) % size] - A[(y + 1) % size, x],
+            )
+        return A
+
+    return hcl.create_schedule([A], kernel)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stages", type=int, default=200)
+    parser.add_argument("--jobs", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    reference = None
+    for jobs in args.jobs:
+        hcl.init(build_jobs=jobs)
+        s = chain(args.stages)
+        start = time.perf_counter()
+        module = str(hcl.lower(s))
+        elapsed = time.perf_counter() - start
+        if reference is None:
+            reference = (elapsed, module)
+        assert module == reference[1], f"build_jobs={jobs} changed the module"
+        print(
+            f"build_jobs={jobs:<3} lower: {elapsed:.3f} s  "
+            f"speedup: {reference[0] / elapsed:.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
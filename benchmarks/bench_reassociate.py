@@ -0,0 +1,87 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Measure the reassociation of reductions into balanced trees.
+
+The kernel is a matrix-vector product, whose rows are reduced by a sum
+over a long axis, and a maximum of each row. It is built and run on the
+CPU, and generated for Vivado HLS, with `hcl.init(reduction_width=W)`
+for several widths. The length of the chain of dependent additions
+through an accumulator is reported for each width, as the number of
+iterations of the innermost reduction loop each accumulator carries, and
+the HLS code is checked to declare the partial accumulators. The float
+sums are reassociated with `--floats`, and are compared to the serial
+result with a tolerance.
+
+Usage: python benchmarks/bench_reassociate.py [--size 1024] [--widths 1 2 4 8]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+import heterocl as hcl
+
+
+def matvec(rows, cols, dtype):
+    A = hcl.placeholder((rows, cols), "A", dtype)
+    x = hcl.placeholder((cols,), "x", dtype)
+
+    def kernel(A, x):
+        k = hcl.reduce_axis(0, cols, "k")
+        y = hcl.compute(
+            (rows,), lambda i: hcl.sum(A[i, k] * x[k], axis=k, dtype=dtype), "y", dtype
+        )
+        m = hcl.reduce_axis(0, cols, "m")
+        z = hcl.compute(
+            (rows,), lambda i: hcl.max(A[i, m], axis=m, dtype=dtype), "z", dtype
+        )
+        return y, z
+
+    return hcl.create_schedule([A, x], kernel)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=1024)
+    parser.add_argument("--widths", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--floats", action="store_true")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = cols = args.size
+    dtype = hcl.Float() if args.floats else hcl.Int(32)
+    if args.floats:
+        np_A = np.random.rand(rows, cols)
+        np_x = np.random.rand(cols)
+    else:
+        np_A = np.random.randint(-100, 100, size=(rows, cols))
+        np_x = np.random.randint(-100, 100, size=(cols,))
+    expected = (np_A @ np_x, np_A.max(axis=1))
+    for width in args.widths:
+        hcl.init(dtype, reduction_width=width, reassociate_floats=args.floats)
+        f = hcl.build(matvec(rows, cols, dtype))
+        hcl_A, hcl_x = hcl.asarray(np_A, dtype), hcl.asarray(np_x, dtype)
+        hcl_y = hcl.asarray(np.zeros((rows,)), dtype)
+        hcl_z = hcl.asarray(np.zeros((rows,)), dtype)
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            f(hcl_A, hcl_x, hcl_y, hcl_z)
+            best = min(best, time.perf_counter() - start)
+        for result, value in zip((hcl_y, hcl_z), expected):
+            assert np.allclose(result.asnumpy(), value, rtol=1e-4)
+
+        hcl.init(dtype, reduction_width=width, reassociate_floats=args.floats)
+        code = str(hcl.build(matvec(rows, cols, dtype), target="vhls"))
+        partials = code.count("sum_part") > 0 and code.count("max_part") > 0
+        chain = -(-cols // width)
+        print(
+            f"reduction_width={width:<3}  cpu: {best * 1e3:8.2f} ms  "
+            f"dependent steps per accumulator: {chain:6d}  "
+            f"hls partial accumulators: {'yes' if partials else 'no'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
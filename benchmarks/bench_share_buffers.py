@@ -0,0 +1,115 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Measure the sharing of buffers between stages with disjoint lifetimes.
+
+The kernel is an image pipeline of blurs, each followed by elementwise
+stages, whose intermediate images all have the same shape. It is built
+and run on the CPU, and generated for Vivado HLS, with and without
+`hcl.init(passes={"share_buffers": True})`. The peak memory of the
+intermediate and output tensors is reported by the pass, and the BRAM
+usage of the HLS code is estimated from the sizes of the arrays it
+declares, in 18Kb blocks.
+
+Usage: python benchmarks/bench_share_buffers.py [--size 256] [--repeat 5]
+"""
+
+import argparse
+import math
+import re
+import time
+
+import numpy as np
+
+import heterocl as hcl
+from heterocl.passes.pass_manager import PassManager
+from heterocl.passes.liveness import ShareBuffers
+
+
+def pipeline(size, depth=4):
+    A = hcl.placeholder((size, size), "A", hcl.Float())
+
+    def kernel(A):
+        image = A
+        for i in range(depth):
+            src = image
+            blur = hcl.compute(
+                (size, size),
+                lambda y, x: (
+                    src[y, x]
+                    + src[y, (x + 1) % size]
+                    + src[(y + 1) % size, x]
+                    + src[(y + 1) % size, (x + 1) % size]
+                )
+                / 4,
+                f"blur{i}",
+            )
+            scaled = hcl.compute(
+                (size, size), lambda y, x: blur[y, x] * 0.5 + 0.25, f"scale{i}"
+            )
+            image = hcl.compute(
+                (size, size), lambda y, x: hcl.sqrt(scaled[y, x]), f"sqrt{i}"
+            )
+        return hcl.compute((size, size), lambda y, x: image[y, x], "out")
+
+    return hcl.create_schedule([A], kernel)
+
+
+# bitwidth of the element types of the arrays in the HLS code
+_TYPE_BITS = {"float": 32, "double": 64, "int32_t": 32, "int64_t": 64}
+
+
+def bram_blocks(code):
+    """Estimate the BRAM18K blocks of the arrays declared in the HLS code,
+    except the arguments of the functions.
+    """
+    blocks = 0
+    for dtype, dims in re.findall(r"^\s*([\w<>]+)\s+\w+((?:\[\d+\])+);", code, re.M):
+        bits = _TYPE_BITS.get(dtype)
+        if bits is None:
+            match = re.search(r"<(\d+)>", dtype)
+            bits = int(match.group(1)) if match else 32
+        size = math.prod(int(dim) for dim in re.findall(r"\d+", dims))
+        blocks += math.ceil(size * bits / 18432)
+    return blocks
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=256)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    hcl.init(hcl.Float())
+    pm = PassManager()
+    pm.add_pass(ShareBuffers)
+    pm.run(pipeline(args.size).ast)
+    stats = pm.records[-1]["stats"]
+    print(f"shared: {', '.join(f'{t}->{b}' for t, b in stats['shared'])}")
+
+    np_A = np.random.rand(args.size, args.size)
+    outputs = {}
+    for share in [False, True]:
+        hcl.init(hcl.Float(), passes={"share_buffers": share})
+        f = hcl.build(pipeline(args.size))
+        hcl_A = hcl.asarray(np_A)
+        hcl_out = hcl.asarray(np.zeros((args.size, args.size)))
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            f(hcl_A, hcl_out)
+            best = min(best, time.perf_counter() - start)
+        outputs[share] = hcl_out.asnumpy()
+
+        hcl.init(hcl.Float(), passes={"share_buffers": share})
+        code = str(hcl.build(pipeline(args.size), target="vhls"))
+        peak = stats["peak_bytes_after" if share else "peak_bytes_before"]
+        print(
+            f"share_buffers={share!s:<5}  cpu: {best * 1e3:8.2f} ms  "
+            f"peak memory: {peak / 2**20:6.2f} MiB  "
+            f"hls BRAM18K: {bram_blocks(code)}"
+        )
+    assert np.allclose(outputs[False], outputs[True])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Compare the native integer simplifier with the sympy-based one.
+
+The inputs mimic tests/test_simplify.py (scalar-valued slice bounds with
+shifts, bitwise operations, comparisons, and selects) and the index
+expressions produced by pack/unpack and tiling.
+
+Usage: python benchmarks/bench_simplify.py [--repeat 200]
+"""
+
+import argparse
+import time
+
+import heterocl as hcl
+from heterocl.ast import ast
+
+
+def make_inputs():
+    hcl.init()
+    loc = ast.Location("bench", 0)
+
+    def const(value):
+        return ast.ConstantOp(value, hcl.Int(32), loc)
+
+    def scalar(value):
+        tensor = ast.AllocOp("s", (1,), hcl.Int(32), loc)
+        tensor.fcompute = lambda *_: const(value)
+        return ast.LoadOp(tensor, [const(0)], loc)
+
+    x = ast.IterVar("x", None, loc)
+    y = ast.IterVar("y", None, loc)
+    a, b = scalar(21), scalar(13)
+    inputs = [
+        ast.LeftShiftOp(const(1), scalar(2), loc) - const(0) + const(1),
+        ast.RightShiftOp(scalar(12), const(1), loc) - const(0) + const(1),
+        ast.And(a, b, loc) - ast.And(const(1), a, loc) + const(1),
+        ast.Or(scalar(2), const(1), loc) + const(8),
+        ast.XOr(scalar(5), scalar(2), loc) - scalar(2) + const(1),
+        ast.SelectOp(ast.Cmp("lt", const(5), a, loc), b, const(6), loc) + const(1),
+        ast.Cmp("ge", const(5), scalar(5), loc) + const(1),
+        -scalar(-5) + const(1),
+    ]
+    # pack/unpack and tiling style index expressions
+    for factor in [2, 4, 8, 16]:
+        outer, inner = x * factor, y
+        index = outer + inner
+        inputs.append((index * 32 + const(31)) - (index * 32) + const(1))
+        inputs.append((outer * 4 + inner * 4) // 4 - x * factor)
+        inputs.append((x * factor * 8) % 8 + (y + 1) * (y - 1))
+    return inputs
+
+
+def bench(fn, inputs, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for expr in inputs:
+            fn(expr)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    inputs = make_inputs()
+    t_sympy = bench(ast._simplify_sympy, inputs, args.repeat)
+    t_native = bench(ast.simplify, inputs, args.repeat)
+    print(f"sympy:   {t_sympy:.3f} s")
+    print(f"native:  {t_native:.3f} s")
+    print(f"speedup: {t_sympy / t_native:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
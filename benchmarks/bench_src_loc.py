@@ -0,0 +1,81 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Measure the cost of recording source locations while tracing.
+
+`get_src_loc` is timed on its own, against the previous implementation
+that resolved the file name eagerly. A generated design with many small
+stages, imperative blocks, and intrinsic calls is then traced with the
+source locations recorded (lazily) and disabled with
+`hcl.init(src_loc=False)`.
+
+Usage: python benchmarks/bench_src_loc.py [--stages 2000] [--repeat 5]
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+
+import heterocl as hcl
+from heterocl.utils import get_src_loc
+
+
+def eager_src_loc(frame=0):
+    fr = sys._getframe(frame + 1)
+    return (os.path.basename(fr.f_code.co_filename), fr.f_lineno)
+
+
+def generated_design(stages, src_loc):
+    hcl.init(hcl.Float(), src_loc=src_loc)
+    A = hcl.placeholder((16,), "A")
+
+    def stage(src):
+        dst = hcl.compute(src.shape, lambda i: hcl.exp(src[i]) + hcl.sqrt(src[i]))
+        with hcl.for_(0, 16) as i:
+            with hcl.if_(dst[i] > 1.0):
+                dst[i] = hcl.log(dst[i])
+            with hcl.else_():
+                dst[i] = hcl.tanh(dst[i])
+        return dst
+
+    def kernel(A):
+        for _ in range(stages):
+            A = stage(A)
+        return A
+
+    return hcl.create_schedule([A], kernel)
+
+
+def bench(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stages", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    calls = 1000000
+    for name, fn in [("eager", eager_src_loc), ("lazy", get_src_loc)]:
+        elapsed = bench(lambda fn=fn: [fn() for _ in range(calls)], args.repeat)
+        print(f"get_src_loc {name:<6} {elapsed / calls * 1e9:6.1f} ns/call")
+
+    # interleave the runs, tracing is noisy compared to the saving
+    t_on = t_off = float("inf")
+    for _ in range(args.repeat):
+        t_on = min(t_on, bench(lambda: generated_design(args.stages, True), 1))
+        t_off = min(t_off, bench(lambda: generated_design(args.stages, False), 1))
+    print(f"trace src_loc=True:  {t_on:.3f} s")
+    print(f"trace src_loc=False: {t_off:.3f} s  ({1 - t_off / t_on:.1%} saved)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Measure the strength reduction of power-of-two arithmetic.
+
+The kernels pack and unpack a tensor of 8-bit integers, whose slice
+bounds multiply by the bitwidth and take the remainder by the factor,
+and bin the values of an image and their coordinates with divisions and
+remainders by powers of two. They are built and run on the CPU, and
+generated for Vivado HLS, with and without
+`hcl.init(passes={"strength_reduction": True})`. For the HLS code, the
+multipliers, dividers, and remainders, which map to DSPs or long-latency
+cores, are counted against the shifts and masks, which are wires and
+LUTs.
+
+Usage: python benchmarks/bench_strength.py [--size 1024] [--repeat 5]
+"""
+
+import argparse
+import re
+import time
+
+import numpy as np
+
+import heterocl as hcl
+
+
+def kernel(size):
+    A = hcl.placeholder((size, size), "A", hcl.UInt(8))
+
+    def algorithm(A):
+        packed = hcl.pack(A, axis=1, factor=4, name="packed")
+        B = hcl.unpack(packed, axis=1, factor=4, name="B")
+        return hcl.compute(
+            (size, size),
+            lambda y, x: B[y, x] % 8 + (x / 16) * 8 + (y % 4) * 128,
+            "bins",
+            hcl.Int(32),
+        )
+
+    return hcl.create_schedule([A], algorithm)
+
+
+def count_ops(code):
+    """Count the arithmetic and the bitwise operators of the HLS code."""
+    arith = len(re.findall(r"\s[*/%]\s", code))
+    bitwise = len(re.findall(r"\s(?:<<|>>|&)\s", code))
+    return arith, bitwise
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=1024)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    np_A = np.random.randint(0, 256, size=(args.size, args.size))
+    outputs = {}
+    for reduce in [False, True]:
+        hcl.init(passes={"strength_reduction": reduce})
+        f = hcl.build(kernel(args.size))
+        hcl_A = hcl.asarray(np_A, hcl.UInt(8))
+        hcl_bins = hcl.asarray(np.zeros((args.size, args.size)))
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            f(hcl_A, hcl_bins)
+            best = min(best, time.perf_counter() - start)
+        outputs[reduce] = hcl_bins.asnumpy()
+
+        hcl.init(passes={"strength_reduction": reduce})
+        code = str(hcl.build(kernel(args.size), target="vhls"))
+        arith, bitwise = count_ops(code)
+        print(
+            f"strength_reduction={reduce!s:<5}  cpu: {best * 1e3:8.2f} ms  "
+            f"hls mul/div/rem: {arith:3d}  shift/mask: {bitwise:3d}"
+        )
+    assert np.array_equal(outputs[False], outputs[True])
+
+
+if __name__ == "__main__":
+    main()
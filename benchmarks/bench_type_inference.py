@@ -0,0 +1,66 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Measure type inference on deep reduction expressions.
+
+The body of the reduction is a chain of `depth` additions, so every new
+node asks for the type of the whole chain below it while tracing, and the
+IR builder asks again for every node.
+
+Usage: python benchmarks/bench_type_inference.py [--depth 400]
+"""
+
+import argparse
+import sys
+import time
+
+import heterocl as hcl
+from heterocl.ast import ast
+
+
+def trace(depth):
+    hcl.init(hcl.Int(8))
+    A = hcl.placeholder((depth, 16), "A")
+
+    def kernel(A):
+        r = hcl.reduce_axis(0, 16, "r")
+
+        def body(x):
+            expr = A[0, r]
+            for i in range(1, depth):
+                expr = expr + A[i, r]
+            return hcl.sum(expr, axis=r, dtype=hcl.Int(32))
+
+        return hcl.compute((1,), body, "B")
+
+    return hcl.create_schedule([A], kernel)
+
+
+def infer_all(expr, tinf_engine):
+    # mimic the IR builder, which infers the type of every operand
+    while isinstance(expr, ast.BinaryOp):
+        tinf_engine.infer(expr)
+        expr = expr.lhs
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--depth", type=int, default=400)
+    args = parser.parse_args()
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10 * args.depth))
+
+    start = time.perf_counter()
+    trace(args.depth)
+    print(f"tracing:   {time.perf_counter() - start:.3f} s")
+
+    loc = ast.Location("bench", 0)
+    tensor = ast.AllocOp("A", (args.depth,), hcl.Int(8), loc)
+    expr = ast.LoadOp(tensor, [0], loc)
+    for i in range(1, args.depth):
+        expr = expr + ast.LoadOp(tensor, [i], loc)
+    start = time.perf_counter()
+    infer_all(expr, ast.TypeInference())
+    print(f"inference: {time.perf_counter() - start:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,3 +12,4 @@ from .print import *
 from .types import *
 from .platforms import *
 from .instantiate import *
+from . import serialize
@@ -2,6 +2,9 @@
 # SPDX-License-Identifier: Apache-2.0
 # pylint: disable=too-many-instance-attributes
 
+import os
+import weakref
+
 import sympy as sp
 from hcl_mlir.exceptions import (
     HCLError,
@@ -50,24 +53,236 @@ def immediate_to_constant(value, loc, dtype=None):
     return ConstantOp(value, Float(64), loc)
 
 
+def walk(root, children, pre=None, post=None):
+    """Traverse a graph of nodes depth-first with an explicit stack, so that
+    arbitrarily deep ASTs do not hit the recursion limit.
+
+    Parameters
+    ----------
+    root : object
+        the node to start from
+    children : callable
+        returns the children of a node in visiting order; it is called
+        after `pre` has been called on the node
+    pre : callable, optional
+        called on a node before its children; if it returns False, the
+        children and `post` are skipped for this node
+    post : callable, optional
+        called on a node after all its children
+
+    Shared nodes are visited once per path that reaches them, `pre` can
+    prune the ones already seen.
+    """
+    if pre is not None and pre(root) is False:
+        return
+    stack = [(root, iter(children(root)))]
+    while stack:
+        node, child_iter = stack[-1]
+        for child in child_iter:
+            if pre is None or pre(child) is not False:
+                stack.append((child, iter(children(child))))
+                break
+        else:
+            stack.pop()
+            if post is not None:
+                post(node)
+
+
+def body_ops(op):
+    """The operations in the body of `op`, for walking nested regions."""
+    if hasattr(op, "body") and op.body is not None:
+        return op.body
+    return ()
+
+
+def node_tensor(op):
+    """Return the tensor referred to by the `tensor` attribute of a node,
+    or None, without resolving struct fields.
+    """
+    try:
+        return object.__getattribute__(op, "tensor")
+    except AttributeError:
+        return None
+
+
+class _UseRef(weakref.ref):
+    """A weak reference to a user of a tensor, which removes itself from
+    the use list of the tensor when the user is freed.
+    """
+
+    __slots__ = ("key", "uses", "stage")
+
+    def __new__(cls, user, *_):
+        return weakref.ref.__new__(cls, user, _discard_use)
+
+    def __init__(self, user, uses, stage):
+        super().__init__(user, _discard_use)
+        self.key = id(user)
+        # the use list, weakly referenced so that it is freed with its tensor
+        self.uses = uses
+        self.stage = None if stage is None else weakref.ref(stage)
+
+
+def _discard_use(ref):
+    uses = ref.uses()
+    if uses is not None and uses._refs.get(ref.key) is ref:
+        del uses._refs[ref.key]
+
+
+class UseList:
+    """The users of a tensor, in the order they were registered.
+
+    The users are weakly referenced and indexed by their id, so that a
+    user is removed in constant time. A user that is built but never
+    inserted into the AST, e.g., one discarded by the frontend or built
+    by simplify from the fcompute of a tensor, leaves the list as soon as
+    it is freed. The passes removing a part of the AST drop its users
+    explicitly, see `drop_uses` in passes/dce.py, rather than waiting for
+    the garbage collector to free them.
+
+    Each user is recorded with the stage that was being traced when it
+    was registered, if any, from which the dataflow graph is built.
+    """
+
+    __slots__ = ("_refs", "_self_ref", "__weakref__")
+
+    def __init__(self, users=()):
+        # id(user) -> _UseRef
+        self._refs = {}
+        self._self_ref = weakref.ref(self)
+        for user in users:
+            self.append(user)
+
+    def append(self, user):
+        self._refs[id(user)] = _UseRef(user, self._self_ref, scope.stage())
+
+    def remove(self, user):
+        """Remove a user, if it is in the list."""
+        ref = self._refs.get(id(user))
+        if ref is not None and ref() is user:
+            del self._refs[id(user)]
+
+    def staged(self):
+        """The (user, stage) pairs, where stage is the stage that was
+        being traced when the user was registered, or None.
+        """
+        for ref in list(self._refs.values()):
+            user = ref()
+            if user is not None:
+                yield user, None if ref.stage is None else ref.stage()
+
+    def __iter__(self):
+        for ref in list(self._refs.values()):
+            user = ref()
+            if user is not None:
+                yield user
+
+    def __len__(self):
+        return len(self._refs)
+
+    def __getitem__(self, index):
+        return list(self)[index]
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+def _move_use(user, tensor):
+    """Update the use-def index when `user.tensor` is set to `tensor`."""
+    old_tensor = node_tensor(user)
+    if old_tensor is tensor:
+        return
+    if isinstance(old_tensor, AllocOp):
+        old_tensor.uses.remove(user)
+    if isinstance(tensor, AllocOp):
+        try:
+            object.__getattribute__(tensor, "uses").append(user)
+        except AttributeError:
+            # the tensor is being restored by copy.deepcopy or pickle
+            object.__setattr__(tensor, "uses", UseList([user]))
+
+
 def replace_all_uses_with(op, old_tensor, new_tensor):
+    """Replace the uses of `old_tensor` within `op` by `new_tensor`."""
+    replace_tensors(op, [(old_tensor, new_tensor)])
+
+
+def replace_tensors(op, replacements):
+    """Replace the uses of several tensors within `op` at once.
+
+    The candidate uses are taken from the use-def index of the tensors.
+    `op` is only walked, to confine the replacement to it, when there is
+    a candidate, and the walk stops once all of them have been found.
+
+    Parameters
+    ----------
+    op : Operation
+        the scope of the replacement, e.g., a function
+    replacements : list of tuple
+        (old tensor, new tensor) pairs
+    """
+    new_tensors = {id(old): new for old, new in replacements}
+    pending = set()
+    for old, _ in replacements:
+        pending.update(id(use) for use in old.uses)
     if isinstance(op, FuncOp):
-        new_rets = []
-        for ret in op.return_tensors:
-            if ret.name == old_tensor.name:
-                new_rets.append(new_tensor)
-            else:
-                new_rets.append(ret)
-        op.return_tensors = new_rets
+        op.return_tensors = [new_tensors.get(id(ret), ret) for ret in op.return_tensors]
+    if not pending:
+        return
+    visited = set()
+
+    def replace(node):
+        if not pending or id(node) in visited:
+            return False
+        visited.add(id(node))
+        if id(node) in pending:
+            pending.discard(id(node))
+            node.tensor = new_tensors[id(node_tensor(node))]
+        return True
 
-    for attr, value in op.__dict__.items():
-        if attr == "tensor" and value.name == old_tensor.name:
-            setattr(op, attr, new_tensor)
+    walk(op, node_children, pre=replace)
+
+
+def node_children(op):
+    """Iterate over the AST nodes an AST node refers to, directly or in a
+    list, except the users of a tensor, which may lead out of the subtree.
+    """
+    for attr, value in list(node_attrs(op)):
+        if attr == "uses":
+            continue
         if isinstance(value, list):
-            for v in value:
-                replace_all_uses_with(v, old_tensor, new_tensor)
-        if hasattr(value, "__dict__"):
-            replace_all_uses_with(value, old_tensor, new_tensor)
+            for item in value:
+                if isinstance(item, (Operation, Expr)):
+                    yield item
+        elif isinstance(value, (Operation, Expr)):
+            yield value
+
+
+# class -> names of the __slots__ declared along its MRO
+_slot_names = {}
+
+
+def node_attrs(op):
+    """Iterate over the (name, value) pairs of the attributes set on an
+    object, whether they are stored in __slots__ or in its __dict__.
+    """
+    cls = type(op)
+    names = _slot_names.get(cls)
+    if names is None:
+        names = _slot_names[cls] = tuple(
+            attr
+            for base in cls.__mro__
+            for attr in base.__dict__.get("__slots__", ())
+            if attr not in ("__dict__", "__weakref__")
+        )
+    for attr in names:
+        try:
+            # bypass Expr.__getattr__, which resolves struct fields
+            yield attr, object.__getattribute__(op, attr)
+        except AttributeError:
+            continue
+    if hasattr(op, "__dict__"):
+        yield from op.__dict__.items()
 
 
 # Unwrap sympy integer or float into python integer or float
@@ -80,11 +295,227 @@ def unwrap_sp(expr):
 
 
 def simplify(expr):
-    # pylint: disable=too-many-return-statements, too-many-branches
     """
     simplifies an expression by replacing all constants with their values
     and compute the result if possible
     Only supports affine expressions on integers and floats
+
+    Integer expressions are canonicalized natively into a sum of products
+    of iteration variables. Expressions that cannot be represented this way
+    (e.g., floats, or symbolic floor division) fall back to sympy.
+    """
+    if isinstance(expr, (int, float)):
+        return expr
+    if isinstance(expr, sp.core.numbers.Integer):
+        return int(expr)
+    if isinstance(expr, ConstantOp):
+        return expr.value
+    if isinstance(expr, CastOp):
+        return simplify(expr.expr)
+    try:
+        poly = _canonicalize(expr)
+    except _NotCanonical:
+        return _simplify_sympy(expr)
+    return _poly_to_sympy(poly)
+
+
+class _NotCanonical(Exception):
+    """The expression cannot be represented as an integer polynomial."""
+
+
+class _CanonicalCache:
+    """The epoch of the polynomials memoized on the expressions by
+    _canonicalize, bumped whenever an operand of an expression is
+    re-assigned after construction.
+    """
+
+    epoch = 0
+
+
+# An integer polynomial is represented as a dictionary
+# { monomial : coefficient }, where a monomial is a sorted tuple of
+# iteration variable names, and the empty tuple is the constant term.
+
+
+def _poly_const(value):
+    return {(): value} if value != 0 else {}
+
+
+def _poly_get_const(poly):
+    """Return the value of a constant polynomial, or None."""
+    if not poly:
+        return 0
+    if len(poly) == 1 and () in poly:
+        return poly[()]
+    return None
+
+
+def _poly_add(lhs, rhs, sign=1):
+    res = dict(lhs)
+    for mono, coeff in rhs.items():
+        coeff = res.get(mono, 0) + sign * coeff
+        if coeff == 0:
+            res.pop(mono, None)
+        else:
+            res[mono] = coeff
+    return res
+
+
+def _poly_mul(lhs, rhs):
+    res = {}
+    for mono_l, coeff_l in lhs.items():
+        for mono_r, coeff_r in rhs.items():
+            mono = tuple(sorted(mono_l + mono_r))
+            coeff = res.get(mono, 0) + coeff_l * coeff_r
+            if coeff == 0:
+                res.pop(mono, None)
+            else:
+                res[mono] = coeff
+    return res
+
+
+def _poly_to_sympy(poly):
+    const = _poly_get_const(poly)
+    if const is not None:
+        return sp.Integer(const)
+    terms = []
+    for mono, coeff in poly.items():
+        term = sp.Integer(coeff)
+        for name in mono:
+            term = term * sp.Symbol(name)
+        terms.append(term)
+    return sp.Add(*terms)
+
+
+def _list_operands(expr):
+    """The operands of `expr` held in lists, which are replaced in place
+    rather than re-assigned.
+    """
+    if isinstance(expr, LoadOp):
+        return tuple(expr.index)
+    if isinstance(expr, StructGetOp) and isinstance(expr.struct, LoadOp):
+        return tuple(expr.struct.index)
+    return ()
+
+
+def _canonicalize(expr):
+    """Canonicalize an integer expression into a polynomial.
+
+    The polynomial of an expression, or None if it has none, is memoized
+    on the expression, so that shared subexpressions, and expressions
+    simplified again, are visited once. The cache is tagged with the
+    epoch of _CanonicalCache and the operands held in lists.
+    """
+    if not isinstance(expr, Expr):
+        return _canonicalize_impl(expr)
+    operands = _list_operands(expr)
+    cache = expr._canonical_cache
+    if (
+        cache is not None
+        and cache[0] == _CanonicalCache.epoch
+        and len(cache[1]) == len(operands)
+        and all(a is b for a, b in zip(cache[1], operands))
+    ):
+        poly = cache[2]
+    else:
+        epoch = _CanonicalCache.epoch
+        try:
+            poly = _canonicalize_impl(expr)
+        except _NotCanonical:
+            poly = None
+        expr._canonical_cache = (epoch, operands, poly)
+    if poly is None:
+        raise _NotCanonical()
+    return poly
+
+
+def _canonicalize_const(expr):
+    value = _poly_get_const(_canonicalize(expr))
+    if value is None:
+        raise _NotCanonical()
+    return value
+
+
+# pylint: disable=too-many-return-statements, too-many-branches
+def _canonicalize_impl(expr):
+    if isinstance(expr, (int, sp.core.numbers.Integer)):
+        return _poly_const(int(expr))
+    if isinstance(expr, ConstantOp):
+        # bool is also an int
+        if not isinstance(expr.value, int):
+            raise _NotCanonical()
+        return _poly_const(int(expr.value))
+    if isinstance(expr, IterVar):
+        return {(expr.name,): 1}
+    if isinstance(expr, CastOp):
+        return _canonicalize(expr.expr)
+    if isinstance(expr, Add):
+        return _poly_add(_canonicalize(expr.lhs), _canonicalize(expr.rhs))
+    if isinstance(expr, Sub):
+        return _poly_add(_canonicalize(expr.lhs), _canonicalize(expr.rhs), sign=-1)
+    if isinstance(expr, Mul):
+        return _poly_mul(_canonicalize(expr.lhs), _canonicalize(expr.rhs))
+    if isinstance(expr, Neg):
+        return _poly_add({}, _canonicalize(expr.expr), sign=-1)
+    if isinstance(expr, (Div, FloorDiv, Mod)):
+        lhs = _canonicalize(expr.lhs)
+        rhs = _canonicalize_const(expr.rhs)
+        if rhs == 0:
+            raise _NotCanonical()
+        const = _poly_get_const(lhs)
+        if const is not None:
+            if isinstance(expr, Mod):
+                return _poly_const(const % rhs)
+            if isinstance(expr, Div) and const % rhs != 0:
+                # rational result
+                raise _NotCanonical()
+            return _poly_const(const // rhs)
+        # (c * x) // c = x and (c * x) % c = 0
+        if all(coeff % rhs == 0 for coeff in lhs.values()):
+            if isinstance(expr, Mod):
+                return {}
+            return {mono: coeff // rhs for mono, coeff in lhs.items()}
+        raise _NotCanonical()
+    if isinstance(expr, LoadOp):
+        tensor = expr.tensor
+        if tensor.fcompute is None:
+            raise _NotCanonical()
+        return _canonicalize(tensor.fcompute(*expr.index))
+    if isinstance(expr, StructGetOp):
+        struct = expr.struct
+        return _canonicalize(struct.tensor.fcompute(*struct.index)[expr.field])
+    if isinstance(expr, SelectOp):
+        if _canonicalize_const(expr.cond):
+            return _canonicalize(expr.true_value)
+        return _canonicalize(expr.false_value)
+    if isinstance(expr, Cmp):
+        lhs = _canonicalize_const(expr.lhs)
+        rhs = _canonicalize_const(expr.rhs)
+        compare = _CMP_FUNCS.get(expr.name)
+        if compare is None:
+            raise HCLError(f"Unsupported expression type: {type(expr)}, {expr.name}")
+        return _poly_const(int(compare(lhs, rhs)))
+    if isinstance(expr, BinaryOp) and type(expr) in _INT_BINARY_FUNCS:
+        lhs = _canonicalize_const(expr.lhs)
+        rhs = _canonicalize_const(expr.rhs)
+        return _poly_const(int(_INT_BINARY_FUNCS[type(expr)](lhs, rhs)))
+    raise _NotCanonical()
+
+
+_CMP_FUNCS = {
+    "lt": lambda a, b: a < b,
+    "le": lambda a, b: a <= b,
+    "eq": lambda a, b: a == b,
+    "ne": lambda a, b: a != b,
+    "gt": lambda a, b: a > b,
+    "ge": lambda a, b: a >= b,
+}
+
+
+def _simplify_sympy(expr):
+    # pylint: disable=too-many-return-statements, too-many-branches
+    """The sympy-based simplifier, used for the expressions that
+    cannot be canonicalized natively.
     """
     if isinstance(expr, (int, float)):
         return expr
@@ -179,12 +610,28 @@ def simplify(expr):
 
 
 class Location:
-    """Filename and linenumber"""
+    """Filename and linenumber
+
+    The file can also be given as the code object of the traced function,
+    whose file name is then only resolved when it is first read.
+    """
+
+    __slots__ = ("_file", "lineno")
 
     def __init__(self, filename, lineno):
-        self.filename = filename
+        self._file = filename
         self.lineno = lineno
 
+    @property
+    def filename(self):
+        if not isinstance(self._file, str):
+            self._file = os.path.basename(self._file.co_filename)
+        return self._file
+
+    def __reduce__(self):
+        # code objects cannot be pickled
+        return Location, (self.filename, self.lineno)
+
     def __str__(self):
         return f"{self.filename}:{self.lineno}"
 
@@ -194,6 +641,8 @@ class Scope:
 
     def __init__(self):
         self.stack = []
+        # the stages being traced, innermost last
+        self.stages = []
 
     def push(self, new_scope: list):
         self.stack.append(new_scope)
@@ -210,8 +659,13 @@ class Scope:
     def __len__(self):
         return len(self.stack)
 
+    def stage(self):
+        """The innermost stage being traced, or None."""
+        return self.stages[-1] if self.stages else None
+
     def reset(self):
         self.stack.clear()
+        self.stages.clear()
         # this list is for operations
         # that are not enclosed in a top-level function
         # in the case that there is a top-level function,
@@ -234,6 +688,17 @@ class Operation:
 
     """
 
+    __slots__ = (
+        "name",
+        "loc",
+        "ir_op",
+        "result",
+        "reusable",
+        "level",
+        "__dict__",
+        "__weakref__",
+    )
+
     def __init__(self, name, loc):
         self.name = name
         self.loc = loc
@@ -249,6 +714,11 @@ class Operation:
     def __repr__(self):
         return self.name
 
+    def __setattr__(self, key, value):
+        if key == "tensor":
+            _move_use(self, value)
+        object.__setattr__(self, key, value)
+
 
 class Expr:
     """Base class for all expressions.
@@ -260,11 +730,32 @@ class Expr:
 
     """
 
+    __slots__ = (
+        "name",
+        "loc",
+        "dtype",
+        "result",
+        "reusable",
+        "ir_op",
+        "level",
+        "_type_cache",
+        "_canonical_cache",
+        "__dict__",
+        "__weakref__",
+    )
+    # attributes the inferred type of the expression depends on
+    _type_deps = ("dtype",)
+    # other attributes its polynomial, see simplify, depends on
+    _canonical_deps = ()
+
     def __init__(self, name, loc):
         self.name = name
         self.loc = loc
         self.dtype = None
-        self.tinf_engine = TypeInference()
+        # (epoch, type) memoized by TypeInference
+        self._type_cache = None
+        # (epoch, list operands, polynomial) memoized by simplify
+        self._canonical_cache = None
         # When an expression is built, its result will be set
         self.result = None
         # whether a new MLIR operation is built
@@ -276,6 +767,36 @@ class Expr:
     def __repr__(self):
         return self.name
 
+    def __copy__(self):
+        # the default protocol looks up __setstate__, which would be
+        # resolved as a struct field by __getattr__
+        new_expr = object.__new__(type(self))
+        for attr, value in node_attrs(self):
+            if attr == "uses":
+                # a copied tensor has no uses yet
+                value = UseList()
+            object.__setattr__(new_expr, attr, value)
+        tensor = node_tensor(new_expr)
+        if isinstance(tensor, AllocOp):
+            tensor.uses.append(new_expr)
+        return new_expr
+
+    def __setattr__(self, key, value):
+        if key == "tensor":
+            _move_use(self, value)
+        if key in self._type_deps or key in self._canonical_deps:
+            try:
+                # re-assigning an operand or a data type after construction
+                # invalidates all the types memoized by TypeInference, and
+                # the polynomials memoized by simplify
+                if object.__getattribute__(self, key) is not None:
+                    if key in self._type_deps:
+                        TypeInference.epoch += 1
+                    _CanonicalCache.epoch += 1
+            except AttributeError:
+                pass
+        object.__setattr__(self, key, value)
+
     def __add__(self, other):
         return Add(self, other, self.loc)
 
@@ -458,9 +979,11 @@ class Expr:
 
     def __getattr__(self, key):
         """Access a field of a struct value"""
-        # bypass the attribute lookup to avoid infinite recursion
-        if key in self.__dict__:
-            return self.__dict__[key]
+        # only called when the regular lookup of slots and
+        # instance attributes fails, so `key` is not set on self
+        if key.startswith("__") and key.endswith("__"):
+            # special methods looked up by protocols, e.g., copy.deepcopy
+            raise AttributeError(key)
         if isinstance(self, LoadOp):
             # access a field from a struct tensor
             key_list = list(self.tensor.dtype.dtype_dict.keys())
@@ -486,6 +1009,9 @@ class UnaryOp(Expr):
 
     """
 
+    __slots__ = ("expr",)
+    _type_deps = ("expr",)
+
     def __init__(self, op, expr, loc):
         super().__init__(op, loc)
         expr = immediate_to_constant(expr, loc)
@@ -505,6 +1031,9 @@ class BinaryOp(Expr):
 
     """
 
+    __slots__ = ("lhs", "rhs")
+    _type_deps = ("lhs", "rhs")
+
     def __init__(self, op, lhs, rhs, loc):
         super().__init__(op, loc)
         lhs = immediate_to_constant(lhs, loc)
@@ -527,6 +1056,8 @@ class TernaryOp(Expr):
 
     """
 
+    __slots__ = ("cond", "lhs", "rhs")
+
     def __init__(self, op, cond, lhs, rhs, loc):
         super().__init__(op, loc)
         cond = immediate_to_constant(cond, loc)
@@ -548,6 +1079,9 @@ class CastOp(Expr):
 
     """
 
+    __slots__ = ("expr",)
+    _canonical_deps = ("expr",)
+
     def __init__(self, expr, dtype, loc):
         super().__init__(dtype_to_str(dtype), loc)
         expr = immediate_to_constant(expr, loc)
@@ -562,6 +1096,8 @@ class CastOp(Expr):
 class Add(BinaryOp):
     """Addition operation."""
 
+    __slots__ = ()
+
     def __init__(self, lhs, rhs, loc):
         super().__init__("+", lhs, rhs, loc)
 
@@ -570,6 +1106,8 @@ class Add(BinaryOp):
 class Sub(BinaryOp):
     """Subtraction operation."""
 
+    __slots__ = ()
+
     def __init__(self, lhs, rhs, loc):
         super().__init__("-", lhs, rhs, loc)
 
@@ -578,6 +1116,8 @@ class Sub(BinaryOp):
 class Mul(BinaryOp):
     """Multiplication operation."""
 
+    __slots__ = ()
+
     def __init__(self, lhs, rhs, loc):
         super().__init__("*", lhs, rhs, loc)
 
@@ -586,6 +1126,8 @@ class Mul(BinaryOp):
 class Div(BinaryOp):
     """Division operation."""
 
+    __slots__ = ()
+
     def __init__(self, lhs, rhs, loc):
         super().__init__("/", lhs, rhs, loc)
 
@@ -594,6 +1136,8 @@ class Div(BinaryOp):
 class Min(BinaryOp):
     """Min operation."""
 
+    __slots__ = ()
+
     def __init__(self, lhs, rhs, loc):
         super().__init__("min", lhs, rhs, loc)
 
@@ -605,6 +1149,8 @@ class Min(BinaryOp):
 class Max(BinaryOp):
     """Max operation."""
 
+    __slots__ = ()
+
     def __init__(self, lhs, rhs, loc):
         super().__init__("max", lhs, rhs, loc)
 
@@ -616,6 +1162,8 @@ class Max(BinaryOp):
 class FloorDiv(BinaryOp):
     """Floor division operation."""
 
+    __slots__ = ()
+
     def __init__(self, lhs, rhs, loc):
         super().__init__("//", lhs, rhs, loc)
 
@@ -624,6 +1172,8 @@ class FloorDiv(BinaryOp):
 class Mod(BinaryOp):
     """Modulo operation."""
 
+    __slots__ = ()
+
     def __init__(self, lhs, rhs, loc):
         super().__init__("%", lhs, rhs, loc)
 
@@ -632,6 +1182,8 @@ class Mod(BinaryOp):
 class LeftShiftOp(BinaryOp):
     """Left shift operation."""
 
+    __slots__ = ()
+
     def __init__(self, lhs, rhs, loc):
         super().__init__("<<", lhs, rhs, loc)
 
@@ -640,6 +1192,8 @@ class LeftShiftOp(BinaryOp):
 class RightShiftOp(BinaryOp):
     """Right shift operation."""
 
+    __slots__ = ()
+
     def __init__(self, lhs, rhs, loc):
         super().__init__(">>", lhs, rhs, loc)
 
@@ -648,6 +1202,8 @@ class RightShiftOp(BinaryOp):
 class Cmp(BinaryOp):
     """Comparison operation."""
 
+    __slots__ = ()
+
     def __init__(self, op, lhs, rhs, loc):
         super().__init__(op, lhs, rhs, loc)
         self.dtype = UInt(1)
@@ -657,6 +1213,8 @@ class Cmp(BinaryOp):
 class And(BinaryOp):
     """Bitwise and operation."""
 
+    __slots__ = ()
+
     def __init__(self, lhs, rhs, loc):
         super().__init__("&", lhs, rhs, loc)
 
@@ -665,6 +1223,8 @@ class And(BinaryOp):
 class Or(BinaryOp):
     """Bitwise or operation."""
 
+    __slots__ = ()
+
     def __init__(self, lhs, rhs, loc):
         super().__init__("|", lhs, rhs, loc)
 
@@ -673,6 +1233,8 @@ class Or(BinaryOp):
 class XOr(BinaryOp):
     """Bitwise xor operation."""
 
+    __slots__ = ()
+
     def __init__(self, lhs, rhs, loc):
         super().__init__("^", lhs, rhs, loc)
 
@@ -681,6 +1243,8 @@ class XOr(BinaryOp):
 class Invert(UnaryOp):
     """Bitwise invert operation, e.g. 0b1011 -> 0b0100."""
 
+    __slots__ = ()
+
     def __init__(self, expr, loc):
         super().__init__("~", expr, loc)
         self.dtype = self.tinf_engine.infer(self)
@@ -689,6 +1253,8 @@ class Invert(UnaryOp):
 class Neg(UnaryOp):
     """Negate operation, i.e. -x for any expression x."""
 
+    __slots__ = ()
+
     def __init__(self, expr, loc):
         super().__init__("neg", expr, loc)
         self.dtype = self.tinf_engine.infer(self)
@@ -697,6 +1263,8 @@ class Neg(UnaryOp):
 class BitReverseOp(UnaryOp):
     """Bit reverse operation."""
 
+    __slots__ = ()
+
     def __init__(self, expr, loc):
         super().__init__("bit_reverse", expr, loc)
         self.dtype = self.tinf_engine.infer(self)
@@ -705,6 +1273,8 @@ class BitReverseOp(UnaryOp):
 class BitCastOp(UnaryOp):
     """Bit cast operation."""
 
+    __slots__ = ()
+
     def __init__(self, expr, dtype, loc):
         super().__init__("bit_cast", expr, loc)
         self.dtype = dtype
@@ -714,6 +1284,8 @@ class BitCastOp(UnaryOp):
 class MathExpOp(UnaryOp):
     """Mathematical exponential operation."""
 
+    __slots__ = ()
+
     def __init__(self, expr, loc):
         super().__init__("exp", expr, loc)
         self.dtype = self.tinf_engine.infer(self)
@@ -723,6 +1295,8 @@ class MathExpOp(UnaryOp):
 class MathPowOp(BinaryOp):
     """Mathematical power operation."""
 
+    __slots__ = ()
+
     def __init__(self, lhs, rhs, loc):
         super().__init__("pow", lhs, rhs, loc)
         self.dtype = self.tinf_engine.infer(self)
@@ -732,6 +1306,8 @@ class MathPowOp(BinaryOp):
 class MathLogOp(UnaryOp):
     """Mathematical log operation."""
 
+    __slots__ = ()
+
     def __init__(self, expr, loc):
         super().__init__("log", expr, loc)
         self.dtype = self.tinf_engine.infer(self)
@@ -741,6 +1317,8 @@ class MathLogOp(UnaryOp):
 class MathLog2Op(UnaryOp):
     """Mathematical log2 operation."""
 
+    __slots__ = ()
+
     def __init__(self, expr, loc):
         super().__init__("log2", expr, loc)
         self.dtype = self.tinf_engine.infer(self)
@@ -750,6 +1328,8 @@ class MathLog2Op(UnaryOp):
 class MathLog10Op(UnaryOp):
     """Mathematical log10 operation."""
 
+    __slots__ = ()
+
     def __init__(self, expr, loc):
         super().__init__("log10", expr, loc)
         self.dtype = self.tinf_engine.infer(self)
@@ -759,6 +1339,8 @@ class MathLog10Op(UnaryOp):
 class MathSqrtOp(UnaryOp):
     """Mathematical square root operation."""
 
+    __slots__ = ()
+
     def __init__(self, expr, loc):
         super().__init__("sqrt", expr, loc)
         self.dtype = self.tinf_engine.infer(self)
@@ -768,6 +1350,8 @@ class MathSqrtOp(UnaryOp):
 class MathSinOp(UnaryOp):
     """Mathematical sine operation."""
 
+    __slots__ = ()
+
     def __init__(self, expr, loc):
         super().__init__("sin", expr, loc)
         self.dtype = self.tinf_engine.infer(self)
@@ -777,6 +1361,8 @@ class MathSinOp(UnaryOp):
 class MathCosOp(UnaryOp):
     """Mathematical cosine operation."""
 
+    __slots__ = ()
+
     def __init__(self, expr, loc):
         super().__init__("cos", expr, loc)
         self.dtype = self.tinf_engine.infer(self)
@@ -786,6 +1372,8 @@ class MathCosOp(UnaryOp):
 class MathTanOp(UnaryOp):
     """Mathematical tangent operation."""
 
+    __slots__ = ()
+
     def __init__(self, expr, loc):
         super().__init__("tan", expr, loc)
         self.dtype = self.tinf_engine.infer(self)
@@ -795,6 +1383,8 @@ class MathTanOp(UnaryOp):
 class MathTanhOp(UnaryOp):
     """Mathematical hyperbolic tangent operation."""
 
+    __slots__ = ()
+
     def __init__(self, expr, loc):
         super().__init__("tanh", expr, loc)
         self.dtype = self.tinf_engine.infer(self)
@@ -804,6 +1394,8 @@ class MathTanhOp(UnaryOp):
 class LogicalAnd(BinaryOp):
     """Logical and operation."""
 
+    __slots__ = ()
+
     def __init__(self, lhs, rhs, loc):
         super().__init__("&&", lhs, rhs, loc)
 
@@ -812,6 +1404,8 @@ class LogicalAnd(BinaryOp):
 class LogicalOr(BinaryOp):
     """Logical or operation."""
 
+    __slots__ = ()
+
     def __init__(self, lhs, rhs, loc):
         super().__init__("||", lhs, rhs, loc)
 
@@ -820,6 +1414,8 @@ class LogicalOr(BinaryOp):
 class LogicalXOr(BinaryOp):
     """Logical xor operation."""
 
+    __slots__ = ()
+
     def __init__(self, lhs, rhs, loc):
         super().__init__("^^", lhs, rhs, loc)
 
@@ -827,6 +1423,8 @@ class LogicalXOr(BinaryOp):
 class PrintMemRefOp(Operation):
     """Print memref operation."""
 
+    __slots__ = ("memref", "dtype")
+
     def __init__(self, memref, dtype, loc):
         super().__init__("print_memref", loc)
         self.memref = memref
@@ -843,6 +1441,9 @@ class PrintMemRefOp(Operation):
 class ConstantOp(Expr):
     """Constant scalar operation."""
 
+    __slots__ = ("value",)
+    _canonical_deps = ("value",)
+
     def __init__(self, value, dtype, loc):
         super().__init__(str(value), loc)
         self.value = value
@@ -855,6 +1456,8 @@ class ConstantOp(Expr):
 class ConstantTensorOp(Expr):
     """Constant tensor operation."""
 
+    __slots__ = ("values", "shape", "tensor")
+
     # TODO(Niansong): handle overflow
     def __init__(self, values, name, shape, dtype, loc):
         super().__init__(name, loc)
@@ -874,6 +1477,10 @@ class ConstantTensorOp(Expr):
 class LoadOp(Expr):
     """Load operation."""
 
+    __slots__ = ("tensor", "index")
+    _type_deps = ("tensor",)
+    _canonical_deps = ("index",)
+
     def __init__(self, tensor, index, loc):
         super().__init__("getitem", loc)
         self.tensor = tensor
@@ -896,6 +1503,8 @@ class LoadOp(Expr):
 class StoreOp(Operation):
     """Store operation."""
 
+    __slots__ = ("tensor", "index", "value")
+
     def __init__(self, tensor, index, value, loc):
         super().__init__("setitem", loc)
         self.tensor = tensor
@@ -917,6 +1526,8 @@ class StoreOp(Operation):
 class GetBitOp(Expr):
     """Get bit operation"""
 
+    __slots__ = ("expr", "index")
+
     def __init__(self, expr, index, loc):
         super().__init__("getbit", loc)
         self.expr = immediate_to_constant(expr, loc)
@@ -930,6 +1541,8 @@ class GetBitOp(Expr):
 class SetBitOp(Operation):
     """Set bit operation"""
 
+    __slots__ = ("expr", "index", "value")
+
     def __init__(self, expr, index, value, loc):
         super().__init__("setbit", loc)
         self.expr = expr
@@ -947,6 +1560,8 @@ class SetBitOp(Operation):
 class GetSliceOp(Expr):
     """Get slice operation"""
 
+    __slots__ = ("expr", "start", "end")
+
     def __init__(self, expr, start, end, loc):
         super().__init__("getslice", loc)
         self.expr = expr
@@ -983,6 +1598,8 @@ class GetSliceOp(Expr):
 class SetSliceOp(Operation):
     """Set slice operation"""
 
+    __slots__ = ("expr", "start", "end", "value")
+
     def __init__(self, expr, start, end, value, loc):
         super().__init__("setslice", loc)
         self.expr = expr
@@ -1013,6 +1630,8 @@ class SetSliceOp(Operation):
 
 
 class TensorSlice(Expr):
+    __slots__ = ("full_shape", "parent", "indices", "shape")
+
     def __init__(self, full_shape, dtype, parent, indices, loc, name=None):
         super().__init__(name, loc)
         self.full_shape = full_shape
@@ -1113,15 +1732,18 @@ class AllocOp(Expr):
 
     """
 
+    __slots__ = ("shape", "fcompute", "uses", "axis", "device")
+
     def __init__(self, name, shape, dtype, loc):
         super().__init__(name, loc)
         self.shape = shape
         self.dtype = dtype
         # an optional reference to python function that computes the tensor
         self.fcompute = None
-        # uses is a list of ComputeOp that uses the tensor produced by this op
-        # we need such list to support create_schedule without an enclosing function
-        self.uses = []
+        # use-def index: the nodes referring to this tensor through their
+        # `tensor` attribute (loads, stores, stages, and schedule primitives),
+        # maintained whenever such an attribute is set
+        self.uses = UseList()
         # Axes, a list of loop handles corresponding to the loop axes
         self.axis = []
         # the device where the tensor is allocated
@@ -1137,6 +1759,18 @@ class AllocOp(Expr):
         code_str += f"{self.name} = alloc({self.shape}, {self.dtype})"
         return code_str
 
+    def __getstate__(self):
+        # the use-def index is rebuilt as the users are restored
+        return {attr: value for attr, value in node_attrs(self) if attr != "uses"}
+
+    def __setstate__(self, state):
+        for attr, value in state.items():
+            object.__setattr__(self, attr, value)
+        try:
+            object.__getattribute__(self, "uses")
+        except AttributeError:
+            object.__setattr__(self, "uses", UseList())
+
     def __getitem__(self, indices):
         if not isinstance(indices, tuple):
             indices = (indices,)
@@ -1219,6 +1853,19 @@ class AllocOp(Expr):
 class ComputeOp(Operation):
     """Compute operation"""
 
+    __slots__ = (
+        "fcompute",
+        "shape",
+        "dtype",
+        "body",
+        "iter_vars",
+        "reduce_vars",
+        "aux_tensor",
+        "input_tensors",
+        "tensor",
+        "kind",
+    )
+
     def __init__(self, name, shape, fcompute, dtype, loc, tensor=None):
         super().__init__(name, loc)
         self.fcompute = fcompute
@@ -1268,6 +1915,8 @@ class ComputeOp(Operation):
 
 
 class IfOp(Operation):
+    __slots__ = ("cond", "body", "else_body", "else_branch_valid")
+
     def __init__(self, cond, loc):
         super().__init__("if", loc)
         self.cond = immediate_to_constant(cond, loc)
@@ -1294,6 +1943,8 @@ class IfOp(Operation):
 
 
 class ElseOp(Operation):
+    __slots__ = ("body",)
+
     def __init__(self, loc):
         super().__init__("else", loc)
         self.body = []
@@ -1311,6 +1962,8 @@ class ElseOp(Operation):
 
 
 class ElseIfOp(Operation):
+    __slots__ = ("cond", "body")
+
     def __init__(self, cond, loc):
         super().__init__("elseif", loc)
         self.cond = cond
@@ -1331,6 +1984,9 @@ class ElseIfOp(Operation):
 class IterVar(Expr):
     """Iteration variable."""
 
+    __slots__ = ("parent_loop",)
+    _type_deps = ()
+
     def __init__(self, name, parent_loop, loc):
         super().__init__(name, loc)
         self.parent_loop = parent_loop
@@ -1345,6 +2001,8 @@ class IterVar(Expr):
 class ReduceVar(IterVar):
     """Reduction variable."""
 
+    __slots__ = ("bound",)
+
     def __init__(self, name, parent_loop, loc, bound=None):
         super().__init__(name, parent_loop, loc)
         self.bound = bound
@@ -1359,6 +2017,8 @@ class ReduceVar(IterVar):
 
 
 class ReturnOp(Operation):
+    __slots__ = ("expr",)
+
     def __init__(self, expr, loc):
         super().__init__("return", loc)
         self.expr = expr
@@ -1375,6 +2035,8 @@ class ReturnOp(Operation):
 
 
 class ForOp(Operation):
+    __slots__ = ("tag", "low", "high", "step", "body", "iter_var")
+
     def __init__(self, tag, name, low, high, step, loc):
         super().__init__("for", loc)
         self.tag = tag
@@ -1398,6 +2060,8 @@ class ForOp(Operation):
 
 
 class WhileOp(Operation):
+    __slots__ = ("cond", "body")
+
     def __init__(self, cond, loc):
         super().__init__("while", loc)
         self.cond = cond
@@ -1416,6 +2080,15 @@ class WhileOp(Operation):
 
 
 class FuncOp(Operation):
+    __slots__ = (
+        "args",
+        "body",
+        "return_tensors",
+        "body_ip",
+        "python_callable",
+        "prototype",
+    )
+
     def __init__(self, name, args, body, loc):
         super().__init__("func", loc)
         self.name = name
@@ -1446,6 +2119,9 @@ class FuncOp(Operation):
 
 
 class CallOp(Expr):
+    __slots__ = ("args", "rets")
+    _type_deps = ("rets",)
+
     def __init__(self, name, args, rets, loc):
         super().__init__(name, loc)
         self.name = name
@@ -1464,6 +2140,10 @@ class CallOp(Expr):
 
 @register_type_rules(select_rule)
 class SelectOp(Expr):
+    __slots__ = ("cond", "true_value", "false_value")
+    _type_deps = ("true_value", "false_value")
+    _canonical_deps = ("cond",)
+
     def __init__(self, cond, true_value, false_value, loc):
         super().__init__("select", loc)
         self.cond = cond
@@ -1477,6 +2157,8 @@ class SelectOp(Expr):
 
 
 class StructConstructOp(Expr):
+    __slots__ = ("args",)
+
     def __init__(self, args, dtype, loc):
         super().__init__("struct", loc)
         self.args = args
@@ -1488,6 +2170,9 @@ class StructConstructOp(Expr):
 
 
 class StructGetOp(Expr):
+    __slots__ = ("struct", "field")
+    _type_deps = ("struct", "field")
+
     def __init__(self, struct, field, loc):
         super().__init__("struct_get", loc)
         self.struct = struct
@@ -1500,6 +2185,8 @@ class StructGetOp(Expr):
 
 
 class ReduceOp(Expr):
+    __slots__ = ("expr", "scalar", "body", "reduce_op", "axis", "init")
+
     def __init__(self, name, expr, reduce_op, axis, dtype, init, loc):
         super().__init__("reduce", loc)
         self.name = name
@@ -1525,6 +2212,8 @@ class ReduceOp(Expr):
 
 
 class PrintOp(Operation):
+    __slots__ = ("args", "fmt")
+
     def __init__(self, args, fmt, loc):
         super().__init__("print", loc)
         self.args = args
@@ -1543,6 +2232,8 @@ class PrintOp(Operation):
 
 
 class PrintTensorOp(Operation):
+    __slots__ = ("tensor",)
+
     def __init__(self, tensor, loc):
         super().__init__("print_tensor", loc)
         self.tensor = tensor
@@ -1557,6 +2248,8 @@ class PrintTensorOp(Operation):
 
 # Customization Operations
 class OpHandle(Expr):
+    __slots__ = ("is_customize_op",)
+
     def __init__(self, name, loc):
         super().__init__("op_handle", loc)
         self.name = name
@@ -1572,6 +2265,8 @@ class OpHandle(Expr):
 
 
 class LoopHandle(Expr):
+    __slots__ = ("op_hdl", "is_customize_op")
+
     def __init__(self, op_hdl, name, loc):
         super().__init__("loop_handle", loc)
         self.op_hdl = op_hdl
@@ -1588,6 +2283,8 @@ class LoopHandle(Expr):
 
 
 class PartitionOp(Operation):
+    __slots__ = ("tensor", "kind", "dim", "factor", "is_customize_op")
+
     def __init__(self, tensor, kind, dim, factor, loc):
         super().__init__("partition", loc)
         self.tensor = tensor
@@ -1605,6 +2302,8 @@ class PartitionOp(Operation):
 
 
 class ReplaceOp(Operation):
+    __slots__ = ("src_tensor", "dst_tensor", "is_customize_op")
+
     def __init__(self, src_tensor, dst_tensor, loc):
         super().__init__("replace", loc)
         self.src_tensor = src_tensor
@@ -1620,6 +2319,8 @@ class ReplaceOp(Operation):
 
 
 class ReshapeOp(Operation):
+    __slots__ = ("tensor", "shape", "is_customize_op")
+
     def __init__(self, tensor, shape, loc):
         super().__init__("reshape", loc)
         self.tensor = tensor
@@ -1635,6 +2336,8 @@ class ReshapeOp(Operation):
 
 
 class ReformOp(Operation):
+    __slots__ = ("target", "layout", "is_customize_op")
+
     def __init__(self, target, layout, loc):
         super().__init__("reform", loc)
         self.target = target
@@ -1650,6 +2353,8 @@ class ReformOp(Operation):
 
 
 class ReuseAtOp(Operation):
+    __slots__ = ("target", "axis", "is_customize_op")
+
     def __init__(self, target, axis, loc):
         super().__init__("reuse_at", loc)
         self.target = target
@@ -1665,6 +2370,8 @@ class ReuseAtOp(Operation):
 
 
 class BufferAtOp(Operation):
+    __slots__ = ("target", "axis", "is_customize_op")
+
     def __init__(self, target, axis, loc):
         super().__init__("buffer_at", loc)
         self.target = target
@@ -1680,6 +2387,8 @@ class BufferAtOp(Operation):
 
 
 class InterKernelToOp(Operation):
+    __slots__ = ("tensor", "stage", "fifo_depth", "is_customize_op")
+
     def __init__(self, tensor, stage, fifo_depth, loc):
         super().__init__("inter_kernel_to", loc)
         self.tensor = tensor
@@ -1698,6 +2407,8 @@ class InterKernelToOp(Operation):
 
 
 class OutlineOp(Operation):
+    __slots__ = ("stage_hdls", "unify", "axis", "is_customize_op")
+
     def __init__(self, stage_hdls, loc):
         super().__init__("outline", loc)
         self.stage_hdls = stage_hdls
@@ -1714,6 +2425,8 @@ class OutlineOp(Operation):
 
 
 class ReorderOp(Operation):
+    __slots__ = ("args", "is_customize_op")
+
     def __init__(self, args, loc):
         super().__init__("reorder", loc)
         self.args = args
@@ -1728,6 +2441,8 @@ class ReorderOp(Operation):
 
 
 class SplitOp(Operation):
+    __slots__ = ("parent", "factor", "results", "is_customize_op")
+
     def __init__(self, stage_hdl, parent, factor, loc):
         super().__init__("split", loc)
         self.parent = parent
@@ -1747,6 +2462,15 @@ class SplitOp(Operation):
 
 
 class TileOp(Operation):
+    __slots__ = (
+        "x_parent",
+        "y_parent",
+        "x_factor",
+        "y_factor",
+        "results",
+        "is_customize_op",
+    )
+
     def __init__(self, stage_hdl, x_parent, y_parent, x_factor, y_factor, loc):
         super().__init__("tile", loc)
         self.x_parent = x_parent
@@ -1770,6 +2494,8 @@ class TileOp(Operation):
 
 
 class PipelineOp(Operation):
+    __slots__ = ("target", "ii", "is_customize_op")
+
     def __init__(self, target, ii, loc):
         super().__init__("pipeline", loc)
         self.target = target
@@ -1785,6 +2511,8 @@ class PipelineOp(Operation):
 
 
 class UnrollOp(Operation):
+    __slots__ = ("target", "factor", "is_customize_op")
+
     def __init__(self, target, factor, loc):
         super().__init__("unroll", loc)
         self.target = target
@@ -1800,6 +2528,8 @@ class UnrollOp(Operation):
 
 
 class ParallelOp(Operation):
+    __slots__ = ("target", "is_customize_op")
+
     def __init__(self, target, loc):
         super().__init__("parallel", loc)
         self.target = target
@@ -1814,6 +2544,8 @@ class ParallelOp(Operation):
 
 
 class FuseOp(Operation):
+    __slots__ = ("arg_list", "is_customize_op")
+
     def __init__(self, arg_list, loc):
         super().__init__("fuse", loc)
         self.arg_list = arg_list
@@ -1828,6 +2560,8 @@ class FuseOp(Operation):
 
 
 class ComputeAtOp(Operation):
+    __slots__ = ("stage", "parent", "axis", "is_customize_op")
+
     def __init__(self, stage, parent, axis, loc):
         super().__init__("compute_at", loc)
         self.stage = stage
@@ -1846,6 +2580,8 @@ class ComputeAtOp(Operation):
 
 
 class SystolicOp(Operation):
+    __slots__ = ("target", "is_customize_op")
+
     def __init__(self, target, loc):
         super().__init__("systolic", loc)
         self.target = target
@@ -1878,12 +2614,169 @@ class AST:
         return code_str
 
 
+def clone(op, memo=None, copy_tensors=True):
+    """Copy a graph of AST nodes.
+
+    Every node reachable from `op` through its attributes (and lists of
+    them) is copied once, so that the sharing between nodes, e.g., of a
+    tensor by its loads or of an iteration variable by its loop body, is
+    preserved in the copy. Other values (types, locations, Python
+    functions) are shared with the original. Unlike copy.deepcopy, the
+    copy is done without recursion and keeps the use-def index of the
+    tensors up to date.
+
+    Parameters
+    ----------
+    op : Operation or Expr or AST or list
+        the root(s) of the graph to copy
+    memo : dict, optional
+        maps the id of an original node to its copy; it can be seeded to
+        substitute nodes, e.g., tensors, and is updated with the copies
+    copy_tensors : bool, optional
+        whether AllocOps are copied, or shared with the original
+
+    Returns
+    -------
+    the copy of `op`
+    """
+    if memo is None:
+        memo = {}
+    pending = []
+
+    def copy_value(value):
+        if isinstance(value, list):
+            return [copy_value(v) for v in value]
+        if isinstance(value, tuple):
+            return tuple(copy_value(v) for v in value)
+        if not isinstance(value, (Operation, Expr, AST)):
+            return value
+        new_node = memo.get(id(value))
+        if new_node is None:
+            if not copy_tensors and isinstance(value, AllocOp):
+                new_node = value
+            else:
+                new_node = object.__new__(type(value))
+                pending.append((value, new_node))
+            memo[id(value)] = new_node
+        return new_node
+
+    new_op = copy_value(op)
+    copies = []
+    while pending:
+        node, new_node = pending.pop()
+        for attr, value in list(node_attrs(node)):
+            if attr == "uses":
+                # filled by the copies of the users below
+                value = UseList()
+            elif attr == "_canonical_cache":
+                # the operands may be substituted in the copy
+                value = None
+            else:
+                value = copy_value(value)
+            object.__setattr__(new_node, attr, value)
+        copies.append(new_node)
+    for new_node in copies:
+        tensor = node_tensor(new_node)
+        if isinstance(tensor, AllocOp):
+            tensor.uses.append(new_node)
+    return new_op
+
+
+def _memoize(infer_fn):
+    """Memoize the inferred type on the expression for the current epoch."""
+
+    def wrapper(self, expr):
+        cache = expr._type_cache
+        if cache is not None and cache[0] == TypeInference.epoch:
+            return cache[1]
+        res_type = infer_fn(self, expr)
+        expr._type_cache = (TypeInference.epoch, res_type)
+        return res_type
+
+    return wrapper
+
+
+_MATH_OPS = (
+    MathExpOp,
+    MathPowOp,
+    MathLogOp,
+    MathLog2Op,
+    MathLog10Op,
+    MathSqrtOp,
+    MathSinOp,
+    MathCosOp,
+    MathTanOp,
+    MathTanhOp,
+)
+
+
+def _type_operands(expr):
+    """The operands whose types the type of `expr` is inferred from."""
+    if isinstance(expr, LoadOp):
+        return ()
+    if isinstance(expr, BinaryOp):
+        return (expr.lhs, expr.rhs)
+    if isinstance(expr, SelectOp):
+        return (expr.true_value, expr.false_value)
+    if isinstance(expr, CallOp):
+        return (expr.rets[0],)
+    if isinstance(expr, (SetBitOp, SetSliceOp, BitReverseOp, Neg, *_MATH_OPS)):
+        return (expr.expr,)
+    return ()
+
+
+def _is_pending(expr):
+    """Whether the type of `expr` depends on operands and is not memoized."""
+    cache = getattr(expr, "_type_cache", None)
+    if cache is not None and cache[0] == TypeInference.epoch:
+        return False
+    return bool(_type_operands(expr))
+
+
 class TypeInference:
-    """A type inference engine for HeteroCL programs."""
+    """A type inference engine for HeteroCL programs.
+
+    The types of operations built from operands (e.g., binary, math, and
+    select operations) are memoized on the nodes. The cache is tagged with an
+    epoch that is bumped whenever an operand or a data type is re-assigned
+    after construction, e.g., when a scheme quantizes a tensor.
+    """
+
+    epoch = 0
 
-    # pylint: disable=too-many-return-statements
     def infer(self, expr):
-        """Infer the type of an expression"""
+        """Infer the type of an expression
+
+        The operands are inferred bottom-up with an explicit stack before
+        the expression itself, and their types are memoized, so that deep
+        expressions do not recurse.
+        """
+        cache = getattr(expr, "_type_cache", None)
+        if cache is not None and cache[0] == TypeInference.epoch:
+            return cache[1]
+        if any(_is_pending(x) for x in _type_operands(expr)):
+            walk(expr, _type_operands, pre=_is_pending, post=self._infer_operand)
+        return self.infer_node(expr)
+
+    def infer_result(self, expr):
+        """Infer the type of the result of an expression.
+
+        The type inferred for a comparison is a tuple of the type of its
+        operands and its own; only the latter is returned.
+        """
+        res_type = self.infer(expr)
+        if isinstance(res_type, tuple):
+            return res_type[-1]
+        return res_type
+
+    def _infer_operand(self, expr):
+        res_type = self.infer_node(expr)
+        if isinstance(expr, Expr):
+            expr._type_cache = (TypeInference.epoch, res_type)
+
+    # pylint: disable=too-many-return-statements
+    def infer_node(self, expr):
+        """Infer the type of an expression from the types of its operands"""
         if isinstance(expr, LoadOp):
             return self.infer_load(expr)
         if isinstance(expr, BinaryOp):
@@ -1913,35 +2806,17 @@ class TypeInference:
             return self.infer(expr.rets[0])
         if isinstance(expr, Neg):
             return self.infer(expr.expr)
-        # math ops
-        if isinstance(
-            expr,
-            (
-                MathExpOp,
-                MathPowOp,
-                MathLogOp,
-                MathLog2Op,
-                MathLog10Op,
-                MathSqrtOp,
-                MathSinOp,
-                MathCosOp,
-                MathTanOp,
-                MathTanhOp,
-            ),
-        ):
+        if isinstance(expr, _MATH_OPS):
             return self.infer_math(expr)
 
         raise APIError(
             f"Type inference method not defined for expression of type: {type(expr)} in TypeInference.infer"
         )
 
+    @_memoize
     def infer_binary(self, expr):
-        lhs_type = self.infer(expr.lhs)
-        rhs_type = self.infer(expr.rhs)
-        if isinstance(lhs_type, tuple):
-            lhs_type = lhs_type[-1]
-        if isinstance(rhs_type, tuple):
-            rhs_type = rhs_type[-1]
+        lhs_type = self.infer_result(expr.lhs)
+        rhs_type = self.infer_result(expr.rhs)
         # find the rule set based on the operation type
         type_rule = get_type_rules(type(expr))
         res_type = type_rule(lhs_type, rhs_type)
@@ -1952,6 +2827,7 @@ class TypeInference:
                 res_type = Int(128) if isinstance(res_type, Int) else UInt(128)
         return res_type
 
+    @_memoize
     def infer_math(self, expr):
         input_type = self.infer(expr.expr)
         if isinstance(input_type, tuple):
@@ -1961,6 +2837,7 @@ class TypeInference:
         res_type = type_rule(input_type)
         return res_type
 
+    @_memoize
     def infer_select(self, expr):
         true_type = self.infer(expr.true_value)
         false_type = self.infer(expr.false_value)
@@ -1973,3 +2850,19 @@ class TypeInference:
 
     def infer_const(self, expr):
         return expr.dtype
+
+
+# Type inference is stateless, so all expressions share one engine
+# instead of allocating an instance per node
+Expr.tinf_engine = TypeInference()
+
+# Binary operations that are folded natively when both operands are constants
+_INT_BINARY_FUNCS = {
+    LeftShiftOp: lambda a, b: a << b,
+    RightShiftOp: lambda a, b: a >> b,
+    And: lambda a, b: a & b,
+    Or: lambda a, b: a | b,
+    XOr: lambda a, b: a ^ b,
+    LogicalAnd: lambda a, b: a and b,
+    LogicalOr: lambda a, b: a or b,
+}
@@ -1,118 +1,110 @@
 # Copyright HeteroCL authors. All Rights Reserved.
 # SPDX-License-Identifier: Apache-2.0
-# pylint: disable=unused-argument, too-many-public-methods, too-many-branches
+# pylint: disable=unused-argument, too-many-public-methods
 
 from hcl_mlir.exceptions import HCLNotImplementedError
 from . import ast
 
 
+class TypeDispatcher:
+    """Map node classes to handlers.
+
+    A node class is handled by the entry of the first class in `table`
+    it is a subclass of, so more specific classes must come first, as
+    in an `isinstance` chain. The resolution is cached per class.
+
+    Parameters
+    ----------
+    table : list of tuple
+        (class, handler) pairs in matching order
+    """
+
+    __slots__ = ("table", "cache")
+
+    def __init__(self, table):
+        self.table = tuple(table)
+        # class -> handler, or None if no entry matches
+        self.cache = {}
+
+    def resolve(self, cls):
+        """Return the handler of `cls` and cache it."""
+        handler = None
+        for base, entry in self.table:
+            if issubclass(cls, base):
+                handler = entry
+                break
+        self.cache[cls] = handler
+        return handler
+
+
 class ASTVisitor:
+    # visitor method of each node class
+    dispatcher = TypeDispatcher(
+        [
+            (ast.AST, "visit_ast"),
+            (ast.ComputeOp, "visit_compute"),
+            (ast.IterVar, "visit_iter_var"),
+            (ast.ReduceOp, "visit_reduce"),
+            (ast.AllocOp, "visit_alloc"),
+            (ast.Cmp, "visit_cmp"),
+            (ast.BinaryOp, "visit_binary"),
+            (ast.MathTanhOp, "visit_math_tanh"),
+            (ast.BitCastOp, "visit_bitcast"),
+            (ast.LoadOp, "visit_load"),
+            (ast.StoreOp, "visit_store"),
+            (ast.ConstantOp, "visit_constant"),
+            (ast.CastOp, "visit_cast"),
+            (ast.IfOp, "visit_if"),
+            (ast.ForOp, "visit_for"),
+            (ast.WhileOp, "visit_while"),
+            (ast.SelectOp, "visit_select"),
+            (ast.PrintOp, "visit_print"),
+            (ast.PrintTensorOp, "visit_print_tensor"),
+            (ast.GetBitOp, "visit_get_bit"),
+            (ast.GetSliceOp, "visit_get_slice"),
+            (ast.SetBitOp, "visit_set_bit"),
+            (ast.SetSliceOp, "visit_set_slice"),
+            (ast.BitReverseOp, "visit_bit_reverse"),
+            (ast.ConstantTensorOp, "visit_constant_tensor"),
+            (ast.StructConstructOp, "visit_struct_construct"),
+            (ast.StructGetOp, "visit_struct_get"),
+            (ast.FuncOp, "visit_func"),
+            (ast.CallOp, "visit_call"),
+            (ast.Neg, "visit_neg"),
+            (ast.OpHandle, "visit_op_handle"),
+            (ast.LoopHandle, "visit_loop_handle"),
+            (ast.ReuseAtOp, "visit_reuse_at"),
+            (ast.PartitionOp, "visit_partition"),
+            (ast.ReplaceOp, "visit_replace"),
+            (ast.ReshapeOp, "visit_reshape"),
+            (ast.ReformOp, "visit_reform"),
+            (ast.BufferAtOp, "visit_buffer_at"),
+            (ast.InterKernelToOp, "visit_inter_kernel_to"),
+            (ast.OutlineOp, "visit_outline"),
+            (ast.ReorderOp, "visit_reorder"),
+            (ast.SplitOp, "visit_split"),
+            (ast.TileOp, "visit_tile"),
+            (ast.PipelineOp, "visit_pipeline"),
+            (ast.UnrollOp, "visit_unroll"),
+            (ast.ParallelOp, "visit_parallel"),
+            (ast.FuseOp, "visit_fuse"),
+            (ast.ComputeAtOp, "visit_compute_at"),
+            (ast.SystolicOp, "visit_systolic"),
+        ]
+    )
+
     def __init__(self, name):
         self.name = name
 
     def visit(self, op, *args, **kwargs):
-        if isinstance(op, ast.AST):
-            self.visit_ast(op, *args, **kwargs)
-        elif isinstance(op, ast.ComputeOp):
-            self.visit_compute(op, *args, **kwargs)
-        elif isinstance(op, ast.IterVar):
-            self.visit_iter_var(op, *args, **kwargs)
-        elif isinstance(op, ast.ReduceOp):
-            self.visit_reduce(op, *args, **kwargs)
-        elif isinstance(op, ast.AllocOp):
-            self.visit_alloc(op, *args, **kwargs)
-        elif isinstance(op, ast.Cmp):
-            self.visit_cmp(op, *args, **kwargs)
-        elif isinstance(op, ast.BinaryOp):
-            self.visit_binary(op, *args, **kwargs)
-        elif isinstance(op, ast.MathTanhOp):
-            self.visit_math_tanh(op, *args, **kwargs)
-        elif isinstance(op, ast.BitCastOp):
-            self.visit_bitcast(op, *args, **kwargs)
-        elif isinstance(op, ast.LoadOp):
-            self.visit_load(op, *args, **kwargs)
-        elif isinstance(op, ast.StoreOp):
-            self.visit_store(op, *args, **kwargs)
-        elif isinstance(op, ast.ConstantOp):
-            self.visit_constant(op, *args, **kwargs)
-        elif isinstance(op, ast.CastOp):
-            self.visit_cast(op, *args, **kwargs)
-        elif isinstance(op, ast.IfOp):
-            self.visit_if(op, *args, **kwargs)
-        elif isinstance(op, ast.ForOp):
-            self.visit_for(op, *args, **kwargs)
-        elif isinstance(op, ast.WhileOp):
-            self.visit_while(op, *args, **kwargs)
-        elif isinstance(op, ast.SelectOp):
-            self.visit_select(op, *args, **kwargs)
-        elif isinstance(op, ast.PrintOp):
-            self.visit_print(op, *args, **kwargs)
-        elif isinstance(op, ast.PrintTensorOp):
-            self.visit_print_tensor(op, *args, **kwargs)
-        elif isinstance(op, ast.GetBitOp):
-            self.visit_get_bit(op, *args, **kwargs)
-        elif isinstance(op, ast.GetSliceOp):
-            self.visit_get_slice(op, *args, **kwargs)
-        elif isinstance(op, ast.SetBitOp):
-            self.visit_set_bit(op, *args, **kwargs)
-        elif isinstance(op, ast.SetSliceOp):
-            self.visit_set_slice(op, *args, **kwargs)
-        elif isinstance(op, ast.BitReverseOp):
-            self.visit_bit_reverse(op, *args, **kwargs)
-        elif isinstance(op, ast.ConstantTensorOp):
-            self.visit_constant_tensor(op, *args, **kwargs)
-        elif isinstance(op, ast.StructConstructOp):
-            self.visit_struct_construct(op, *args, **kwargs)
-        elif isinstance(op, ast.StructGetOp):
-            self.visit_struct_get(op, *args, **kwargs)
-        elif isinstance(op, ast.FuncOp):
-            self.visit_func(op, *args, **kwargs)
-        elif isinstance(op, ast.CallOp):
-            self.visit_call(op, *args, **kwargs)
-        elif isinstance(op, ast.Neg):
-            self.visit_neg(op, *args, **kwargs)
-        elif isinstance(op, ast.OpHandle):
-            self.visit_op_handle(op, *args, **kwargs)
-        elif isinstance(op, ast.LoopHandle):
-            self.visit_loop_handle(op, *args, **kwargs)
-        elif isinstance(op, ast.ReuseAtOp):
-            self.visit_reuse_at(op, *args, **kwargs)
-        elif isinstance(op, ast.PartitionOp):
-            self.visit_partition(op, *args, **kwargs)
-        elif isinstance(op, ast.ReplaceOp):
-            self.visit_replace(op, *args, **kwargs)
-        elif isinstance(op, ast.ReshapeOp):
-            self.visit_reshape(op, *args, **kwargs)
-        elif isinstance(op, ast.ReformOp):
-            self.visit_reform(op, *args, **kwargs)
-        elif isinstance(op, ast.BufferAtOp):
-            self.visit_buffer_at(op, *args, **kwargs)
-        elif isinstance(op, ast.InterKernelToOp):
-            self.visit_inter_kernel_to(op, *args, **kwargs)
-        elif isinstance(op, ast.OutlineOp):
-            self.visit_outline(op, *args, **kwargs)
-        elif isinstance(op, ast.ReorderOp):
-            self.visit_reorder(op, *args, **kwargs)
-        elif isinstance(op, ast.SplitOp):
-            self.visit_split(op, *args, **kwargs)
-        elif isinstance(op, ast.TileOp):
-            self.visit_tile(op, *args, **kwargs)
-        elif isinstance(op, ast.PipelineOp):
-            self.visit_pipeline(op, *args, **kwargs)
-        elif isinstance(op, ast.UnrollOp):
-            self.visit_unroll(op, *args, **kwargs)
-        elif isinstance(op, ast.ParallelOp):
-            self.visit_parallel(op, *args, **kwargs)
-        elif isinstance(op, ast.FuseOp):
-            self.visit_fuse(op, *args, **kwargs)
-        elif isinstance(op, ast.ComputeAtOp):
-            self.visit_compute_at(op, *args, **kwargs)
-        elif isinstance(op, ast.SystolicOp):
-            self.visit_systolic(op, *args, **kwargs)
-        else:
+        cls = type(op)
+        cache = self.dispatcher.cache
+        method = cache[cls] if cls in cache else self.dispatcher.resolve(cls)
+        if method is None:
             raise HCLNotImplementedError(
-                f"{type(op)}'s {self.name} visitor is not implemented yet."
+                f"{cls}'s {self.name} visitor is not implemented yet."
             )
+        getattr(self, method)(op, *args, **kwargs)
 
     def visit_ast(self, _ast, *args, **kwargs):
         return
@@ -189,7 +181,7 @@ class ASTVisitor:
     def visit_constant_tensor(self, op, *args, **kwargs):
         return
 
-    def visit_struct_constuct(self, op, *args, **kwargs):
+    def visit_struct_construct(self, op, *args, **kwargs):
         return
 
     def visit_struct_get(self, op, *args, **kwargs):
@@ -2,27 +2,105 @@
 # SPDX-License-Identifier: Apache-2.0
 # pylint: disable=too-many-public-methods
 
+from . import ast
 from . import ast_visitor
 
 
 class ASTCleaner(ast_visitor.ASTVisitor):
+    """Reset the MLIR operations and values attached to the AST nodes.
+
+    The nodes are walked with an explicit stack, each visit_* method only
+    cleans its own node, and the nodes to walk into are listed in
+    `operands`.
+    """
+
+    # attributes holding the nodes cleaned after each node class
+    operands = ast_visitor.TypeDispatcher(
+        [
+            (ast.AST, ("region",)),
+            (ast.ComputeOp, ("tensor", "aux_tensor", "body")),
+            (ast.ReduceOp, ("scalar", "expr")),
+            (ast.Cmp, ("lhs", "rhs")),
+            (ast.BinaryOp, ("lhs", "rhs")),
+            (ast.MathTanhOp, ("expr",)),
+            (ast.BitCastOp, ("expr",)),
+            (ast.StoreOp, ("value",)),
+            (ast.CastOp, ("expr",)),
+            (ast.IfOp, ("cond", "body", "else_body")),
+            (ast.ForOp, ("body",)),
+            (ast.WhileOp, ("cond", "body")),
+            (ast.SelectOp, ("cond", "true_value", "false_value")),
+            (ast.PrintOp, ("args",)),
+            (ast.PrintTensorOp, ("tensor",)),
+            (ast.GetBitOp, ("expr", "index")),
+            (ast.GetSliceOp, ("expr", "start", "end")),
+            (ast.SetBitOp, ("expr", "index", "value")),
+            (ast.SetSliceOp, ("expr", "start", "end", "value")),
+            (ast.BitReverseOp, ("expr",)),
+            (ast.StructConstructOp, ("args",)),
+            (ast.StructGetOp, ("struct",)),
+            (ast.FuncOp, ("body", "return_tensors")),
+            (ast.CallOp, ("args",)),
+            (ast.Neg, ("expr",)),
+            (ast.LoopHandle, ("op_hdl",)),
+            (ast.ReuseAtOp, ("target", "axis")),
+            (ast.PartitionOp, ("tensor",)),
+            (ast.ReplaceOp, ("target", "src")),
+            (ast.ReshapeOp, ("tensor",)),
+            (ast.ReformOp, ("target",)),
+            (ast.BufferAtOp, ("target", "axis")),
+            (ast.InterKernelToOp, ("tensor", "stage")),
+            (ast.OutlineOp, ("stage_hdls",)),
+            (ast.ReorderOp, ("args",)),
+            (ast.SplitOp, ("parent",)),
+            (ast.TileOp, ("x_parent", "y_parent")),
+            (ast.PipelineOp, ("target",)),
+            (ast.UnrollOp, ("target",)),
+            (ast.ParallelOp, ("target",)),
+            (ast.FuseOp, ("arg_list",)),
+            (ast.ComputeAtOp, ("stage", "parent", "axis")),
+            (ast.SystolicOp, ("target",)),
+        ]
+    )
+
     def __init__(self) -> None:
         super().__init__("cleaner")
 
-    def visit_ast(self, _ast, *args, **kwargs):
-        for op in _ast.region:
-            self.visit(op, *args, **kwargs)
+    def visit(self, op, *args, **kwargs):
+        visited = set()
+
+        def enter(node):
+            if id(node) in visited:
+                return False
+            visited.add(id(node))
+            return True
+
+        def clean(node):
+            ast_visitor.ASTVisitor.visit(self, node, *args, **kwargs)
+
+        ast.walk(op, self.children, pre=enter, post=clean)
+
+    def children(self, op):
+        cls = type(op)
+        cache = self.operands.cache
+        attrs = cache[cls] if cls in cache else self.operands.resolve(cls)
+        if attrs is None:
+            return []
+        nodes = []
+        for attr in attrs:
+            if attr == "else_body" and not op.else_branch_valid:
+                continue
+            value = getattr(op, attr)
+            if isinstance(value, list):
+                nodes.extend(value)
+            else:
+                nodes.append(value)
+        return nodes
 
     def visit_func(self, op, *args, **kwargs):
         op.ir_op = None
-        for body_op in op.body:
-            self.visit(body_op, *args, **kwargs)
-        for ret in op.return_tensors:
-            self.visit(ret, *args, **kwargs)
 
     def visit_call(self, op, *args, **kwargs):
-        for arg in op.args:
-            self.visit(arg, *args, **kwargs)
         op.ir_op = None
         op.result = None
 
@@ -30,61 +108,37 @@ class ASTCleaner(ast_visitor.ASTVisitor):
         op.result = None
 
     def visit_compute(self, op, *args, **kwargs):
-        self.visit(op.tensor, *args, **kwargs)
-        self.visit(op.aux_tensor, *args, **kwargs)
-        for body_op in op.body:
-            self.visit(body_op, *args, **kwargs)
         op.ir_op = None
         op.result = None
 
     def visit_for(self, op, *args, **kwargs):
         op.iter_var.parent_loop = None
-        for body_op in op.body:
-            self.visit(body_op, *args, **kwargs)
-
-    def visit_while(self, op, *args, **kwargs):
-        self.visit(op.cond, *args, **kwargs)
-        for body_op in op.body:
-            self.visit(body_op, *args, **kwargs)
 
     def visit_alloc(self, op, *args, **kwargs):
         op.result = None
         op.ir_op = None
 
     def visit_binary(self, op, *args, **kwargs):
-        self.visit(op.lhs, *args, **kwargs)
-        self.visit(op.rhs, *args, **kwargs)
         op.result = None
         op.ir_op = None
 
     def visit_math_tanh(self, op, *args, **kwargs):
         op.result = None
         op.ir_op = None
-        self.visit(op.expr, *args, **kwargs)
 
     def visit_neg(self, op, *args, **kwargs):
-        self.visit(op.expr, *args, **kwargs)
         op.result = None
         op.ir_op = None
 
     def visit_cmp(self, op, *args, **kwargs):
-        self.visit(op.lhs, *args, **kwargs)
-        self.visit(op.rhs, *args, **kwargs)
         op.result = None
         op.ir_op = None
 
     def visit_load(self, op, *args, **kwargs):
-        # for index in op.index:
-        #   self.visit(index, *args, **kwargs)
-        # self.visit(op.tensor, *args, **kwargs)
         op.result = None
         op.ir_op = None
 
     def visit_store(self, op, *args, **kwargs):
-        # for index in op.index:
-        #     self.visit(index, *args, **kwargs)
-        # self.visit(op.tensor, *args, **kwargs)
-        self.visit(op.value, *args, **kwargs)
         op.ir_op = None
 
     def visit_constant(self, op, *args, **kwargs):
@@ -92,76 +146,47 @@ class ASTCleaner(ast_visitor.ASTVisitor):
         op.ir_op = None
 
     def visit_cast(self, op, *args, **kwargs):
-        self.visit(op.expr, *args, **kwargs)
         op.result = None
         op.ir_op = None
 
     def visit_if(self, op, *args, **kwargs):
-        self.visit(op.cond, *args, **kwargs)
-        for body_op in op.body:
-            self.visit(body_op, *args, **kwargs)
-        if op.else_branch_valid:
-            for body_op in op.else_body:
-                self.visit(body_op, *args, **kwargs)
         op.ir_op = None
 
     def visit_reduce(self, op, *args, **kwargs):
-        self.visit(op.scalar, *args, **kwargs)
-        self.visit(op.expr, *args, **kwargs)
-        self.ir_op = None
-        self.result = None
+        op.ir_op = None
+        op.result = None
 
     def visit_select(self, op, *args, **kwargs):
-        self.visit(op.cond, *args, **kwargs)
-        self.visit(op.true_value, *args, **kwargs)
-        self.visit(op.false_value, *args, **kwargs)
-        self.ir_op = None
-        self.result = None
+        op.ir_op = None
+        op.result = None
 
     def visit_bitcast(self, op, *args, **kwargs):
-        self.visit(op.expr, *args, **kwargs)
-        self.ir_op = None
-        self.result = None
+        op.ir_op = None
+        op.result = None
 
     def visit_print(self, op, *args, **kwargs):
-        for arg in op.args:
-            self.visit(arg, *args, **kwargs)
-        self.ir_op = None
+        op.ir_op = None
 
     def visit_print_tensor(self, op, *args, **kwargs):
-        self.visit(op.tensor, *args, **kwargs)
-        self.ir_op = None
+        op.ir_op = None
 
     def visit_get_bit(self, op, *args, **kwargs):
-        self.visit(op.expr, *args, **kwargs)
-        self.visit(op.index, *args, **kwargs)
-        self.ir_op = None
-        self.result = None
+        op.ir_op = None
+        op.result = None
 
     def visit_get_slice(self, op, *args, **kwargs):
-        self.visit(op.expr, *args, **kwargs)
-        self.visit(op.start, *args, **kwargs)
-        self.visit(op.end, *args, **kwargs)
-        self.ir_op = None
-        self.result = None
+        op.ir_op = None
+        op.result = None
 
     def visit_set_bit(self, op, *args, **kwargs):
-        self.visit(op.expr, *args, **kwargs)
-        self.visit(op.index, *args, **kwargs)
-        self.visit(op.value, *args, **kwargs)
-        self.ir_op = None
+        op.ir_op = None
 
     def visit_set_slice(self, op, *args, **kwargs):
-        self.visit(op.expr, *args, **kwargs)
-        self.visit(op.start, *args, **kwargs)
-        self.visit(op.end, *args, **kwargs)
-        self.visit(op.value, *args, **kwargs)
-        self.ir_op = None
+        op.ir_op = None
 
     def visit_bit_reverse(self, op, *args, **kwargs):
-        self.visit(op.expr, *args, **kwargs)
-        self.ir_op = None
-        self.result = None
+        op.ir_op = None
+        op.result = None
 
     def visit_constant_tensor(self, op, *args, **kwargs):
         op.ir_op = None
@@ -169,14 +194,11 @@ class ASTCleaner(ast_visitor.ASTVisitor):
         op.tensor.ir_op = None
         op.tensor.result = None
 
-    def visit_struct_constuct(self, op, *args, **kwargs):
-        for arg in op.args:
-            self.visit(arg, *args, **kwargs)
+    def visit_struct_construct(self, op, *args, **kwargs):
         op.ir_op = None
         op.result = None
 
     def visit_struct_get(self, op, *args, **kwargs):
-        self.visit(op.struct, *args, **kwargs)
         op.ir_op = None
         op.result = None
 
@@ -185,90 +207,60 @@ class ASTCleaner(ast_visitor.ASTVisitor):
         op.result = None
 
     def visit_loop_handle(self, op, *args, **kwargs):
-        self.visit(op.op_hdl, *args, **kwargs)
         op.ir_op = None
         op.result = None
 
     def visit_partition(self, op, *args, **kwargs):
-        self.visit(op.tensor, *args, **kwargs)
         op.ir_op = None
 
     def visit_replace(self, op, *args, **kwargs):
-        self.visit(op.target, *args, **kwargs)
-        self.visit(op.src, *args, **kwargs)
         op.ir_op = None
 
     def visit_reshape(self, op, *args, **kwargs):
-        self.visit(op.tensor, *args, **kwargs)
         op.ir_op = None
 
     def visit_reform(self, op, *args, **kwargs):
-        self.visit(op.target, *args, **kwargs)
         op.ir_op = None
 
     def visit_reuse_at(self, op, *args, **kwargs):
-        self.visit(op.target, *args, **kwargs)
-        self.visit(op.axis, *args, **kwargs)
         op.ir_op = None
         op.result = None
 
     def visit_buffer_at(self, op, *args, **kwargs):
-        self.visit(op.target, *args, **kwargs)
-        self.visit(op.axis, *args, **kwargs)
         op.ir_op = None
         op.result = None
 
     def visit_inter_kernel_to(self, op, *args, **kwargs):
-        self.visit(op.tensor, *args, **kwargs)
-        self.visit(op.stage, *args, **kwargs)
         op.ir_op = None
 
     def visit_outline(self, op, *args, **kwargs):
-        for hdl in op.stage_hdls:
-            self.visit(hdl, *args, **kwargs)
         op.ir_op = None
 
     def visit_reorder(self, op, *args, **kwargs):
-        for arg in op.args:
-            self.visit(arg, *args, **kwargs)
         op.ir_op = None
 
     def visit_split(self, op, *args, **kwargs):
-        self.visit(op.parent, *args, **kwargs)
         op.ir_op = None
         for loop in op.results:
             loop.result = None
 
     def visit_tile(self, op, *args, **kwargs):
-        self.visit(op.x_parent, *args, **kwargs)
-        self.visit(op.y_parent, *args, **kwargs)
         op.ir_op = None
         for loop in op.results:
             loop.result = None
 
     def visit_pipeline(self, op, *args, **kwargs):
-        self.visit(op.target, *args, **kwargs)
         op.ir_op = None
 
     def visit_unroll(self, op, *args, **kwargs):
-        self.visit(op.target, *args, **kwargs)
         op.ir_op = None
 
     def visit_parallel(self, op, *args, **kwargs):
-        self.visit(op.target, *args, **kwargs)
         op.ir_op = None
 
     def visit_fuse(self, op, *args, **kwargs):
-        for arg in op.arg_list:
-            self.visit(arg, *args, **kwargs)
         op.ir_op = None
         op.result = None
 
     def visit_compute_at(self, op, *args, **kwargs):
-        self.visit(op.stage, *args, **kwargs)
-        self.visit(op.parent, *args, **kwargs)
-        self.visit(op.axis, *args, **kwargs)
         op.ir_op = None
-
-    def visit_systolic(self, op, *args, **kwargs):
-        self.visit(op.target, *args, **kwargs)
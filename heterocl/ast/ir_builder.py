@@ -7,6 +7,12 @@
 
 # Import MLIR dialects
 # Naming rule: import dialect as dialect_d
+import hashlib
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 
 from hcl_mlir.dialects import (
@@ -48,171 +54,120 @@ from hcl_mlir.exceptions import (
     HCLNotImplementedError,
     MLIRLimitationError,
     HCLValueError,
+    PassWarning,
 )
 
 from . import ast
-from ..context import get_context, get_location
+from .. import serialize
+from ..context import exit_context, get_context, get_location, set_context
 from ..utils import hcl_dtype_to_mlir, get_extra_type_hints
 from .. import types as htypes
 from . import build_cleaner
+from .ast_visitor import TypeDispatcher
+
+
+# MLIR operation class of each binary and math op, as (type classes,
+# operation class) pairs checked in order against the result type
+_OP_CLASS_RULES = {
+    ast.Add: [
+        ((htypes.Int, htypes.UInt), arith_d.AddIOp),
+        (htypes.Float, arith_d.AddFOp),
+        ((htypes.Fixed, htypes.UFixed), hcl_d.AddFixedOp),
+    ],
+    ast.Sub: [
+        ((htypes.Int, htypes.UInt), arith_d.SubIOp),
+        (htypes.Float, arith_d.SubFOp),
+        ((htypes.Fixed, htypes.UFixed), hcl_d.SubFixedOp),
+    ],
+    ast.Mul: [
+        ((htypes.Int, htypes.UInt), arith_d.MulIOp),
+        (htypes.Float, arith_d.MulFOp),
+        ((htypes.Fixed, htypes.UFixed), hcl_d.MulFixedOp),
+    ],
+    ast.Div: [
+        (htypes.Int, arith_d.DivSIOp),
+        (htypes.UInt, arith_d.DivUIOp),
+        (htypes.Float, arith_d.DivFOp),
+        ((htypes.Fixed, htypes.UFixed), hcl_d.DivFixedOp),
+    ],
+    ast.Max: [
+        (htypes.Int, arith_d.MaxSIOp),
+        (htypes.UInt, arith_d.MaxUIOp),
+        (htypes.Float, arith_d.MaxFOp),
+        ((htypes.Fixed, htypes.UFixed), hcl_d.MaxFixedOp),
+    ],
+    ast.Min: [
+        (htypes.Int, arith_d.MinSIOp),
+        (htypes.UInt, arith_d.MinUIOp),
+        (htypes.Float, arith_d.MinFOp),
+        ((htypes.Fixed, htypes.UFixed), hcl_d.MinFixedOp),
+    ],
+    ast.FloorDiv: [(htypes.Int, arith_d.FloorDivSIOp)],
+    ast.Mod: [
+        (htypes.Int, arith_d.RemSIOp),
+        (htypes.UInt, arith_d.RemUIOp),
+        (htypes.Float, arith_d.RemFOp),
+    ],
+    ast.And: [((htypes.Int, htypes.UInt), arith_d.AndIOp)],
+    ast.Or: [((htypes.Int, htypes.UInt), arith_d.OrIOp)],
+    ast.XOr: [((htypes.Int, htypes.UInt), arith_d.XOrIOp)],
+    # the logical ops additionally require a 1-bit type
+    ast.LogicalAnd: [((htypes.Int, htypes.UInt), arith_d.AndIOp)],
+    ast.LogicalOr: [((htypes.Int, htypes.UInt), arith_d.OrIOp)],
+    ast.LogicalXOr: [((htypes.Int, htypes.UInt), arith_d.XOrIOp)],
+    ast.MathPowOp: [(htypes.Float, math_d.PowFOp)],
+    ast.LeftShiftOp: [((htypes.Int, htypes.UInt), arith_d.ShLIOp)],
+    ast.RightShiftOp: [
+        (htypes.Int, arith_d.ShRSIOp),
+        (htypes.UInt, arith_d.ShRUIOp),
+    ],
+    ast.MathExpOp: [(htypes.Float, math_d.ExpOp)],
+    ast.MathLogOp: [(htypes.Float, math_d.LogOp)],
+    ast.MathLog2Op: [(htypes.Float, math_d.Log2Op)],
+    ast.MathLog10Op: [(htypes.Float, math_d.Log10Op)],
+    ast.MathSqrtOp: [(htypes.Float, math_d.SqrtOp)],
+    ast.MathSinOp: [(htypes.Float, math_d.SinOp)],
+    ast.MathCosOp: [(htypes.Float, math_d.CosOp)],
+    ast.MathTanOp: [(htypes.Float, math_d.TanOp)],
+    ast.MathTanhOp: [(htypes.Float, math_d.TanhOp)],
+}
+_LOGICAL_OPS = (ast.LogicalAnd, ast.LogicalOr, ast.LogicalXOr)
+
+# binary operations allowed in an affine index
+_AFFINE_BINARY_OPS = (ast.Add, ast.Sub, ast.Mul, ast.Div, ast.Mod)
+# (op class, type class) -> operation class, or None if unsupported
+_op_class_cache = {}
+
+
+def _resolve_op_class(op_cls, typ_cls):
+    for ast_cls, rules in _OP_CLASS_RULES.items():
+        if issubclass(op_cls, ast_cls):
+            for typ_classes, op_class in rules:
+                if issubclass(typ_cls, typ_classes):
+                    return op_class
+            return None
+    return None
 
 
 def get_op_class(op, typ):
-    """Get the class of the given op
-    TODO: Consider using dictionary to store the mapping
+    """Get the MLIR operation class of the given op
+
+    The lookup is cached by the classes of the op and of its type.
     """
-    if isinstance(op, ast.Add):
-        if isinstance(typ, (htypes.Int, htypes.UInt)):
-            return arith_d.AddIOp
-        if isinstance(typ, htypes.Float):
-            return arith_d.AddFOp
-        if isinstance(typ, (htypes.Fixed, htypes.UFixed)):
-            return hcl_d.AddFixedOp
-        raise APIError(f"Unsupported type for AddOp: {typ}")
-    if isinstance(op, ast.Sub):
-        if isinstance(typ, (htypes.Int, htypes.UInt)):
-            return arith_d.SubIOp
-        if isinstance(typ, htypes.Float):
-            return arith_d.SubFOp
-        if isinstance(typ, (htypes.Fixed, htypes.UFixed)):
-            return hcl_d.SubFixedOp
-        raise APIError(f"Unsupported type for SubOp: {typ}")
-    if isinstance(op, ast.Mul):
-        if isinstance(typ, (htypes.Int, htypes.UInt)):
-            return arith_d.MulIOp
-        if isinstance(typ, htypes.Float):
-            return arith_d.MulFOp
-        if isinstance(typ, (htypes.Fixed, htypes.UFixed)):
-            return hcl_d.MulFixedOp
-        raise APIError(f"Unsupported type for MulOp: {typ}")
-    if isinstance(op, ast.Div):
-        if isinstance(typ, htypes.Int):
-            return arith_d.DivSIOp
-        if isinstance(typ, htypes.UInt):
-            return arith_d.DivUIOp
-        if isinstance(typ, htypes.Float):
-            return arith_d.DivFOp
-        if isinstance(typ, (htypes.Fixed, htypes.UFixed)):
-            return hcl_d.DivFixedOp
-        raise APIError(f"Unsupported type for DivOp: {typ}")
-    if isinstance(op, ast.Max):
-        if isinstance(typ, htypes.Int):
-            return arith_d.MaxSIOp
-        if isinstance(typ, htypes.UInt):
-            return arith_d.MaxUIOp
-        if isinstance(typ, htypes.Float):
-            return arith_d.MaxFOp
-        if isinstance(typ, (htypes.Fixed, htypes.UFixed)):
-            return hcl_d.MaxFixedOp
-        raise APIError(f"Unsupported type for MaxOp: {typ}")
-    if isinstance(op, ast.Min):
-        if isinstance(typ, htypes.Int):
-            return arith_d.MinSIOp
-        if isinstance(typ, htypes.UInt):
-            return arith_d.MinUIOp
-        if isinstance(typ, htypes.Float):
-            return arith_d.MinFOp
-        if isinstance(typ, (htypes.Fixed, htypes.UFixed)):
-            return hcl_d.MinFixedOp
-        raise APIError(f"Unsupported type for MinOp: {typ}")
-    if isinstance(op, ast.FloorDiv):
-        if isinstance(typ, htypes.Int):
-            return arith_d.FloorDivSIOp
-        raise APIError(f"Unsupported type for FloorDivOp: {typ}")
-    if isinstance(op, ast.Mod):
-        if isinstance(typ, htypes.Int):
-            return arith_d.RemSIOp
-        if isinstance(typ, htypes.UInt):
-            return arith_d.RemUIOp
-        if isinstance(typ, htypes.Float):
-            return arith_d.RemFOp
-        raise APIError(f"Unsupported type for ModOp: {typ}")
-    if isinstance(op, ast.And):
-        if isinstance(typ, (htypes.Int, htypes.UInt)):
-            return arith_d.AndIOp
-        raise APIError(f"Unsupported type for AndOp: {typ}")
-    if isinstance(op, ast.Or):
-        if isinstance(typ, (htypes.Int, htypes.UInt)):
-            return arith_d.OrIOp
-        raise APIError(f"Unsupported type for OrOp: {typ}")
-    if isinstance(op, ast.XOr):
-        if isinstance(typ, (htypes.Int, htypes.UInt)):
-            return arith_d.XOrIOp
-        raise APIError(f"Unsupported type for XOrOp: {typ}")
-    if isinstance(op, ast.Mod):
-        if isinstance(typ, htypes.Int):
-            return arith_d.RemSIOp
-        if isinstance(typ, htypes.UInt):
-            return arith_d.RemUIOp
-        if isinstance(typ, htypes.Float):
-            return arith_d.RemFOp
-        raise APIError(f"Unsupported type for ModOp: {typ}")
-    if isinstance(op, ast.LogicalAnd):
-        if isinstance(typ, (htypes.Int, htypes.UInt)) and typ.bits == 1:
-            return arith_d.AndIOp
-        raise APIError(f"Unsupported type for LogicalAndOp: {typ}")
-    if isinstance(op, ast.LogicalOr):
-        if isinstance(typ, (htypes.Int, htypes.UInt)) and typ.bits == 1:
-            return arith_d.OrIOp
-        raise APIError(f"Unsupported type for LogicalOrOp: {typ}")
-    if isinstance(op, ast.LogicalXOr):
-        if isinstance(typ, (htypes.Int, htypes.UInt)) and typ.bits == 1:
-            return arith_d.XOrIOp
-        raise APIError(f"Unsupported type for LogicalXOrOp: {typ}")
-    if isinstance(op, ast.MathPowOp):
-        if isinstance(typ, htypes.Float):
-            return math_d.PowFOp
-        raise APIError(f"Unsupported type for MathPowOp: {typ}")
-    if isinstance(op, ast.LeftShiftOp):
-        if isinstance(typ, (htypes.Int, htypes.UInt)):
-            return arith_d.ShLIOp
-        raise APIError(f"Unsupported type for LeftShiftOp: {typ}")
-    if isinstance(op, ast.RightShiftOp):
-        if isinstance(typ, htypes.Int):
-            return arith_d.ShRSIOp
-        if isinstance(typ, htypes.UInt):
-            return arith_d.ShRUIOp
-        raise APIError(f"Unsupported type for RightShiftOp: {typ}")
-    if isinstance(op, ast.MathExpOp):
-        if isinstance(typ, htypes.Float):
-            return math_d.ExpOp
-        raise APIError(f"Unsupported type for MathExpOp: {typ}")
-    if isinstance(op, ast.MathPowOp):
-        if isinstance(typ, htypes.Float):
-            return math_d.PowFOp
-        raise APIError(f"Unsupported type for MathPowOp: {typ}")
-    if isinstance(op, ast.MathLogOp):
-        if isinstance(typ, htypes.Float):
-            return math_d.LogOp
-        raise APIError(f"Unsupported type for MathLogOp: {typ}")
-    if isinstance(op, ast.MathLog2Op):
-        if isinstance(typ, htypes.Float):
-            return math_d.Log2Op
-        raise APIError(f"Unsupported type for MathLog2Op: {typ}")
-    if isinstance(op, ast.MathLog10Op):
-        if isinstance(typ, htypes.Float):
-            return math_d.Log10Op
-        raise APIError(f"Unsupported type for MathLog10Op: {typ}")
-    if isinstance(op, ast.MathSqrtOp):
-        if isinstance(typ, htypes.Float):
-            return math_d.SqrtOp
-        raise APIError(f"Unsupported type for MathSqrtOp: {typ}")
-    if isinstance(op, ast.MathSinOp):
-        if isinstance(typ, htypes.Float):
-            return math_d.SinOp
-        raise APIError(f"Unsupported type for MathSinOp: {typ}")
-    if isinstance(op, ast.MathCosOp):
-        if isinstance(typ, htypes.Float):
-            return math_d.CosOp
-        raise APIError(f"Unsupported type for MathCosOp: {typ}")
-    if isinstance(op, ast.MathTanOp):
-        if isinstance(typ, htypes.Float):
-            return math_d.TanOp
-        raise APIError(f"Unsupported type for MathTanOp: {typ}")
-    if isinstance(op, ast.MathTanhOp):
-        if isinstance(typ, htypes.Float):
-            return math_d.TanhOp
-        raise APIError(f"Unsupported type for MathTanhOp: {typ}")
+    key = (type(op), type(typ))
+    if key in _op_class_cache:
+        op_class = _op_class_cache[key]
+    else:
+        op_class = _op_class_cache[key] = _resolve_op_class(*key)
+    if op_class is not None:
+        if not isinstance(op, _LOGICAL_OPS) or typ.bits == 1:
+            return op_class
+    for ast_cls in _OP_CLASS_RULES:
+        if isinstance(op, ast_cls):
+            name = ast_cls.__name__
+            if not name.endswith("Op"):
+                name += "Op"
+            raise APIError(f"Unsupported type for {name}: {typ}")
     raise APIError(f"Unsupported op in get_op_class: {op}")
 
 
@@ -242,34 +197,275 @@ def get_struct_bitwidth(dtype):
     return bitwidth
 
 
+def encode_int_tensor(values, bitwidth):
+    """Encode an integer array into the byte layout of the target bitwidth.
+
+    Each element keeps its ceil(bitwidth / 8) least significant bytes
+    (in little-endian order), sign-extended if the target is wider than
+    the elements, and the result is returned as a structured array of
+    that item size, which can be passed to DenseElementsAttr.
+
+    The bytes are read through a strided view of the values, whatever
+    their layout and byte order, and written once into the output buffer.
+    Only the values that are not integers are converted to 64-bit
+    integers first, which is one more copy.
+    """
+    n_bytes = (bitwidth + 7) // 8
+    shape = values.shape
+    if values.dtype.kind not in "iub":
+        values = values.astype(np.int64)
+    itemsize = values.dtype.itemsize
+    # (..., itemsize) view of the bytes of each element, least significant
+    # first; the trailing axis of length 1 makes the reinterpretation legal
+    # for any strides
+    raw = values[..., None].view(np.uint8)
+    if values.dtype.byteorder == ">" or (
+        values.dtype.byteorder == "=" and sys.byteorder == "big"
+    ):
+        raw = raw[..., ::-1]
+    encoded = np.empty(shape + (n_bytes,), dtype=np.uint8)
+    low = min(n_bytes, itemsize)
+    np.copyto(encoded[..., :low], raw[..., :low])
+    if n_bytes > itemsize:
+        # the sign bit of each element fills the bytes above it
+        sign = encoded[..., itemsize]
+        if values.dtype.kind == "i":
+            np.right_shift(encoded[..., itemsize - 1], 7, out=sign)
+            np.multiply(sign, 0xFF, out=sign)
+        else:
+            sign[...] = 0
+        encoded[..., itemsize + 1 :] = sign[..., None]
+    # The bytes are copied verbatim into the attribute, so the fields
+    # are all unsigned and the sign bit is kept by two's complement.
+    encoded_dtype = np.dtype(
+        {
+            "names": [f"f{i}" for i in range(n_bytes)],
+            "formats": ["u1"] * n_bytes,
+            "offsets": list(range(n_bytes)),
+            "itemsize": n_bytes,
+        }
+    )
+    return encoded.view(encoded_dtype).reshape(shape)
+
+
+def _build_func_in_worker(data):
+    """Build a function serialized by `serialize.dumps_op` in a fresh
+    context.
+
+    Returns
+    -------
+    (str, bool, list of str)
+        the assembly of the function, whether it has bit operations,
+        and the names of the tensors it allocates
+    """
+    func = serialize.loads_op(data)
+    set_context()
+    try:
+        builder = IRBuilder(None)
+        with get_context(), get_location():
+            builder.build_visitor(func, InsertionPoint(builder.module.body))
+            asm = builder.module.operation.get_asm(enable_debug_info=True)
+    finally:
+        exit_context()
+    return asm, builder.BIT_OPS, list(builder.tensor_dict)
+
+
+def _is_independent(op):
+    """Whether a function can be built on its own, i.e., it does not emit
+    constant globals, which are shared by the module.
+    """
+    found = []
+
+    def pre(node):
+        if found:
+            return False
+        if isinstance(node, ast.ConstantTensorOp):
+            found.append(node)
+            return False
+        return True
+
+    ast.walk(op, ast.node_children, pre=pre)
+    return not found
+
+
 class IRBuilder:
     """IRBuilder class to build MLIR
     operations from intermediate layer
     """
 
+    # builder method of each node class, see build_visitor
+    dispatcher = TypeDispatcher(
+        [
+            (ast.ComputeOp, "build_compute"),
+            (ast.IterVar, "build_iter_var"),
+            (ast.ReduceOp, "build_reduce"),
+            (ast.AllocOp, "build_alloc_op"),
+            (ast.Cmp, "build_cmp_op"),
+            (ast.BinaryOp, "build_binary_op"),
+            (ast.MathExpOp, "build_math_op"),
+            (ast.MathPowOp, "build_math_op"),
+            (ast.MathLogOp, "build_math_op"),
+            (ast.MathLog2Op, "build_math_op"),
+            (ast.MathLog10Op, "build_math_op"),
+            (ast.MathSqrtOp, "build_math_op"),
+            (ast.MathSinOp, "build_math_op"),
+            (ast.MathCosOp, "build_math_op"),
+            (ast.MathTanOp, "build_math_op"),
+            (ast.MathTanhOp, "build_math_op"),
+            (ast.BitCastOp, "build_bitcast_op"),
+            (ast.LoadOp, "build_load_op"),
+            (ast.StoreOp, "build_store_op"),
+            (ast.ConstantOp, "build_constant_op"),
+            (ast.CastOp, "build_cast_op"),
+            (ast.IfOp, "build_if_op"),
+            (ast.ForOp, "build_for_op"),
+            (ast.WhileOp, "build_while_op"),
+            (ast.SelectOp, "build_select_op"),
+            (ast.PrintOp, "build_print_op"),
+            (ast.PrintTensorOp, "build_print_tensor_op"),
+            (ast.GetBitOp, "build_get_bit_op"),
+            (ast.GetSliceOp, "build_get_slice_op"),
+            (ast.SetBitOp, "build_set_bit_op"),
+            (ast.SetSliceOp, "build_set_slice_op"),
+            (ast.BitReverseOp, "build_bit_reverse_op"),
+            (ast.ConstantTensorOp, "build_constant_tensor_op"),
+            (ast.StructConstructOp, "build_struct_construct_op"),
+            (ast.StructGetOp, "build_struct_get_op"),
+            (ast.FuncOp, "build_func_op"),
+            (ast.CallOp, "build_call_op"),
+            (ast.Neg, "build_neg_op"),
+            (ast.OpHandle, "build_op_handle"),
+            (ast.LoopHandle, "build_loop_handle"),
+            (ast.ReuseAtOp, "build_reuse_at_op"),
+            (ast.PartitionOp, "build_partition_op"),
+            (ast.ReplaceOp, "build_replace_op"),
+            (ast.ReshapeOp, "build_reshape_op"),
+            (ast.ReformOp, "build_reform_op"),
+            (ast.BufferAtOp, "build_buffer_at_op"),
+            (ast.InterKernelToOp, "build_inter_kernel_to_op"),
+            (ast.OutlineOp, "build_outline_op"),
+            (ast.ReorderOp, "build_reorder_op"),
+            (ast.SplitOp, "build_split_op"),
+            (ast.TileOp, "build_tile_op"),
+            (ast.PipelineOp, "build_pipeline_op"),
+            (ast.UnrollOp, "build_unroll_op"),
+            (ast.ParallelOp, "build_parallel_op"),
+            (ast.FuseOp, "build_fuse_op"),
+            (ast.ComputeAtOp, "build_compute_at_op"),
+            (ast.SystolicOp, "build_systolic_op"),
+        ]
+    )
+    # builders of operations that require the bit operation lowering
+    bit_op_builders = frozenset(
+        [
+            "build_get_bit_op",
+            "build_get_slice_op",
+            "build_set_bit_op",
+            "build_set_slice_op",
+            "build_bit_reverse_op",
+        ]
+    )
+
     def __init__(self, _ast):
         self._ast = _ast
         self.module = Module.create(get_location())
         self.top_func = None
-        self.iv = []  # a list to keep track of affine expression's induction variables
+        # (number of dims, index key) -> AffineMapAttr of a load or store
+        self.affine_maps = {}
         self.tinf_engine = ast.TypeInference()
         self.cleaner = build_cleaner.ASTCleaner()
-        self.tensor_dict = {}  # tensor name -> memref.allocOp
+        # tensor name -> memref.allocOp, or None if built by a worker
+        self.tensor_dict = {}
+        # content key -> (values, symbol name) of the emitted constant globals
+        self.const_tensor_pool = {}
+        self.dedup_const_bytes = 0  # bytes saved by sharing constant globals
         self.BIT_OPS = False
 
-    def build(self):
+    def build(self, jobs=1):
+        """Build the MLIR module of the AST.
+
+        Parameters
+        ----------
+        jobs : int, optional
+            the number of worker processes building the functions other
+            than the top function concurrently, each in its own context,
+            or 0 for one per CPU; the functions are merged into the module
+            in the same order and with the same attributes as when they
+            are built one at a time
+        """
         if self._ast is None:
             # if ast is None, we just return an empty module
             return
 
+        if jobs == 0:
+            jobs = os.cpu_count()
+        built = self.build_in_workers(jobs) if jobs > 1 else {}
         # build each operation in the ast
         with get_context(), get_location():
-            for op in self._ast.region:
+            for i, op in enumerate(self._ast.region):
+                if i in built:
+                    self.merge_func(op, *built[i])
+                    continue
                 ip = InsertionPoint.at_block_begin(self.module.body)
                 self.build_visitor(op, ip)
 
         self.top_func = self._ast.top_func.ir_op
 
+    def build_in_workers(self, jobs):
+        """Build the independent functions in worker processes.
+
+        The workers are started by the forkserver or spawn method, so
+        that they do not inherit the MLIR context of this process, and
+        each function is sent to them serialized. If a worker fails, the
+        functions are built one at a time instead.
+
+        Returns
+        -------
+        dict
+            region index of a function -> result of _build_func_in_worker
+        """
+        indices = [
+            i
+            for i, op in enumerate(self._ast.region)
+            if isinstance(op, ast.FuncOp)
+            and op is not self._ast.top_func
+            and not op.prototype
+            and _is_independent(op)
+        ]
+        if len(indices) < 2:
+            return {}
+        methods = multiprocessing.get_all_start_methods()
+        method = "forkserver" if "forkserver" in methods else "spawn"
+        # pylint: disable=broad-exception-caught
+        try:
+            funcs = [serialize.dumps_op(self._ast.region[i]) for i in indices]
+            with ProcessPoolExecutor(
+                min(jobs, len(indices)), multiprocessing.get_context(method)
+            ) as pool:
+                # a worker that crashes breaks the pool instead of hanging it
+                results = list(pool.map(_build_func_in_worker, funcs))
+        except Exception as e:
+            PassWarning(
+                f"Building the functions in worker processes failed ({e}), "
+                "they are built one at a time"
+            ).warn()
+            return {}
+        return dict(zip(indices, results))
+
+    def merge_func(self, op, asm, bit_ops, tensor_names):
+        """Move a function built by a worker into the module."""
+        for name in tensor_names:
+            if name in self.tensor_dict:
+                raise APIError(f"Tensor name conflict: {name}")
+            self.tensor_dict[name] = None
+        func_op = Module.parse(asm).body.operations[0]
+        self.module.body.append(func_op)
+        if self.BIT_OPS:
+            # set by the functions built before
+            func_op.attributes["bit"] = UnitAttr.get()
+        self.BIT_OPS = self.BIT_OPS or bit_ops
+        op.ir_op = func_op
+
     def build_visitor(self, op, ip):
         """Build dispatcher
 
@@ -280,126 +476,16 @@ class IRBuilder:
                 # if operation as result and is reusable
                 # return without building new operation
                 return
-        if isinstance(op, ast.ComputeOp):
-            self.build_compute(op, ip)
-        elif isinstance(op, ast.IterVar):
-            self.build_iter_var(op, ip)
-        elif isinstance(op, ast.ReduceOp):
-            self.build_reduce(op, ip)
-        elif isinstance(op, ast.AllocOp):
-            self.build_alloc_op(op, ip)
-        elif isinstance(op, ast.Cmp):
-            self.build_cmp_op(op, ip)
-        elif isinstance(op, ast.BinaryOp):
-            self.build_binary_op(op, ip)
-        elif isinstance(
-            op,
-            (
-                ast.MathExpOp,
-                ast.MathPowOp,
-                ast.MathLogOp,
-                ast.MathLog2Op,
-                ast.MathLog10Op,
-                ast.MathSqrtOp,
-                ast.MathSinOp,
-                ast.MathCosOp,
-                ast.MathTanOp,
-                ast.MathTanhOp,
-                # ast.PowOp is covered by build_binary_op
-            ),
-        ):
-            self.build_math_op(op, ip)
-        elif isinstance(op, ast.BitCastOp):
-            self.build_bitcast_op(op, ip)
-        elif isinstance(op, ast.LoadOp):
-            self.build_load_op(op, ip)
-        elif isinstance(op, ast.StoreOp):
-            self.build_store_op(op, ip)
-        elif isinstance(op, ast.ConstantOp):
-            self.build_constant_op(op, ip)
-        elif isinstance(op, ast.CastOp):
-            self.build_cast_op(op, ip)
-        elif isinstance(op, ast.IfOp):
-            self.build_if_op(op, ip)
-        elif isinstance(op, ast.ForOp):
-            self.build_for_op(op, ip)
-        elif isinstance(op, ast.WhileOp):
-            self.build_while_op(op, ip)
-        elif isinstance(op, ast.SelectOp):
-            self.build_select_op(op, ip)
-        elif isinstance(op, ast.PrintOp):
-            self.build_print_op(op, ip)
-        elif isinstance(op, ast.PrintTensorOp):
-            self.build_print_tensor_op(op, ip)
-        elif isinstance(op, ast.GetBitOp):
-            self.BIT_OPS = True
-            self.build_get_bit_op(op, ip)
-        elif isinstance(op, ast.GetSliceOp):
-            self.BIT_OPS = True
-            self.build_get_slice_op(op, ip)
-        elif isinstance(op, ast.SetBitOp):
-            self.BIT_OPS = True
-            self.build_set_bit_op(op, ip)
-        elif isinstance(op, ast.SetSliceOp):
-            self.BIT_OPS = True
-            self.build_set_slice_op(op, ip)
-        elif isinstance(op, ast.BitReverseOp):
-            self.BIT_OPS = True
-            self.build_bit_reverse_op(op, ip)
-        elif isinstance(op, ast.ConstantTensorOp):
-            self.build_constant_tensor_op(op, ip)
-        elif isinstance(op, ast.StructConstructOp):
-            self.build_struct_construct_op(op, ip)
-        elif isinstance(op, ast.StructGetOp):
-            self.build_struct_get_op(op, ip)
-        elif isinstance(op, ast.FuncOp):
-            self.build_func_op(op, ip)
-        elif isinstance(op, ast.CallOp):
-            self.build_call_op(op, ip)
-        elif isinstance(op, ast.Neg):
-            self.build_neg_op(op, ip)
-        elif isinstance(op, ast.OpHandle):
-            self.build_op_handle(op, ip)
-        elif isinstance(op, ast.LoopHandle):
-            self.build_loop_handle(op, ip)
-        elif isinstance(op, ast.ReuseAtOp):
-            self.build_reuse_at_op(op, ip)
-        elif isinstance(op, ast.PartitionOp):
-            self.build_partition_op(op, ip)
-        elif isinstance(op, ast.ReplaceOp):
-            self.build_replace_op(op, ip)
-        elif isinstance(op, ast.ReshapeOp):
-            self.build_reshape_op(op, ip)
-        elif isinstance(op, ast.ReformOp):
-            self.build_reform_op(op, ip)
-        elif isinstance(op, ast.BufferAtOp):
-            self.build_buffer_at_op(op, ip)
-        elif isinstance(op, ast.InterKernelToOp):
-            self.build_inter_kernel_to_op(op, ip)
-        elif isinstance(op, ast.OutlineOp):
-            self.build_outline_op(op, ip)
-        elif isinstance(op, ast.ReorderOp):
-            self.build_reorder_op(op, ip)
-        elif isinstance(op, ast.SplitOp):
-            self.build_split_op(op, ip)
-        elif isinstance(op, ast.TileOp):
-            self.build_tile_op(op, ip)
-        elif isinstance(op, ast.PipelineOp):
-            self.build_pipeline_op(op, ip)
-        elif isinstance(op, ast.UnrollOp):
-            self.build_unroll_op(op, ip)
-        elif isinstance(op, ast.ParallelOp):
-            self.build_parallel_op(op, ip)
-        elif isinstance(op, ast.FuseOp):
-            self.build_fuse_op(op, ip)
-        elif isinstance(op, ast.ComputeAtOp):
-            self.build_compute_at_op(op, ip)
-        elif isinstance(op, ast.SystolicOp):
-            self.build_systolic_op(op, ip)
-        else:
+        cls = type(op)
+        cache = self.dispatcher.cache
+        method = cache[cls] if cls in cache else self.dispatcher.resolve(cls)
+        if method is None:
             raise HCLNotImplementedError(
-                f"{type(op)}'s build visitor is not implemented yet."
+                f"{cls}'s build visitor is not implemented yet."
             )
+        if method in self.bit_op_builders:
+            self.BIT_OPS = True
+        getattr(self, method)(op, ip)
 
     def build_func_op(self, op: ast.FuncOp, ip):
         loc = Location.file(op.loc.filename, op.loc.lineno, 0)
@@ -874,26 +960,12 @@ class IRBuilder:
 
     def build_load_op(self, op: ast.LoadOp, ip):
         loc = Location.file(op.loc.filename, op.loc.lineno, 0)
-        index_exprs = []
-        flag = True
         load_op = None
-        self.iv.clear()  # clear iv
-        for index in op.index:
-            try:
-                affine_expr = self.build_affine_expr(index)
-                index_exprs.append(affine_expr)
-            # pylint: disable=broad-exception-caught
-            except Exception:
-                flag = False
-                break
-        if flag:
-            dim_count = len(self.iv)
-            affine_map = AffineMap.get(
-                dim_count=dim_count, symbol_count=0, exprs=index_exprs
-            )
-            affine_attr = AffineMapAttr.get(affine_map)
+        affine_map = self.build_affine_map(op.index)
+        if affine_map is not None:
+            affine_attr, ivs = affine_map
             load_op = affine_d.AffineLoadOp(
-                op.tensor.result, self.iv, affine_attr, ip=ip, loc=loc
+                op.tensor.result, ivs, affine_attr, ip=ip, loc=loc
             )
             op.result = load_op.result
             op.ir_op = load_op
@@ -915,30 +987,16 @@ class IRBuilder:
             load_op.attributes["unsigned"] = UnitAttr.get()
 
     def build_store_op(self, op: ast.StoreOp, ip):
-        index_exprs = []
-        flag = True
         store_op = None
         if op.value.result is None:
             self.build_visitor(op.value, ip)
         casted_expr = ast.CastOp(op.value, op.tensor.dtype, op.loc)
         self.build_visitor(casted_expr, ip)
-        self.iv.clear()  # clear iv
-        for index in op.index:
-            try:
-                affine_expr = self.build_affine_expr(index)
-                index_exprs.append(affine_expr)
-            # pylint: disable=broad-exception-caught
-            except Exception:
-                flag = False
-                break
-        if flag:
-            dim_count = len(self.iv)
-            affine_map = AffineMap.get(
-                dim_count=dim_count, symbol_count=0, exprs=index_exprs
-            )
-            affine_attr = AffineMapAttr.get(affine_map)
+        affine_map = self.build_affine_map(op.index)
+        if affine_map is not None:
+            affine_attr, ivs = affine_map
             store_op = affine_d.AffineStoreOp(
-                casted_expr.result, op.tensor.result, self.iv, affine_attr, ip=ip
+                casted_expr.result, op.tensor.result, ivs, affine_attr, ip=ip
             )
         else:
             new_indices = []
@@ -1168,45 +1226,84 @@ class IRBuilder:
         op.result = cast_op.result
         op.ir_op = cast_op
 
-    def build_affine_expr(self, expr):
-        """Build affine expression.
-        * Should all be binary op
-        * AffineExpr can be automatically simplied
+    def build_affine_map(self, index):
+        """Build the affine map of the index of a load or store.
+
+        The induction variables are numbered in the order they appear in
+        the index, and the map is shared by the identical indices on the
+        same loop nest.
+
+        Returns
+        -------
+        (AffineMapAttr, list of induction variables), or None if the index
+        is not affine
+        """
+        dims = {}  # id(parent loop) -> (dim position, induction variable)
+        try:
+            exprs_key = tuple(self.affine_key(expr, dims) for expr in index)
+            key = (len(dims), exprs_key)
+            affine_attr = self.affine_maps.get(key)
+            if affine_attr is None:
+                exprs = [self.build_affine_expr(expr_key) for expr_key in exprs_key]
+                affine_map = AffineMap.get(
+                    dim_count=len(dims), symbol_count=0, exprs=exprs
+                )
+                affine_attr = AffineMapAttr.get(affine_map)
+                self.affine_maps[key] = affine_attr
+        # pylint: disable=broad-exception-caught
+        except Exception:
+            return None
+        return affine_attr, [iv for _, iv in dims.values()]
+
+    def affine_key(self, expr, dims):
+        """Build the key of an affine index expression.
+
+        The key is a nested tuple in which the iteration variables are
+        replaced by their dim position, which `dims` assigns.
         """
-        if not isinstance(
-            expr, (ast.IterVar, ast.ConstantOp, ast.CastOp, ast.BinaryOp)
-        ):
-            raise HCLValueError(f"{expr} is not an affine index")
         if isinstance(expr, ast.IterVar):
-            if expr.parent_loop is None:
+            loop = expr.parent_loop
+            if loop is None:
                 raise HCLValueError(f"{expr} does not have parent loop set")
-            if isinstance(expr.parent_loop, scf_d.ForOp):
-                raise HCLValueError(f"loop {expr.parent_loop} is not affine")
-            if expr.parent_loop.induction_variable not in self.iv:
-                self.iv.append(expr.parent_loop.induction_variable)  # BlockArgument
-                return AffineExpr.get_dim(len(self.iv) - 1)
-            else:
-                return AffineExpr.get_dim(
-                    self.iv.index(expr.parent_loop.induction_variable)
-                )
-        elif isinstance(expr, ast.ConstantOp):
-            return AffineExpr.get_constant(expr.value)
-        elif isinstance(expr, ast.CastOp):
-            return self.build_affine_expr(expr.expr)
-        lhs = self.build_affine_expr(expr.lhs)
-        rhs = self.build_affine_expr(expr.rhs)
-        if isinstance(expr, ast.Add):
+            if isinstance(loop, scf_d.ForOp):
+                raise HCLValueError(f"loop {loop} is not affine")
+            dim = dims.get(id(loop))
+            if dim is None:
+                dim = dims[id(loop)] = (len(dims), loop.induction_variable)
+            return ("dim", dim[0])
+        if isinstance(expr, ast.ConstantOp):
+            if not isinstance(expr.value, int):
+                raise HCLValueError(f"{expr} is not an integer")
+            return ("const", expr.value)
+        if isinstance(expr, ast.CastOp):
+            return self.affine_key(expr.expr, dims)
+        if isinstance(expr, _AFFINE_BINARY_OPS):
+            return (
+                type(expr),
+                self.affine_key(expr.lhs, dims),
+                self.affine_key(expr.rhs, dims),
+            )
+        raise HCLValueError(f"{expr} is not an affine index")
+
+    def build_affine_expr(self, key):
+        """Build affine expression from its key.
+        * AffineExpr can be automatically simplied
+        """
+        if key[0] == "dim":
+            return AffineExpr.get_dim(key[1])
+        if key[0] == "const":
+            return AffineExpr.get_constant(key[1])
+        lhs = self.build_affine_expr(key[1])
+        rhs = self.build_affine_expr(key[2])
+        if issubclass(key[0], ast.Add):
             return lhs + rhs
-        elif isinstance(expr, ast.Sub):
+        if issubclass(key[0], ast.Sub):
             return lhs - rhs
-        elif isinstance(expr, ast.Mul):
+        if issubclass(key[0], ast.Mul):
             return lhs * rhs
-        elif isinstance(expr, ast.Div):
+        if issubclass(key[0], ast.Div):
             return AffineExpr.get_floor_div(lhs, rhs)  # or get_ceil_div
-        elif isinstance(expr, ast.Mod):
-            return lhs % rhs
-        else:
-            raise HCLValueError(f"{expr} is not an affine index!")
+        return lhs % rhs
 
     def build_if_op(self, op: ast.IfOp, ip):
         """Build IfOp"""
@@ -1470,75 +1567,75 @@ class IRBuilder:
         op.ir_op = bitreverse_op
         op.result = bitreverse_op.result
 
+    def _intern_constant_tensor(self, op: ast.ConstantTensorOp):
+        """Look up a constant global with the same contents as `op`.
+
+        Constant tensors are keyed by a hash of their values, data type,
+        and shape, so identical tables (e.g., the same lookup table
+        traced in several stages) share a single memref.global.
+        Returns the symbol name of the existing global, or None if `op`
+        is the first tensor with these contents.
+        """
+        values = np.ascontiguousarray(op.values)
+        digest = hashlib.sha256(values.tobytes()).hexdigest()
+        key = (htypes.dtype_to_str(op.dtype), values.dtype.str, values.shape, digest)
+        if key in self.const_tensor_pool:
+            pooled_values, sym_name = self.const_tensor_pool[key]
+            # guard against hash collisions
+            if np.array_equal(pooled_values, values):
+                if isinstance(op.dtype, (htypes.Fixed, htypes.UFixed)):
+                    bits = 64
+                else:
+                    bits = op.dtype.bits
+                self.dedup_const_bytes += values.size * ((bits + 7) // 8)
+                return sym_name
+        self.const_tensor_pool[key] = (values, op.name)
+        return None
+
     def build_constant_tensor_op(self, op: ast.ConstantTensorOp, ip):
         loc = Location.file(op.loc.filename, op.loc.lineno, 0)
         dtype = hcl_dtype_to_mlir(op.dtype, signless=True)
         shape = op.values.shape
+        if isinstance(op.dtype, (htypes.Fixed, htypes.UFixed)):
+            memref_type = MemRefType.get(op.shape, IntegerType.get_signless(64))
+        else:
+            memref_type = MemRefType.get(op.shape, dtype)
+        sym_name = self._intern_constant_tensor(op)
+        if sym_name is None:
+            sym_name = op.name
+            self._build_constant_global(op, dtype, memref_type, loc)
+
+        if isinstance(op.dtype, (htypes.Fixed, htypes.UFixed)):
+            fixed_memref_type = MemRefType.get(shape, dtype)
+            get_global = hcl_d.GetGlobalFixedOp(
+                fixed_memref_type, FlatSymbolRefAttr.get(sym_name), ip=ip, loc=loc
+            )
+        else:
+            get_global = memref_d.GetGlobalOp(
+                memref_type, FlatSymbolRefAttr.get(sym_name), ip=ip, loc=loc
+            )
+        op.ir_op = get_global
+        op.result = get_global.result
+        op.tensor.ir_op = get_global
+        op.tensor.result = get_global.result
+
+    def _build_constant_global(self, op, dtype, memref_type, loc):
         if isinstance(op.dtype, (htypes.Int, htypes.UInt)):
-            # The following code has several steps to convert the numpy array to have
-            # the correct data type in order to create an MLIR constant tensor.
-            # Since MLIR-NumPy Python interface only supports byte-addressable data types,
-            # we need to change the data type of the array to have the minimum number of bytes
-            # that can represent the target bitwidth.
-            # e.g., hcl.const_tensor(arr, dtype=hcl.Int(20)) (6*6 array)
-            #       which requires 20 bits (3 bytes) to represent each element
-            # declaration: 6*6*i20
-            # numpy input: 6*6*i64
-            # 1. Decompose the original i32 or i64 array into a structured array of uint8
-            #  -> decompose: 6*6*8*i8
+            # MLIR-NumPy Python interface only supports byte-addressable data types,
+            # so each element is encoded with the minimum number of bytes that can
+            # represent the target bitwidth, e.g., hcl.Int(20) is stored as 3 bytes.
             if op.dtype.bits == 1:
                 val = op.values
                 array = np.packbits(val, axis=None, bitorder="little")
                 value_attr = DenseElementsAttr.get(array, shape=val.shape, type=dtype)
             else:
-                # Here we construct a customized NumPy dtype, "f0", "f1", "f2", etc.
-                # are the field names, and the entire data type is `op.values.dtype`.
-                # This can be viewed as a `union` type in C/C++.
-                # Please refer to the documentation for more details:
-                # https://numpy.org/doc/stable/reference/arrays.dtypes.html#specifying-and-constructing-data-types
-                decomposed_np_dtype = np.dtype(
-                    (
-                        op.values.dtype,
-                        {
-                            f"f{i}": (np.uint8, i)
-                            for i in range(op.values.dtype.itemsize)
-                        },
-                    )
-                )
-                val = op.values.view(decomposed_np_dtype)
-                # 2. Compose the uint8 array into a structured array of target bitwidth
-                # This is done by taking the first several bytes of the uint8 array
-                # "u1" means one unsigned byte, and "i1" means one signed byte
-                n_bytes = int(np.ceil(dtype.width / 8))
-                new_dtype = np.dtype(
-                    {
-                        "names": [f"f{i}" for i in range(n_bytes)],
-                        "formats": (["i1"] if isinstance(dtype, htypes.Int) else ["u1"])
-                        + ["u1"] * (n_bytes - 1),
-                        "offsets": list(range(n_bytes)),
-                        "itemize": n_bytes,
-                    }
-                )
-                # -> compose: 6*6*3*i8
-                val = np.stack([val[f"f{i}"] for i in range(n_bytes)], axis=-1)
-                # -> flatten: 108*i8
-                val = val.flatten()
-                # -> view: 36*i24
-                val = val.view(np.dtype(new_dtype))
-                # -> reshape: 6*6*i24
-                val = val.reshape(shape)
-                # Pass in the numpy array to get the MLIR attribute
-                # -> result: 6*6*i20
+                val = encode_int_tensor(op.values, dtype.width)
                 value_attr = DenseElementsAttr.get(val, shape=val.shape, type=dtype)
         else:
             val = op.values
             value_attr = DenseElementsAttr.get(val)
         sym_name = StringAttr.get(op.name)
         sym_visibility = StringAttr.get("private")
-        if isinstance(op.dtype, (htypes.Fixed, htypes.UFixed)):
-            memref_type = MemRefType.get(op.shape, IntegerType.get_signless(64))
-        else:
-            memref_type = MemRefType.get(op.shape, dtype)
         type_attr = TypeAttr.get(memref_type)
         const_tensor = memref_d.GlobalOp(
             sym_name,
@@ -1554,20 +1651,6 @@ class IRBuilder:
         if isinstance(op.dtype, (htypes.UInt, htypes.UFixed)):
             const_tensor.attributes["unsigned"] = UnitAttr.get()
 
-        if isinstance(op.dtype, (htypes.Fixed, htypes.UFixed)):
-            fixed_memref_type = MemRefType.get(val.shape, dtype)
-            get_global = hcl_d.GetGlobalFixedOp(
-                fixed_memref_type, FlatSymbolRefAttr.get(op.name), ip=ip, loc=loc
-            )
-        else:
-            get_global = memref_d.GetGlobalOp(
-                memref_type, FlatSymbolRefAttr.get(op.name), ip=ip, loc=loc
-            )
-        op.ir_op = get_global
-        op.result = get_global.result
-        op.tensor.ir_op = get_global
-        op.tensor.result = get_global.result
-
     def build_struct_construct_op(self, op: ast.StructConstructOp, ip):
         loc = Location.file(op.loc.filename, op.loc.lineno, 0)
         # build fields
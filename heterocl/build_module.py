@@ -4,7 +4,6 @@
 
 import io
 import os
-import copy
 
 import hcl_mlir
 from hcl_mlir.dialects import hcl as hcl_d
@@ -25,9 +24,17 @@ from .runtime import copy_build_files
 from .schedule import Schedule
 from .utils import hcl_dtype_to_mlir
 from .passes.pass_manager import PassManager as ast_pass_manager
-from .passes.nest_if import NestElseIf
-from .passes.promote_func import PromoteFunc
 from .passes.expand_func import ExpandFunc
+from .passes.legalize import Legalize, LegalizeAndExpand
+from .passes.cse import CSE
+from .passes.dce import DeadCodeElimination
+from .passes.fusion import FuseElementwise
+from .passes.bitwidth import MinimizeBitwidth
+from .passes.reassociate import ReassociateReductions
+from .passes.licm import LoopInvariantCodeMotion
+from .passes.strength import StrengthReduction
+from .passes.liveness import ShareBuffers
+from . import config
 from .ast.ir_builder import IRBuilder
 from .ast.build_cleaner import ASTCleaner
 from .ast import ast
@@ -57,20 +64,42 @@ def lower(
             "The module has been lowered. Please apply schedule primitives before the lowering process."
         )
     # HeteroCL Transformation Pipeline
-    ast_pm = ast_pass_manager()
-    ast_pm.add_pass(NestElseIf)
-    ast_pm.add_pass(PromoteFunc)
-    ast_pm.add_pass(ExpandFunc)
+    ast_pm = ast_pass_manager(instrument=config.instrument_passes)
+    optimizations = [
+        pass_class
+        for enabled, pass_class in (
+            (config.dce, DeadCodeElimination),
+            (config.fuse, FuseElementwise),
+            (config.minimize_bitwidth, MinimizeBitwidth),
+            (config.reduction_width > 1, ReassociateReductions),
+            (config.licm, LoopInvariantCodeMotion),
+            (config.strength_reduction, StrengthReduction),
+            (config.share_buffers, ShareBuffers),
+        )
+        if enabled
+    ]
+    if optimizations:
+        # the optimizations run on the top function before it is expanded
+        ast_pm.add_pass(Legalize)
+        for pass_class in optimizations:
+            ast_pm.add_pass(pass_class)
+        ast_pm.add_pass(ExpandFunc)
+    else:
+        ast_pm.add_pass(LegalizeAndExpand)
+    if config.cse:
+        ast_pm.add_pass(CSE)
     device_agnostic_ast = ast_pm.run(schedule.ast)
     schedule._ast = device_agnostic_ast
+    schedule._pass_manager = ast_pm
     print("SCHEDULE AST: ", schedule._ast)
     # Build MLIR IR
     set_context()
     agnostic_ir_builder = IRBuilder(device_agnostic_ast)
-    agnostic_ir_builder.build()
+    agnostic_ir_builder.build(config.build_jobs)
     agnostic_module = agnostic_ir_builder.module
     schedule._module = _mlir_lower_pipeline(agnostic_module)
     schedule._top_func = agnostic_ir_builder.top_func
+    schedule._dedup_const_bytes = agnostic_ir_builder.dedup_const_bytes
     exit_context()
 
     schedule.set_lowered()
@@ -149,33 +178,35 @@ def separate_host_xcel(schedule, device_agnostic_ast):
     device_func.return_tensors = return_tensors
 
     # create host function
+    # the host ops are cloned so that the original AST is left untouched,
+    # and the clones use host buffers for the tensors returned by the device
+    new_rets = []
+    tensor_map = {}
+    for t in return_tensors:
+        alloc = ast.AllocOp(t.name + "_host", t.shape, t.dtype, t.loc)
+        new_rets.append(alloc)
+        tensor_map[id(t)] = alloc
     host_func_body = []
     call_inserted = False
-    new_rets = []
     for body_op in top_func.body:
         if body_op in dev_func_body:
             if not call_inserted:
                 # allocate return tensors
-                for t in return_tensors:
-                    alloc = ast.AllocOp(t.name + "_host", t.shape, t.dtype, t.loc)
+                for alloc in new_rets:
                     alloc.level = body_op.level
                     host_func_body.append(alloc)
-                    new_rets.append(alloc)
                 # insert a call to device function
                 call = ast.CallOp(device_func.name, args + new_rets, [], body_op.loc)
                 call.level = body_op.level
                 host_func_body.append(call)
                 call_inserted = True
         else:
-            # TODO: this should be a deep copy
-            # because the ast.replace_all_uses_with will affect the original ast
-            host_func_body.append(copy.copy(body_op))
+            host_func_body.append(ast.clone(body_op, tensor_map, copy_tensors=False))
     host_func = ast.FuncOp("main", top_func.args, host_func_body, top_func.loc)
     host_func.level = 0
-    host_func.return_tensors = top_func.return_tensors
-
-    for old, new in zip(return_tensors, new_rets):
-        ast.replace_all_uses_with(host_func, old, new)
+    host_func.return_tensors = [
+        tensor_map.get(id(t), t) for t in top_func.return_tensors
+    ]
 
     # create device function prototype
     device_func_proto = ast.FuncOp(
@@ -271,14 +302,14 @@ def build_fpga_kernel(schedule, target=None, stmt=None):
 
         set_context()
         xcel_ir_builder = IRBuilder(xcel_ast)
-        xcel_ir_builder.build()
+        xcel_ir_builder.build(config.build_jobs)
         xcel_module = xcel_ir_builder.module
         schedule._xcel_module = _mlir_lower_pipeline(xcel_module)
         exit_context()
 
         set_context()
         host_ir_builder = IRBuilder(host_ast)
-        host_ir_builder.build()
+        host_ir_builder.build(config.build_jobs)
         host_module = host_ir_builder.module
         schedule._host_module = host_module
         exit_context()
@@ -5,3 +5,31 @@ from . import types
 
 init_dtype = types.Int(32)
 raise_assert_exception = True
+# eliminate common subexpressions within each statement
+cse = False
+# fold constants and remove the stages whose outputs are never used
+dce = False
+# inline elementwise stages into their only consumer
+fuse = False
+# hoist loop-invariant expressions out of their loops
+licm = False
+# replace power-of-two multiplications, divisions, and remainders by shifts
+strength_reduction = False
+# store the stages into the buffers of the tensors no longer live
+share_buffers = False
+# narrow the integer arithmetic to the ranges of its values
+minimize_bitwidth = False
+# partial results of each reduction, combined by a balanced tree; 1 keeps
+# the reductions serial
+reduction_width = 1
+# let the floating-point sums and products be reassociated, which rounds
+# them differently
+reassociate_floats = False
+# record the source location of the traced operations
+src_loc = True
+# worker processes building the functions of a module, 0 for one per CPU;
+# they are spawned, so the main script must guard its entry point
+build_jobs = 1
+# fingerprint the AST around each pass of lower() to record whether the
+# pass changed it, see PassManager
+instrument_passes = False
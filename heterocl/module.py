@@ -3,11 +3,13 @@
 # pylint: disable=no-name-in-module
 
 import copy
+import queue
+import threading
 from multiprocessing import Process
 import numpy as np
 
 from hcl_mlir.dialects import func as func_d
-from hcl_mlir.ir import MemRefType
+from hcl_mlir.ir import MemRefType, StringAttr
 from hcl_mlir.exceptions import APIError, APIWarning, HCLNotImplementedError
 
 from .context import get_context, get_location
@@ -16,6 +18,83 @@ from .report import report_stats
 from .runtime import execute_fpga_backend, execute_llvm_backend
 from .utils import hcl_dtype_to_mlir
 from .operation import asarray
+from .tensor import Array
+from .types import Float, Int, UInt, dtype_to_hcl
+
+
+def _element_dtype(element_type, hint):
+    """Recover the HeteroCL type of a kernel argument from its signless
+    MLIR element type and the signedness hint attached by the IRBuilder.
+    """
+    type_str = str(element_type)
+    if type_str in {"f32", "f64"}:
+        return Float(int(type_str[1:]))
+    if type_str.startswith("i") and type_str[1:].isdigit():
+        bits = int(type_str[1:])
+        return UInt(bits) if hint == "u" else Int(bits)
+    return dtype_to_hcl(element_type)
+
+
+def _tensor_specs(func, types, attr):
+    """Return the (shape, dtype) of the tensors of a function signature,
+    with the signedness recovered from the type hints in ``attr``.
+    """
+    if attr not in func.attributes:
+        raise APIError(
+            f"The top function has no {attr} attribute to recover "
+            "the signedness of its tensors"
+        )
+    hints = StringAttr(func.attributes[attr]).value
+    if len(hints) != len(types):
+        raise APIError(
+            f"The {attr} attribute of the top function has "
+            f"{len(hints)} type hints for {len(types)} tensors"
+        )
+    specs = []
+    for mlir_type, hint in zip(types, hints):
+        if not MemRefType.isinstance(mlir_type):
+            raise APIError("Streaming only supports tensor arguments")
+        memref_type = MemRefType(mlir_type)
+        specs.append(
+            (
+                tuple(memref_type.shape),
+                _element_dtype(memref_type.element_type, hint),
+            )
+        )
+    return specs
+
+
+def _iter_tiles(source, extent, axis):
+    """Yield the blocks of a chunked source along the outer axis.
+
+    Array-like sources (including ``numpy.memmap``) are sliced into blocks
+    of ``extent`` elements, so only one block is ever materialized.
+    Any other iterable is assumed to already produce NumPy blocks.
+    """
+    if hasattr(source, "shape") and hasattr(source, "__getitem__"):
+        for start in range(0, source.shape[axis], extent):
+            index = [slice(None)] * len(source.shape)
+            index[axis] = slice(start, start + extent)
+            yield source[tuple(index)]
+    else:
+        yield from source
+
+
+def _pad_tile(block, shape):
+    """Copy a block into a contiguous tile of the kernel shape,
+    zero-padding a partial last tile.
+    """
+    block = np.asarray(block)
+    if block.shape == tuple(shape):
+        return np.ascontiguousarray(block)
+    if len(block.shape) != len(shape) or any(
+        src > dst for src, dst in zip(block.shape, shape)
+    ):
+        raise APIError(
+            f"Streamed block of shape {block.shape} does not fit kernel argument {tuple(shape)}"
+        )
+    pad_shape = [(0, dst - src) for src, dst in zip(block.shape, shape)]
+    return np.pad(block, pad_shape)
 
 
 class HCLModule:
@@ -119,6 +198,128 @@ class HCLModule:
         else:
             raise HCLNotImplementedError(f"Backend {target} is not implemented")
 
+    def _top_func_signature(self):
+        """Return the (shape, dtype) of each argument of the top function,
+        and those of its results.
+        """
+        with get_context(), get_location():
+            for op in self.host_src.body.operations:
+                if isinstance(op, func_d.FuncOp) and op.sym_name.value == "top":
+                    in_specs = _tensor_specs(
+                        op, [arg.type for arg in op.arguments], "itypes"
+                    )
+                    out_specs = _tensor_specs(op, list(op.type.results), "otypes")
+                    return in_specs, out_specs
+        raise APIError("No top-level function found in the built module")
+
+    def stream(self, *sources, axis=0, prefetch=True, tiled_outputs=None):
+        """Run the kernel tile by tile over inputs that do not fit in memory.
+
+        The kernel is expected to be built for a single tile. Each chunked
+        source is sliced along ``axis`` into blocks matching the extent of
+        the corresponding kernel argument, and the kernel is invoked once
+        per tile. While a tile is being computed, the next one is loaded on
+        a background thread, so I/O of the next chunk overlaps compute.
+
+        Parameters
+        ----------
+        sources : numpy.ndarray, numpy.memmap, iterable of numpy.ndarray or hcl.Array
+            One source per input of the kernel. Array-like sources are
+            sliced along ``axis``; iterables must yield one block per tile;
+            ``hcl.Array`` sources are resident and passed to every tile.
+            The outputs of the kernel are allocated for each tile.
+        axis : int
+            The outer axis along which the sources are tiled.
+        prefetch : bool
+            Whether to double-buffer the input tiles on a background thread.
+        tiled_outputs : list of int, optional
+            The indices of the outputs holding one tile of the result along
+            ``axis``, which are trimmed with a partial last tile. The other
+            outputs are returned whole. By default, every output is tiled.
+
+        Yields
+        ------
+        numpy.ndarray or tuple of numpy.ndarray
+            The output tiles of each kernel invocation. The tiled outputs of
+            a zero-padded last tile are trimmed along ``axis``.
+        """
+        if self.target != "llvm":
+            raise HCLNotImplementedError(
+                f"Streaming execution is not supported for target {self.target}"
+            )
+        in_specs, out_specs = self._top_func_signature()
+        if len(sources) != len(in_specs):
+            raise APIError(
+                f"Expected {len(in_specs)} sources, one per input of the kernel, "
+                f"got {len(sources)}"
+            )
+
+        chunked = [i for i, src in enumerate(sources) if not isinstance(src, Array)]
+        if len(chunked) == 0:
+            raise APIError("At least one source must be chunked")
+        for i in chunked:
+            shape, _ = in_specs[i]
+            if axis >= len(shape):
+                raise APIError(f"Axis {axis} is out of range for argument {i}")
+        extent = in_specs[chunked[0]][0][axis]
+        if any(in_specs[i][0][axis] != extent for i in chunked):
+            raise APIError(
+                f"The chunked arguments have different extents along axis {axis}"
+            )
+        if tiled_outputs is None:
+            tiled_outputs = range(len(out_specs))
+        tiled = [False] * len(out_specs)
+        for i in tiled_outputs:
+            if not 0 <= i < len(out_specs):
+                raise APIError(f"The kernel has no output {i}")
+            shape, _ = out_specs[i]
+            if axis >= len(shape) or shape[axis] != extent:
+                raise APIError(
+                    f"Output {i} of shape {shape} is not tiled like the inputs "
+                    f"along axis {axis}"
+                )
+            tiled[i] = True
+
+        def load_tiles():
+            iterators = [
+                _iter_tiles(sources[i], in_specs[i][0][axis], axis) for i in chunked
+            ]
+            while True:
+                blocks = [next(it, None) for it in iterators]
+                if all(block is None for block in blocks):
+                    return
+                if any(block is None for block in blocks):
+                    raise APIError("Chunked sources yield different numbers of tiles")
+                valid = np.shape(blocks[0])[axis]
+                if any(np.shape(block)[axis] != valid for block in blocks):
+                    raise APIError("Chunked sources yield blocks of different extents")
+                tiles = list(sources)
+                for i, block in zip(chunked, blocks):
+                    shape, dtype = in_specs[i]
+                    tiles[i] = asarray(_pad_tile(block, shape), dtype)
+                yield valid, tiles
+
+        tiles = _prefetch(load_tiles()) if prefetch else load_tiles()
+        try:
+            for valid, argv in tiles:
+                outputs = [
+                    asarray(np.zeros(shape), dtype=dtype) for shape, dtype in out_specs
+                ]
+                execute_llvm_backend(
+                    self.src, self.name, self.return_num, *argv, *outputs
+                )
+                results = []
+                for out, is_tiled in zip(outputs, tiled):
+                    res = out.asnumpy()
+                    if valid < extent and is_tiled:
+                        index = [slice(None)] * res.ndim
+                        index[axis] = slice(0, valid)
+                        res = res[tuple(index)]
+                    results.append(res)
+                yield results[0] if len(results) == 1 else tuple(results)
+        finally:
+            tiles.close()
+
     def report(self):
         """Get tool report"""
         if "target" not in self.__dict__:
@@ -136,6 +337,48 @@ class HCLModule:
         return report_stats(target, target.project)
 
 
+def _prefetch(tiles):
+    """Double-buffer a tile generator: the next tile is produced on a
+    background thread while the consumer works on the current one.
+    """
+    buffer = queue.Queue(maxsize=1)
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def producer():
+        try:
+            for tile in tiles:
+                if not put(tile):
+                    return
+            put(done)
+        # pylint: disable=broad-exception-caught
+        except Exception as e:
+            put(e)
+
+    thread = threading.Thread(target=producer, daemon=True)
+    thread.start()
+    try:
+        while True:
+            tile = buffer.get()
+            if tile is done:
+                return
+            if isinstance(tile, Exception):
+                raise tile
+            yield tile
+    finally:
+        stop.set()
+        thread.join()
+
+
 class HCLSuperModule:
     def __init__(self, modules):
         self.modules = modules
@@ -24,10 +24,63 @@ from .utils import (
 from .ast import ast
 
 
-def init(init_dtype=Int(32), raise_assert_exception=True):
-    """Initialize a HeteroCL environment with configurations."""
+# the optimization passes of lower() switched on by init(passes=...),
+# and whether they run by default
+_PASSES = {
+    "cse": False,
+    "dce": False,
+    "fuse": False,
+    "licm": False,
+    "strength_reduction": False,
+    "share_buffers": False,
+    "minimize_bitwidth": False,
+}
+
+
+def init(
+    init_dtype=Int(32),
+    raise_assert_exception=True,
+    passes=None,
+    reduction_width=1,
+    reassociate_floats=False,
+    src_loc=True,
+    build_jobs=1,
+):
+    """Initialize a HeteroCL environment with configurations.
+
+    Parameters
+    ----------
+    init_dtype : Type
+        the default data type of the tensors
+    raise_assert_exception : bool
+        whether a failed assertion raises an exception
+    passes : dict, optional
+        the optimization passes of lower() to switch on or off, by their
+        names in config, e.g. `{"cse": True}`; the ones left out are reset
+        to their defaults
+    reduction_width : int
+        the partial results of each reduction, combined by a balanced tree;
+        1 keeps the reductions serial
+    reassociate_floats : bool
+        whether the floating-point sums and products are reassociated too
+    src_loc : bool
+        whether to record the source location of the traced operations
+    build_jobs : int
+        worker processes building the functions of a module, 0 for one per
+        CPU
+    """
+    passes = dict(passes or {})
+    unknown = sorted(set(passes) - set(_PASSES))
+    if unknown:
+        raise APIError(f"Unknown passes {unknown}, expected some of {list(_PASSES)}")
     config.init_dtype = init_dtype
     config.raise_assert_exception = raise_assert_exception
+    for name, default in _PASSES.items():
+        setattr(config, name, passes.get(name, default))
+    config.reduction_width = reduction_width
+    config.reassociate_floats = reassociate_floats
+    config.src_loc = src_loc
+    config.build_jobs = build_jobs
 
 
 def placeholder(shape, name=None, dtype=None):
@@ -360,6 +413,42 @@ def unpack(tensor, axis=0, factor=None, name=None, dtype=None):
     return compute(tuple(new_shape), assign_val, name, new_type)
 
 
+# code object of an fcompute -> names of its arguments
+_arg_names = {}
+
+
+def _closure_vars(fcompute):
+    """Return the nonlocal variables of a function and their current values,
+    as inspect.getclosurevars(fcompute).nonlocals without resolving the
+    globals and builtins the function refers to.
+    """
+    if inspect.ismethod(fcompute):
+        fcompute = fcompute.__func__
+    if not inspect.isfunction(fcompute):
+        return inspect.getclosurevars(fcompute).nonlocals
+    if fcompute.__closure__ is None:
+        return {}
+    closure_vars = {}
+    for var, cell in zip(fcompute.__code__.co_freevars, fcompute.__closure__):
+        try:
+            closure_vars[var] = cell.cell_contents
+        except ValueError:
+            # the variable has not been assigned yet
+            continue
+    return closure_vars
+
+
+def _arg_names_of(fcompute):
+    """Return the argument names of a function, cached per code object."""
+    if not inspect.isfunction(fcompute):
+        return inspect.getfullargspec(fcompute).args
+    code = fcompute.__code__
+    names = _arg_names.get(code)
+    if names is None:
+        names = _arg_names[code] = inspect.getfullargspec(fcompute).args
+    return names
+
+
 def compute_body(name, shape, fcompute, dtype, loc, tensor):
     """Create an ast.ComputeOp and its body operations
 
@@ -391,14 +480,13 @@ def compute_body(name, shape, fcompute, dtype, loc, tensor):
     region = ast.scope.get()
     region.append(compute_op)
     # Analyze input tensors, and update uses for those tensors
-    closure_var = inspect.getclosurevars(fcompute).nonlocals
+    closure_var = _closure_vars(fcompute)
     input_tensors = [v for v in closure_var.values() if isinstance(v, ast.AllocOp)]
     reduce_vars = [v for v in closure_var.values() if isinstance(v, ast.ReduceVar)]
     compute_op.input_tensors.extend(input_tensors)
 
     # Build AST for fcompute body
-    argspec = inspect.getfullargspec(fcompute)
-    axis_names = argspec.args
+    axis_names = _arg_names_of(fcompute)
     if len(axis_names) == 0:
         # this is the case where fcompute is lambda *args: ...
         axis_names = ["i" + str(i) for i in range(len(shape))]
@@ -414,6 +502,8 @@ def compute_body(name, shape, fcompute, dtype, loc, tensor):
     compute_op.iter_vars.extend(iter_vars)
     compute_op.reduce_vars.extend(reduce_vars)
     ast.scope.push(compute_op.body)
+    # the loads and stores traced below are attributed to this stage
+    ast.scope.stages.append(compute_op)
     if tensor is None:
         # hcl.compute
         # pylint: disable=redefined-variable-type
@@ -453,6 +543,7 @@ def compute_body(name, shape, fcompute, dtype, loc, tensor):
         ast.scope.pop()
     else:
         raise APIError("Invalid tensor type")
+    ast.scope.stages.pop()
 
     return compute_op
 
@@ -0,0 +1,256 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+from ..ast import ast
+from ..ast.registry import get_type_rules
+from ..types import Int, UInt, Index
+from .pass_manager import Pass
+
+# operations whose operands are narrowed
+_ARITH = (ast.Add, ast.Sub, ast.Mul)
+
+
+def type_range(dtype):
+    """The interval of the values of an integer type, or None."""
+    if isinstance(dtype, UInt):
+        return 0, (1 << dtype.bits) - 1
+    if isinstance(dtype, Int):
+        return -(1 << (dtype.bits - 1)), (1 << (dtype.bits - 1)) - 1
+    return None
+
+
+def fits(interval, dtype):
+    """Whether every value of an interval is a value of an integer type."""
+    bounds = type_range(dtype)
+    return bounds is not None and bounds[0] <= interval[0] and interval[1] <= bounds[1]
+
+
+def min_type(interval, signed=False):
+    """The narrowest integer type holding every value of an interval,
+    signed if `signed` is set or if the interval has negative values.
+    """
+    lo, hi = interval
+    if lo >= 0 and not signed:
+        return UInt(max(hi.bit_length(), 1))
+    return Int(max((-lo - 1).bit_length(), hi.bit_length()) + 1)
+
+
+def _combine(node, lhs, rhs):
+    if isinstance(node, ast.Add):
+        return lhs[0] + rhs[0], lhs[1] + rhs[1]
+    if isinstance(node, ast.Sub):
+        return lhs[0] - rhs[1], lhs[1] - rhs[0]
+    corners = [a * b for a in lhs for b in rhs]
+    return min(corners), max(corners)
+
+
+def _children(node):
+    # the indices are left to the affine maps, and the tensors to their users
+    if isinstance(node, (ast.AllocOp, ast.IterVar)):
+        return ()
+    children = ast.node_children(node)
+    if isinstance(node, (ast.LoadOp, ast.StoreOp)):
+        index = {id(idx) for idx in node.index}
+        children = [child for child in children if id(child) not in index]
+    return children
+
+
+def _operands(node):
+    if isinstance(node, _ARITH):
+        return (node.lhs, node.rhs)
+    if isinstance(node, ast.CastOp):
+        return (node.expr,)
+    return ()
+
+
+class MinimizeBitwidth(Pass):
+    """Narrow the integer arithmetic to the ranges of its values.
+
+    The type rules widen the integer sums, differences, and products by
+    one bit or more per operation, so that they never overflow, and the
+    integer constants and the iteration variables are 32-bit wide. A deep
+    expression is computed in very wide types, most of whose bits are
+    always zero.
+
+    An interval of values is computed for every integer expression, from
+    the types of the loaded tensors, the values of the constants, the
+    bounds of the loops, and the casts. A tree of sums, differences, and
+    products stored into a tensor or cast to a type, whose values only
+    depend on the values of its operands, is then narrowed: its operands
+    are cast to the narrowest types holding their intervals, the
+    constants are given these types, and the types of its operations are
+    inferred again from them. The intermediate results that are still
+    wider than their interval are cast as well. A tree is narrowed only
+    if none of its operations overflows in the original types, and none
+    overflows in the new ones, so that the stored value is unchanged.
+
+    The trees shared with another expression and the indices of the
+    loads and stores are left as they are. The number of bits removed
+    from the operations of each stage is reported by stats().
+    """
+
+    invalidates = ()
+
+    def __init__(self):
+        super().__init__("minimize_bitwidth")
+        self.tinf = ast.TypeInference()
+        # id(iteration variable) -> interval of its values
+        self.bounds = {}
+        # id(expr) -> (expr, interval of its values or None)
+        self.intervals = {}
+        # id(expr) -> number of expressions or statements using it
+        self.parents = {}
+        # stage -> bits removed from its operations
+        self.saved = {}
+
+    def apply(self, _ast):
+        """Pass entry point"""
+        roots = []
+        visited = set()
+        stage = None
+
+        def pre(node):
+            if id(node) in visited:
+                return False
+            visited.add(id(node))
+            self.collect_bounds(node)
+            for child in _children(node):
+                self.parents[id(child)] = self.parents.get(id(child), 0) + 1
+            # the values stored or cast only depend on the values computed
+            if isinstance(node, ast.StoreOp) and isinstance(node.value, _ARITH):
+                roots.append((stage, node.value))
+            elif isinstance(node, ast.CastOp) and isinstance(node.expr, _ARITH):
+                roots.append((stage, node.expr))
+            return True
+
+        for func in _ast.region:
+            if not isinstance(func, ast.FuncOp):
+                continue
+            for op in func.body:
+                stage = getattr(
+                    op, "tag" if isinstance(op, ast.ForOp) else "name", None
+                )
+                ast.walk(op, _children, pre=pre)
+        for stage, root in roots:
+            saved = self.narrow(root)
+            if saved:
+                self.saved[stage] = self.saved.get(stage, 0) + saved
+        return _ast
+
+    def stats(self):
+        return {"bits_saved": dict(self.saved)}
+
+    def collect_bounds(self, node):
+        if isinstance(node, ast.ComputeOp):
+            for iv, dim in zip(node.iter_vars, node.shape):
+                if isinstance(dim, int) and dim > 0:
+                    self.bounds[id(iv)] = (0, dim - 1)
+        elif isinstance(node, ast.ForOp):
+            low, high, step = (
+                bound.value if isinstance(bound, ast.ConstantOp) else bound
+                for bound in (node.low, node.high, node.step)
+            )
+            if all(isinstance(b, int) for b in (low, high, step)):
+                if step > 0 and low < high:
+                    self.bounds[id(node.iter_var)] = (low, high - 1)
+        elif isinstance(node, ast.ReduceOp):
+            for axis in node.axis:
+                bound = axis.bound
+                if bound and all(isinstance(b, int) for b in bound):
+                    if bound[0] < bound[1]:
+                        self.bounds[id(axis)] = (bound[0], bound[1] - 1)
+
+    def interval(self, expr):
+        """The interval of the values of an expression, or None if they
+        are not integers, or if it is an operation that may overflow.
+        """
+        if id(expr) in self.intervals:
+            return self.intervals[id(expr)][1]
+
+        def pre(node):
+            return id(node) not in self.intervals
+
+        def post(node):
+            self.intervals[id(node)] = (node, self.node_interval(node))
+
+        ast.walk(expr, _operands, pre=pre, post=post)
+        return self.intervals[id(expr)][1]
+
+    def node_interval(self, node):
+        dtype = self.tinf.infer_result(node)
+        if isinstance(node, ast.ConstantOp):
+            value = node.value
+            if isinstance(value, int):
+                return int(value), int(value)
+            return None
+        if isinstance(node, ast.IterVar):
+            return self.bounds.get(id(node), type_range(Index()))
+        if isinstance(node, ast.CastOp):
+            inner = self.intervals[id(node.expr)][1]
+            if inner is not None and fits(inner, dtype):
+                return inner
+        elif isinstance(node, _ARITH):
+            lhs = self.intervals[id(node.lhs)][1]
+            rhs = self.intervals[id(node.rhs)][1]
+            if lhs is None or rhs is None:
+                return None
+            interval = _combine(node, lhs, rhs)
+            # the operation wraps around, or is not on integers
+            return interval if fits(interval, dtype) else None
+        return type_range(dtype)
+
+    def narrow(self, root):
+        """Narrow a tree of arithmetic operations, and return the number
+        of bits removed from its operations.
+        """
+        nodes = []
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            if self.parents.get(id(node), 0) != 1:
+                return 0
+            nodes.append(node)
+            stack.extend(op for op in (node.lhs, node.rhs) if isinstance(op, _ARITH))
+        # the operations do not overflow in their original types
+        old_types = {}
+        for node in nodes:
+            interval, dtype = self.interval(node), self.tinf.infer_result(node)
+            if interval is None or not fits(interval, dtype):
+                return 0
+            old_types[id(node)] = dtype
+
+        # the operations are typed from the operands up
+        new_types = {}
+        # (node, attribute, new operand)
+        updates = []
+        for node in reversed(nodes):
+            signed = self.interval(node)[0] < 0
+            operand_types = []
+            for attr in ("lhs", "rhs"):
+                operand = getattr(node, attr)
+                interval = self.interval(operand)
+                if interval is None:
+                    return 0
+                dtype = new_types.get(id(operand)) or self.tinf.infer_result(operand)
+                target = min_type(interval, signed)
+                if target.bits < dtype.bits or (signed and isinstance(dtype, UInt)):
+                    if isinstance(operand, ast.ConstantOp):
+                        new = ast.ConstantOp(operand.value, target, operand.loc)
+                    else:
+                        new = ast.CastOp(operand, target, operand.loc)
+                    updates.append((node, attr, new))
+                    dtype = target
+                operand_types.append(dtype)
+            dtype = get_type_rules(type(node))(*operand_types)
+            if not fits(self.interval(node), dtype):
+                return 0
+            new_types[id(node)] = dtype
+
+        saved = sum(old_types[id(n)].bits - new_types[id(n)].bits for n in nodes)
+        if saved <= 0:
+            return 0
+        for node, attr, new in updates:
+            setattr(node, attr, new)
+        for node in nodes:
+            node.dtype = new_types[id(node)]
+        return saved
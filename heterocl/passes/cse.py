@@ -0,0 +1,213 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import copy
+
+from ..ast import ast
+from .pass_manager import Pass
+from .utils import STATEMENTS, lookup
+
+
+# the attributes holding the operands of each kind of pure expression
+_OPERANDS = (
+    (ast.BinaryOp, ("lhs", "rhs")),
+    (ast.UnaryOp, ("expr",)),
+    (ast.CastOp, ("expr",)),
+    (ast.LoadOp, ("index",)),
+    (ast.SelectOp, ("cond", "true_value", "false_value")),
+    (ast.GetBitOp, ("expr", "index")),
+    (ast.GetSliceOp, ("expr", "start", "end")),
+)
+
+# Unlike the hoisting passes, CSE rewrites expressions in place, so it
+# also shares within the conditions of else-if and while statements
+_STATEMENTS = STATEMENTS + (
+    (ast.ElseIfOp, ("cond",)),
+    (ast.WhileOp, ("cond",)),
+)
+
+
+class CSE(Pass):
+    """Eliminate common subexpressions within each statement.
+
+    The expressions evaluated by a statement are hash-consed: every
+    pure subexpression is keyed by its operation, data type, and the
+    keys of its operands, and structurally identical subexpressions are
+    replaced by a single node. The shared nodes are fresh copies only
+    used by this statement, and are marked reusable so that the IR
+    builder emits them once.
+
+    Sharing never crosses statements, so a load is never reused across
+    a store, and a statement that contains a call is left unchanged.
+    """
+
+    invalidates = ()
+
+    def __init__(self):
+        super().__init__("cse")
+        # number of subexpressions replaced by a shared node
+        self.eliminated = 0
+        # id(statement) -> reductions it evaluates, until its body is visited
+        self.reductions = {}
+
+    def apply(self, _ast):
+        """Pass entry point"""
+        for op in _ast.region:
+            ast.walk(op, self.nested_ops, pre=self.visit)
+        return _ast
+
+    def stats(self):
+        return {"eliminated": self.eliminated}
+
+    def visit(self, op):
+        attrs = lookup(_STATEMENTS, op)
+        # the reductions evaluated by the statement, visited before its body
+        self.reductions[id(op)] = [] if attrs is None else self.eliminate(op, attrs)
+
+    def nested_ops(self, op):
+        ops = [
+            body_op
+            for reduce_op in self.reductions.pop(id(op), ())
+            for body_op in reduce_op.body
+        ]
+        for attr in ("body", "else_body"):
+            body = getattr(op, attr, None)
+            if isinstance(body, list):
+                ops.extend(body)
+        return ops
+
+    def eliminate(self, stmt, attrs):
+        """Share the identical subexpressions of a statement, and return
+        the reductions it evaluates.
+        """
+        table = _KeyTable()
+        roots = [getattr(stmt, attr) for attr in attrs]
+        for root in roots:
+            for expr in root if isinstance(root, list) else [root]:
+                ast.walk(expr, table.operands, pre=table.seen, post=table.add)
+        if table.impure or not table.shared():
+            return table.reductions
+        canon = {}  # structural key -> shared node
+        for attr, root in zip(attrs, roots):
+            setattr(stmt, attr, self.rebuild(root, table, canon))
+        return table.reductions
+
+    def rebuild(self, value, table, canon):
+        """Rebuild an expression, or a list of them, with one node per
+        structural key.
+        """
+        if isinstance(value, list):
+            return [self.rebuild(expr, table, canon) for expr in value]
+
+        def pre(node):
+            key = table.keys[id(node)]
+            if key not in table.exprs:
+                return False
+            if key in canon:
+                self.eliminated += 1
+                return False
+            return True
+
+        def post(node):
+            new_expr = copy.copy(node)
+            for attr in lookup(_OPERANDS, node):
+                setattr(new_expr, attr, _shared(getattr(node, attr), table, canon))
+            new_expr.reusable = True
+            canon[table.keys[id(node)]] = new_expr
+
+        ast.walk(value, table.operands, pre=pre, post=post)
+        return _shared(value, table, canon)
+
+
+def _shared(value, table, canon):
+    """The shared node of an operand, or the operand if it is not a pure
+    expression.
+    """
+    if isinstance(value, list):
+        return [_shared(item, table, canon) for item in value]
+    key = table.keys[id(value)]
+    return canon[key] if key in table.exprs else value
+
+
+class _KeyTable:
+    """The structural keys of the subexpressions of a statement.
+
+    A key is the operation, data type, and keys of the operands of a
+    pure expression, and is interned as a small integer, so that the key
+    of an expression only hashes the integers of its operands rather
+    than the whole tree below it.
+    """
+
+    def __init__(self):
+        # id(expr) -> interned key
+        self.keys = {}
+        # structural key -> interned key
+        self.interned = {}
+        # interned key -> number of occurrences
+        self.counts = {}
+        # interned keys of the pure expressions, which can be shared
+        self.exprs = set()
+        # whether the statement has a call, which may have side effects
+        self.impure = False
+        # the reductions, whose bodies are built in their own loop nest
+        self.reductions = []
+
+    def operands(self, expr):
+        """The operands of an expression identified by its structure."""
+        attrs = lookup(_OPERANDS, expr)
+        if attrs is None or isinstance(expr, ast.ConstantOp):
+            return []
+        operands = []
+        for attr in attrs:
+            value = getattr(expr, attr)
+            if isinstance(value, list):
+                operands.extend(value)
+            else:
+                operands.append(value)
+        return operands
+
+    def seen(self, expr):
+        """Count an expression already keyed, instead of visiting it."""
+        key = self.keys.get(id(expr))
+        if key is None:
+            return True
+        self.counts[key] += 1
+        return False
+
+    def add(self, expr):
+        """Key an expression whose operands are keyed."""
+        attrs = lookup(_OPERANDS, expr)
+        is_expr = False
+        if isinstance(expr, ast.ConstantOp):
+            key = ("const", expr.value, str(expr.dtype))
+        elif attrs is not None:
+            operands = tuple(self.key_of(getattr(expr, attr)) for attr in attrs)
+            # casts are the only pure expressions whose type is not
+            # determined by their operands
+            dtype = (
+                expr.dtype if isinstance(expr, (ast.CastOp, ast.BitCastOp)) else None
+            )
+            tensor = id(expr.tensor) if isinstance(expr, ast.LoadOp) else None
+            key = ("expr", type(expr), expr.name, str(dtype), tensor, operands)
+            is_expr = True
+        else:
+            if isinstance(expr, ast.CallOp):
+                self.impure = True
+            elif isinstance(expr, ast.ReduceOp):
+                self.reductions.append(expr)
+            # other operations are atoms identified by the object itself
+            key = ("atom", id(expr))
+        code = self.interned.setdefault(key, len(self.interned))
+        if is_expr:
+            self.exprs.add(code)
+        self.keys[id(expr)] = code
+        self.counts[code] = self.counts.get(code, 0) + 1
+
+    def key_of(self, value):
+        if isinstance(value, list):
+            return tuple(self.keys[id(item)] for item in value)
+        return self.keys[id(value)]
+
+    def shared(self):
+        """Whether a pure expression occurs more than once."""
+        return any(self.counts[key] > 1 for key in self.exprs)
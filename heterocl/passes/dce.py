@@ -0,0 +1,374 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+from ..ast import ast
+from ..types import Int, UInt, Index
+from .pass_manager import Pass, ast_fingerprint
+from .nest_if import NestElseIf
+
+
+# integer operations folded on constant operands
+_FOLDERS = {
+    ast.Add: lambda a, b: a + b,
+    ast.Sub: lambda a, b: a - b,
+    ast.Mul: lambda a, b: a * b,
+    ast.Min: min,
+    ast.Max: max,
+    ast.And: lambda a, b: a & b,
+    ast.Or: lambda a, b: a | b,
+    ast.XOr: lambda a, b: a ^ b,
+    ast.LogicalAnd: lambda a, b: int(bool(a) and bool(b)),
+    ast.LogicalOr: lambda a, b: int(bool(a) or bool(b)),
+    ast.LogicalXOr: lambda a, b: int(bool(a) != bool(b)),
+}
+
+# operations whose effects are not visible through the tensors they write
+_SIDE_EFFECTS = (ast.PrintOp, ast.PrintTensorOp, ast.PrintMemRefOp, ast.CallOp)
+
+# attributes that do not hold operands
+_NON_OPERANDS = ("uses", "tensor", "iter_var", "iter_vars", "reduce_vars")
+
+
+def _is_int_type(dtype):
+    return isinstance(dtype, (Int, UInt)) and not isinstance(dtype, Index)
+
+
+def _wrap(value, dtype):
+    """Wrap an integer into the range of an integer type."""
+    value &= (1 << dtype.bits) - 1
+    if isinstance(dtype, Int) and value >> (dtype.bits - 1):
+        value -= 1 << dtype.bits
+    return value
+
+
+def _int_value(expr):
+    """The value of an integer constant, or None."""
+    if not isinstance(expr, ast.ConstantOp) or not _is_int_type(expr.dtype):
+        return None
+    if not isinstance(expr.value, int):
+        return None
+    value = int(expr.value)
+    if _wrap(value, expr.dtype) != value:
+        # out of the range of its type
+        return None
+    return value
+
+
+def _const_int(expr):
+    """The value of a constant condition or loop bound, or None."""
+    if isinstance(expr, bool):
+        return int(expr)
+    if isinstance(expr, int):
+        return expr
+    return _int_value(expr)
+
+
+def _children(op):
+    # the tensors are not walked into, and are handled by their users
+    if isinstance(op, ast.AllocOp):
+        return ()
+    return ast.node_children(op)
+
+
+def referenced_stages(top_func):
+    """Collect the names of the stages referred to by the operations
+    of the top function that are not stages, e.g., schedule primitives.
+    """
+    names = set()
+
+    def pre(node):
+        if isinstance(node, ast.OpHandle):
+            names.add(node.name)
+        return True
+
+    for op in top_func.body:
+        if not isinstance(op, (ast.ComputeOp, ast.ForOp)):
+            ast.walk(op, _children, pre=pre)
+    return names
+
+
+def stage_accesses(op):
+    """Collect the ids of the tensors a stage reads and writes, and
+    whether it has side effects.
+    """
+    reads, writes = set(), set()
+    side_effects = []
+    visited = set()
+
+    def pre(node):
+        if id(node) in visited:
+            return False
+        visited.add(id(node))
+        if isinstance(node, ast.AllocOp):
+            reads.add(id(node))
+            return False
+        if isinstance(node, _SIDE_EFFECTS):
+            side_effects.append(node)
+        tensor = ast.node_tensor(node)
+        if isinstance(node, (ast.StoreOp, ast.ComputeOp)):
+            if tensor is not None:
+                writes.add(id(tensor))
+            if isinstance(node, ast.ComputeOp):
+                writes.add(id(node.aux_tensor))
+        elif isinstance(node, (ast.SetBitOp, ast.SetSliceOp)):
+            target = ast.node_tensor(node.expr)
+            if target is None:
+                side_effects.append(node)
+            else:
+                writes.add(id(target))
+        elif tensor is not None:
+            reads.add(id(tensor))
+        return True
+
+    def children(node):
+        for child in _children(node):
+            if isinstance(node, (ast.StoreOp, ast.ComputeOp)) and (
+                child is ast.node_tensor(node)
+                or isinstance(node, ast.ComputeOp)
+                and child is node.aux_tensor
+            ):
+                # written, not read
+                continue
+            yield child
+
+    ast.walk(op, children, pre=pre)
+    return reads, writes, bool(side_effects)
+
+
+def drop_uses(_ast, roots):
+    """Drop the nodes reachable from `roots`, but no longer from the AST,
+    from the use-def index of the tensors.
+    """
+    live = set()
+
+    def pre_live(node):
+        if id(node) in live:
+            return False
+        live.add(id(node))
+        return True
+
+    for op in _ast.region:
+        ast.walk(op, _children, pre=pre_live)
+    removed = {}
+
+    def pre_removed(node):
+        if id(node) in live or id(node) in removed:
+            return False
+        removed[id(node)] = node
+        return True
+
+    for op in roots:
+        ast.walk(op, _children, pre=pre_removed)
+    for node in removed.values():
+        tensor = ast.node_tensor(node)
+        if isinstance(tensor, ast.AllocOp):
+            tensor.uses.remove(node)
+
+
+class DeadCodeElimination(Pass):
+    """Fold constant expressions and remove the code that has no effect.
+
+    1. Integer arithmetic, comparisons, and casts on constants are folded
+       into constants of the inferred type, wrapping as the generated
+       code would. Selects with a constant condition are replaced by the
+       selected value.
+    2. If statements with a constant condition are replaced by the taken
+       branch, and loops with constant bounds that never iterate are
+       removed.
+    3. The stages of the top function (compute ops and for loops) that
+       do not write any tensor reaching the arguments or the return
+       tensors of the function, through the stages that follow, are
+       removed. Stages with side effects, e.g., prints or calls, and the
+       stages referred to by a schedule primitive are kept.
+
+    The folded expressions, the names of the eliminated stages, and the
+    numbers of AST nodes before and after the pass are reported by
+    stats().
+    """
+
+    requires = (NestElseIf,)
+    invalidates = ()
+
+    def __init__(self):
+        super().__init__("dce")
+        self.tinf = ast.TypeInference()
+        # number of folded expressions
+        self.folded = 0
+        # names of the eliminated stages
+        self.eliminated = []
+        self.nodes_before = 0
+        self.nodes_after = 0
+        # id(expr) -> (expr, folded expression)
+        self.memo = {}
+        # names of the stages referred to by schedule primitives
+        self.referenced = set()
+        # roots of the removed subtrees
+        self.removed = []
+
+    def apply(self, _ast):
+        """Pass entry point"""
+        self.nodes_before = ast_fingerprint(_ast)[1]
+        self.referenced = referenced_stages(_ast.top_func)
+        visited = set()
+
+        def pre(node):
+            if id(node) in visited:
+                return False
+            visited.add(id(node))
+            return True
+
+        for op in _ast.region:
+            ast.walk(op, _children, pre=pre, post=self.fold_operands)
+        self.eliminate_stages(_ast.top_func)
+        if self.removed:
+            drop_uses(_ast, self.removed)
+        self.nodes_after = ast_fingerprint(_ast)[1]
+        return _ast
+
+    def stats(self):
+        return {
+            "folded": self.folded,
+            "eliminated": self.eliminated,
+            "nodes_before": self.nodes_before,
+            "nodes_after": self.nodes_after,
+        }
+
+    def fold_operands(self, node):
+        """Fold the operands of a node, whose own operands are folded."""
+        for attr, value in list(ast.node_attrs(node)):
+            if attr in _NON_OPERANDS:
+                continue
+            if isinstance(value, ast.Expr):
+                new_value = self.fold(value)
+                if new_value is not value:
+                    setattr(node, attr, new_value)
+            elif isinstance(value, list):
+                for i, item in enumerate(value):
+                    if isinstance(item, ast.Expr):
+                        value[i] = self.fold(item)
+        if isinstance(node, (ast.Operation, ast.AST)):
+            self.prune_body(node, "body")
+            self.prune_body(node, "else_body")
+            if isinstance(node, ast.AST):
+                self.prune_body(node, "region")
+
+    def fold(self, expr):
+        """Return the folded expression of `expr`, or `expr` itself."""
+        key = id(expr)
+        if key in self.memo:
+            return self.memo[key][1]
+        new_expr = expr
+        if isinstance(expr, ast.SelectOp):
+            cond = _const_int(expr.cond)
+            if cond is not None:
+                new_expr = expr.true_value if cond else expr.false_value
+                dtype = self.tinf.infer_result(expr)
+                if str(self.tinf.infer_result(new_expr)) != str(dtype):
+                    new_expr = ast.CastOp(new_expr, dtype, expr.loc)
+        else:
+            value = self.fold_int(expr)
+            if value is not None:
+                dtype = self.tinf.infer_result(expr)
+                new_expr = ast.ConstantOp(_wrap(value, dtype), dtype, expr.loc)
+        if new_expr is not expr:
+            self.folded += 1
+        # the expression is kept alive so that its id is not reused
+        self.memo[key] = (expr, new_expr)
+        return new_expr
+
+    def fold_int(self, expr):
+        """The value of an integer expression on constants, or None."""
+        if isinstance(expr, ast.ConstantOp):
+            return None
+        dtype = None
+        if isinstance(expr, (ast.CastOp, ast.Neg, ast.BinaryOp)):
+            dtype = self.tinf.infer(expr)
+        if isinstance(expr, ast.Cmp):
+            # the operands are compared in their common type
+            dtype = dtype[0]
+        if not _is_int_type(dtype):
+            return None
+        if isinstance(expr, ast.CastOp):
+            value = _int_value(expr.expr)
+            return None if value is None else _wrap(value, dtype)
+        if isinstance(expr, ast.Neg):
+            value = _int_value(expr.expr)
+            return None if value is None else -_wrap(value, dtype)
+        lhs, rhs = _int_value(expr.lhs), _int_value(expr.rhs)
+        if lhs is None or rhs is None:
+            return None
+        if isinstance(expr, ast.Cmp):
+            folder = ast._CMP_FUNCS.get(expr.name)
+        else:
+            folder = _FOLDERS.get(type(expr))
+        if folder is None:
+            return None
+        # the operands are cast to the type of the operation
+        return int(folder(_wrap(lhs, dtype), _wrap(rhs, dtype)))
+
+    def prune_body(self, node, attr):
+        """Replace the if statements with a constant condition by the
+        taken branch, and remove the loops that never iterate.
+        """
+        body = getattr(node, attr, None)
+        if not isinstance(body, list):
+            return
+        new_body = []
+        spliced = False
+        for op in body:
+            if isinstance(op, ast.IfOp):
+                cond = _const_int(op.cond)
+                if cond is not None:
+                    branch = op.body if cond else op.else_body
+                    if not cond and not op.else_branch_valid:
+                        branch = []
+                    new_body.extend(branch)
+                    self.removed.append(op.cond)
+                    if not cond:
+                        self.removed.extend(op.body)
+                    elif op.else_branch_valid:
+                        self.removed.extend(op.else_body)
+                    spliced = True
+                    continue
+            if isinstance(op, ast.ForOp) and self.never_iterates(op):
+                self.removed.append(op)
+                continue
+            new_body.append(op)
+        if len(new_body) != len(body) or spliced:
+            body[:] = new_body
+            if isinstance(node, ast.Operation):
+                self.update_level(node)
+
+    def never_iterates(self, op):
+        if op.tag is not None and op.tag in self.referenced:
+            return False
+        low, high, step = _const_int(op.low), _const_int(op.high), _const_int(op.step)
+        if low is None or high is None or step is None or step <= 0:
+            return False
+        return low >= high
+
+    def eliminate_stages(self, top_func):
+        """Remove the stages whose outputs are never used."""
+        # tensors whose content is observed after the current stage
+        live = {id(t) for t in top_func.args + top_func.return_tensors}
+        live_ops = []
+        for op in reversed(top_func.body):
+            reads, writes, side_effects = stage_accesses(op)
+            if (
+                not isinstance(op, (ast.ComputeOp, ast.ForOp))
+                or side_effects
+                or self.stage_name(op) in self.referenced
+                or not live.isdisjoint(writes)
+            ):
+                live.update(reads)
+                live_ops.append(op)
+            else:
+                self.eliminated.append(self.stage_name(op))
+                self.removed.append(op)
+        if self.eliminated:
+            self.eliminated.reverse()
+            top_func.body[:] = reversed(live_ops)
+
+    @staticmethod
+    def stage_name(op):
+        return op.tag if isinstance(op, ast.ForOp) else op.name
@@ -1,9 +1,19 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
 from ..ast import ast
 from .pass_manager import Pass
+from .promote_func import PromoteFunc
 from hcl_mlir.exceptions import *
 
+
 class ExpandFunc(Pass):
-    """ Convert all funcop into nested funcop """
+    """Convert all funcop into nested funcop"""
+
+    # functions defined in a stage are promoted before it is outlined
+    requires = (PromoteFunc,)
+    invalidates = ()
+
     def __init__(self):
         super().__init__("expand_func")
         self._ast = None
@@ -16,10 +26,11 @@ class ExpandFunc(Pass):
             # print("ORIGINAL BODY: ", op.body)
             op.body = []
             for subfunc in self.subfuncs:
-                call_op = ast.CallOp(subfunc.name, subfunc.args, subfunc.return_tensors, subfunc.loc)
+                call_op = ast.CallOp(
+                    subfunc.name, subfunc.args, subfunc.return_tensors, subfunc.loc
+                )
                 op.body.append(call_op)
-                
-    
+
     def apply(self, _ast):
         """Pass entry point"""
         self._ast = _ast
@@ -32,12 +43,13 @@ class ExpandFunc(Pass):
         for op in scope.body:
             # print("EXPAND_FUNC GOT OP: ", op)
             if isinstance(op, ast.ComputeOp):
-                lower_func_op = ast.FuncOp(f"sub_func{i}", op.input_tensors, [op], op.loc)
+                lower_func_op = ast.FuncOp(
+                    f"sub_func{i}", op.input_tensors, [op], op.loc
+                )
                 lower_func_op.level = 1
                 self.update_level(lower_func_op)
-                self._ast.region.insert(1, lower_func_op)
                 self.subfuncs.append(lower_func_op)
                 i += 1
+        # each function is inserted before the ones outlined earlier
+        self._ast.region[1:1] = self.subfuncs[::-1]
         return
-
-        
\ No newline at end of file
@@ -0,0 +1,203 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+from ..ast import ast
+from .pass_manager import Pass
+from .dce import referenced_stages, stage_accesses, drop_uses
+
+# expressions that evaluate their operands more than once, or may have
+# side effects
+_REPEATED = (ast.ReduceOp, ast.CallOp)
+# operations that evaluate their body more than once
+_LOOPS = (ast.ForOp, ast.WhileOp, ast.ReduceOp)
+
+
+def buffer_bytes(tensor):
+    """The size of a tensor in bytes."""
+    size = (tensor.dtype.bits + 7) // 8
+    for dim in tensor.shape:
+        size *= dim
+    return size
+
+
+def _elementwise_value(op):
+    """The value stored by an elementwise compute op, or None.
+
+    An elementwise compute op creates a tensor and stores a single value
+    at its iteration variables, without any reduction or call.
+    """
+    if op.kind != "compute" or op.reduce_vars or len(op.body) != 1:
+        return None
+    store = op.body[0]
+    if not isinstance(store, ast.StoreOp) or store.tensor is not op.tensor:
+        return None
+    if len(store.index) != len(op.iter_vars) or not all(
+        idx is iv for idx, iv in zip(store.index, op.iter_vars)
+    ):
+        return None
+    pure = True
+
+    def pre(node):
+        nonlocal pure
+        if isinstance(node, _REPEATED) or ast.node_tensor(node) is op.tensor:
+            pure = False
+        return pure and not isinstance(node, ast.AllocOp)
+
+    ast.walk(store.value, ast.node_children, pre=pre)
+    return store.value if pure else None
+
+
+def _single_load(consumer, tensor):
+    """The only load of `tensor` in a consumer, if it is evaluated at most
+    once per iteration of the consumer, or None.
+    """
+    loads = []
+    # number of loops around the node being visited
+    depth = [0]
+
+    def pre(node):
+        if isinstance(node, ast.AllocOp):
+            return False
+        if isinstance(node, ast.LoadOp) and node.tensor is tensor:
+            loads.append((node, depth[0]))
+        if isinstance(node, _LOOPS):
+            depth[0] += 1
+        return True
+
+    def post(node):
+        if isinstance(node, _LOOPS):
+            depth[0] -= 1
+
+    # the iteration of the consumer itself does not count
+    for op in consumer.body:
+        ast.walk(op, ast.node_children, pre=pre, post=post)
+    if len(loads) != 1 or loads[0][1] != 0:
+        return None
+    return loads[0][0]
+
+
+def _replace(root, old, new):
+    """Replace the references to `old` under `root` by `new`."""
+
+    def pre(node):
+        if isinstance(node, ast.AllocOp):
+            return False
+        for attr, value in list(ast.node_attrs(node)):
+            if attr == "uses":
+                continue
+            if value is old:
+                setattr(node, attr, new)
+            elif isinstance(value, list):
+                for i, item in enumerate(value):
+                    if item is old:
+                        value[i] = new
+        return True
+
+    ast.walk(root, ast.node_children, pre=pre)
+
+
+class FuseElementwise(Pass):
+    """Inline elementwise producers into their only consumer.
+
+    A compute op of the top function that stores a pure value at its
+    iteration variables, i.e., `hcl.compute(shape, lambda *i: expr)`
+    without a reduction, is inlined into the stage that follows and
+    loads its tensor, when:
+
+    - its tensor is neither an argument nor a return tensor of the top
+      function, and has no other use, so that the intermediate buffer
+      and its loop nest can be removed;
+    - the consumer loads it once, outside of any loop or reduction of
+      its body, so that no value is computed more than once;
+    - none of the tensors it reads is written by the stages up to and
+      including the consumer, e.g., by `hcl.update` or `hcl.mutate`;
+    - no schedule primitive refers to it.
+
+    The load is replaced by the stored value, with the iteration
+    variables of the producer substituted by the index of the load.
+    Chains of elementwise stages are fused into the last one.
+
+    The names of the fused stages and the bytes of the removed buffers
+    are reported by stats().
+    """
+
+    invalidates = ()
+
+    def __init__(self):
+        super().__init__("fuse_elementwise")
+        # (producer, consumer) names of the fused stages
+        self.fused = []
+        # total size of the removed intermediate buffers
+        self.bytes_saved = 0
+
+    def apply(self, _ast):
+        """Pass entry point"""
+        top_func = _ast.top_func
+        referenced = referenced_stages(top_func)
+        outputs = {id(t) for t in top_func.args + top_func.return_tensors}
+        removed = []
+        i = 0
+        while i < len(top_func.body):
+            op = top_func.body[i]
+            consumer = None
+            if (
+                isinstance(op, ast.ComputeOp)
+                and op.name not in referenced
+                and id(op.tensor) not in outputs
+            ):
+                consumer = self.fuse(top_func.body, i)
+            if consumer is None:
+                i += 1
+                continue
+            self.fused.append((op.name, consumer.name))
+            self.bytes_saved += buffer_bytes(op.tensor)
+            removed.append(op)
+            del top_func.body[i]
+        if removed:
+            drop_uses(_ast, removed)
+        return _ast
+
+    def stats(self):
+        return {"fused": self.fused, "bytes_saved": self.bytes_saved}
+
+    def fuse(self, body, i):
+        """Inline the producer body[i] into its consumer, and return the
+        consumer, or None if it cannot be fused.
+        """
+        producer = body[i]
+        value = _elementwise_value(producer)
+        if value is None:
+            return None
+        tensor = producer.tensor
+        reads = stage_accesses(producer)[0]
+        consumer = None
+        for op in body[i + 1 :]:
+            op_reads, op_writes, _ = stage_accesses(op)
+            if not reads.isdisjoint(op_writes):
+                # the value would change if it was computed later
+                return None
+            if id(tensor) in op_reads:
+                consumer = op
+                break
+        if not isinstance(consumer, ast.ComputeOp):
+            return None
+        load = _single_load(consumer, tensor)
+        if load is None:
+            return None
+        # the producer, its store, and the load are the only uses
+        allowed = (producer, producer.body[0], load)
+        if not all(any(use is op for op in allowed) for use in tensor.uses):
+            return None
+        memo = {id(iv): idx for iv, idx in zip(producer.iter_vars, load.index)}
+        new_value = ast.clone(value, memo, copy_tensors=False)
+        dtype = ast.TypeInference().infer_result(new_value)
+        if str(dtype) != str(producer.dtype):
+            # the producer stored the value in its own type
+            new_value = ast.CastOp(new_value, producer.dtype, load.loc)
+        for op in consumer.body:
+            _replace(op, load, new_value)
+        consumer.input_tensors = [t for t in consumer.input_tensors if t is not tensor]
+        for t in producer.input_tensors:
+            if not any(t is u for u in consumer.input_tensors):
+                consumer.input_tensors.append(t)
+        return consumer
@@ -0,0 +1,107 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+from ..ast import ast
+from .pass_manager import Pass
+from .nest_if import NestElseIf, nest_scopes, nested_ops, update_moved_levels
+from .promote_func import PromoteFunc
+from .expand_func import ExpandFunc
+
+
+class Legalize(Pass):
+    """Nest the elif statements and promote the functions defined in a
+    body to the global scope in a single traversal.
+
+    This is the work of NestElseIf and PromoteFunc, which are valid after
+    this pass. The AST is traversed once, without recursion: the chains
+    of each scope are nested and its functions moved out before it is
+    visited, and the levels of the moved operations are updated as the
+    traversal reaches them, so that the time is linear in the size of
+    the AST.
+    """
+
+    invalidates = ()
+    provides = (NestElseIf, PromoteFunc)
+    # whether the stages of the top function are outlined as well
+    expand = False
+
+    def __init__(self, name="legalize"):
+        super().__init__(name)
+        # the functions to promote, in the order they are found
+        self.promoted = []
+        # the functions the stages of the top function are outlined into
+        self.subfuncs = []
+        # ids of the operations whose children's levels must be updated
+        self.moved = set()
+        # id(op) -> functions moved out of the body of op
+        self.pending = {}
+
+    def apply(self, _ast):
+        """Pass entry point"""
+        for op in list(_ast.region):
+            ast.walk(op, self.children, pre=self.visit)
+        # each function is inserted before the ones found earlier
+        _ast.region[:0] = self.promoted[::-1]
+        if self.subfuncs:
+            _ast.region[1:1] = self.subfuncs[::-1]
+        return _ast
+
+    def children(self, op):
+        # the functions defined in a body are visited after it
+        return nested_ops(op) + self.pending.pop(id(op), [])
+
+    def visit(self, op):
+        update_moved_levels(op, self.moved)
+        nest_scopes(op, self.moved)
+        if not getattr(op, "body", None):
+            return True
+        funcs = [body_op for body_op in op.body if isinstance(body_op, ast.FuncOp)]
+        if funcs:
+            op.body = [
+                body_op for body_op in op.body if not isinstance(body_op, ast.FuncOp)
+            ]
+            for func in funcs:
+                func.level = 0
+                self.moved.add(id(func))
+            self.promoted.extend(funcs)
+            self.pending[id(op)] = funcs
+        if self.expand and isinstance(op, ast.FuncOp) and op.name == "top":
+            self.expand_top(op)
+        return True
+
+    def expand_top(self, op):
+        """Outline the stages of the top function, as ExpandFunc does."""
+        body = op.body
+        stages = [body_op for body_op in body if isinstance(body_op, ast.ComputeOp)]
+        # the body replaced by the calls is still visited, as the separate
+        # passes would have visited it before the stages are outlined
+        self.pending[id(op)] = body + self.pending.get(id(op), [])
+        op.body = []
+        for i, stage in enumerate(stages):
+            subfunc = ast.FuncOp(
+                f"sub_func{i}", stage.input_tensors, [stage], stage.loc
+            )
+            subfunc.level = 1
+            stage.level = 2
+            self.moved.add(id(stage))
+            self.subfuncs.append(subfunc)
+            op.body.append(
+                ast.CallOp(
+                    subfunc.name, subfunc.args, subfunc.return_tensors, subfunc.loc
+                )
+            )
+
+
+class LegalizeAndExpand(Legalize):
+    """Legalize the AST, and outline the stages of the top function into
+    their own functions in the same traversal.
+
+    This is the work of NestElseIf, PromoteFunc, and ExpandFunc, for the
+    pipelines without any pass between them.
+    """
+
+    provides = (NestElseIf, PromoteFunc, ExpandFunc)
+    expand = True
+
+    def __init__(self):
+        super().__init__("legalize_and_expand")
@@ -0,0 +1,300 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+from ..ast import ast
+from ..context import UniqueName
+from ..types import Index, Struct
+from .pass_manager import Pass
+from .nest_if import NestElseIf
+from .dce import referenced_stages
+from .utils import STATEMENTS, Insertions, lookup, expr_children, operand_attrs
+
+# expressions that are free in an affine map, or as cheap as a temporary
+_AFFINE_OPS = (ast.Add, ast.Sub, ast.Mul, ast.Div, ast.Mod)
+
+
+def _const(value):
+    if isinstance(value, int):
+        return value
+    if isinstance(value, ast.ConstantOp) and isinstance(value.value, int):
+        return value.value
+    return None
+
+
+class _Loop:
+    """A loop around the statement being visited.
+
+    Parameters
+    ----------
+    node : ForOp or ComputeOp or ReduceOp
+        the loop
+    body : list
+        the body holding the statement the loop is in
+    anchor : Operation
+        the statement the loop is in, before which the invariant
+        expressions are computed
+    target : bool
+        whether expressions may be hoisted before the loop
+    """
+
+    def __init__(self, node, body, anchor, target):
+        self.node = node
+        self.body = body
+        self.anchor = anchor
+        self.target = target
+        self.bound = set()
+        self.written = set()
+        self.has_call = False
+        visited = set()
+
+        def pre(op):
+            if id(op) in visited:
+                return False
+            visited.add(id(op))
+            if isinstance(op, ast.AllocOp):
+                return False
+            if isinstance(op, ast.ForOp):
+                self.bound.add(id(op.iter_var))
+            elif isinstance(op, ast.ComputeOp):
+                self.bound.update(id(iv) for iv in op.iter_vars + op.reduce_vars)
+                self.written.update((id(op.tensor), id(op.aux_tensor)))
+            elif isinstance(op, ast.ReduceOp):
+                self.bound.update(id(axis) for axis in op.axis)
+                self.written.add(id(op.scalar))
+            elif isinstance(op, ast.StoreOp):
+                self.written.add(id(op.tensor))
+            elif isinstance(op, (ast.SetBitOp, ast.SetSliceOp)):
+                self.written.add(id(ast.node_tensor(op.expr)))
+            elif isinstance(op, ast.CallOp):
+                self.has_call = True
+            return not isinstance(op, ast.IterVar)
+
+        ast.walk(node, ast.node_children, pre=pre)
+
+
+class LoopInvariantCodeMotion(Pass):
+    """Hoist the loop-invariant expressions out of their loops.
+
+    The loops are the imperative for loops, the reductions, and the
+    compute ops nested in a loop or a function body. A pure expression
+    evaluated by a statement is invariant in a loop if it does not use
+    an iteration variable bound in the loop and does not load a tensor
+    written in the loop; the loads are not hoisted out of a loop calling
+    a function. Each maximal invariant expression is computed into a
+    scalar temporary before the outermost loop it is invariant in, and
+    replaced by a load of the temporary. The hoisted expression is
+    visited again, so that its own invariant parts move further out.
+
+    The expressions are never speculated: the loops whose bounds are not
+    constant and non-empty, the if statements, and the while loops stop
+    the motion. Compute ops at the top of a function are outlined into
+    their own function, so expressions are only hoisted within their
+    body. The loops of a stage referred to by a schedule primitive are
+    kept perfectly nested.
+
+    Expressions made of iteration variables and constants with affine
+    operations are left in place, as they fold into the affine maps of
+    the loads and stores. So are the single loads with such an index.
+    """
+
+    requires = (NestElseIf,)
+    invalidates = ()
+
+    def __init__(self):
+        super().__init__("licm")
+        # number of hoisted expressions
+        self.hoisted = 0
+        # id(expr) -> (expr, iteration variables, tensors, pure, trivial)
+        self.info = {}
+        # statements computing the hoisted expressions
+        self.insertions = Insertions()
+
+    def apply(self, _ast):
+        """Pass entry point"""
+        referenced = referenced_stages(_ast.top_func)
+        for func in _ast.region:
+            if not isinstance(func, ast.FuncOp):
+                continue
+            for op in func.body:
+                pinned = isinstance(op, ast.ForOp) and op.tag in referenced
+                self.visit(op, func.body, [], (func.body, op), pinned)
+        self.insertions.splice()
+        for func in _ast.region:
+            self.update_level(func)
+        return _ast
+
+    def stats(self):
+        return {"hoisted": self.hoisted}
+
+    def visit(self, op, body, loops, alloc_at, pinned):
+        """Hoist the invariant expressions of a statement and of the
+        statements nested in it.
+
+        Parameters
+        ----------
+        op : Operation
+            the statement
+        body : list
+            the body holding the statement
+        loops : list of _Loop
+            the loops around the statement, outermost first
+        alloc_at : (list, Operation)
+            where the temporaries are allocated
+        pinned : bool
+            whether the statement is in a stage referred to by a schedule
+            primitive
+        """
+        reductions = self.hoist_operands(op, loops, alloc_at)
+        for reduce_op in reductions:
+            loop = _Loop(reduce_op, body, op, True)
+            for body_op in reduce_op.body:
+                self.visit(body_op, reduce_op.body, loops + [loop], alloc_at, pinned)
+        if isinstance(op, ast.ForOp):
+            low, high = _const(op.low), _const(op.high)
+            if low is not None and high is not None and low < high:
+                target = not pinned or not loops
+                inner = loops + [_Loop(op, body, op, target)]
+            else:
+                inner = []
+            for body_op in op.body:
+                self.visit(body_op, op.body, inner, alloc_at, pinned)
+        elif isinstance(op, ast.ComputeOp):
+            if alloc_at[1] is op:
+                # outlined into a function
+                inner, alloc_body = [], op.body
+            else:
+                inner, alloc_body = loops, None
+                if all(isinstance(dim, int) and dim > 0 for dim in op.shape):
+                    inner = loops + [_Loop(op, body, op, True)]
+                else:
+                    inner = []
+            for body_op in op.body:
+                at = alloc_at if alloc_body is None else (alloc_body, body_op)
+                self.visit(body_op, op.body, inner, at, pinned)
+        elif isinstance(op, (ast.IfOp, ast.WhileOp)):
+            # the branch always taken, e.g., of the if statement generated
+            # for a reduction, does not stop the motion
+            cond = _const(op.cond) if isinstance(op, ast.IfOp) else None
+            for attr in ("body", "else_body"):
+                taken = cond is not None and bool(cond) == (attr == "body")
+                for body_op in getattr(op, attr, ()):
+                    self.visit(
+                        body_op,
+                        getattr(op, attr),
+                        loops if taken else [],
+                        alloc_at,
+                        pinned,
+                    )
+
+    def hoist_operands(self, op, loops, alloc_at):
+        """Hoist the invariant parts of the expressions evaluated by a
+        statement, and return the reductions found in them.
+        """
+        attrs = lookup(STATEMENTS, op)
+        reductions = []
+        if attrs is None:
+            return reductions
+        # id(expr) -> temporary holding it
+        temps = {}
+        stack = [(op, attr) for attr in reversed(attrs)]
+        while stack:
+            holder, attr = stack.pop()
+            value = getattr(holder, attr)
+            if isinstance(value, list):
+                items = list(enumerate(value))
+            else:
+                items = [(None, value)]
+            for i, expr in items:
+                if not isinstance(expr, ast.Expr):
+                    continue
+                if isinstance(expr, ast.ReduceOp):
+                    reductions.append(expr)
+                    continue
+                level = self.invariant_level(expr, loops)
+                if level is None:
+                    stack.extend((expr, attr) for attr in operand_attrs(expr))
+                    continue
+                temp = temps.get(id(expr))
+                if temp is None:
+                    temp = temps[id(expr)] = self.hoist(expr, loops, level, alloc_at)
+                load = ast.LoadOp(temp, [0], expr.loc)
+                if i is None:
+                    setattr(holder, attr, load)
+                else:
+                    value[i] = load
+        return reductions
+
+    def hoist(self, expr, loops, level, alloc_at):
+        """Compute an expression into a temporary before loops[level]."""
+        dtype = ast.TypeInference().infer_result(expr)
+        name = UniqueName.get("licm", "scalar")
+        temp = ast.AllocOp(name, (1,), dtype, expr.loc)
+        self.insertions.add(alloc_at[0], alloc_at[1], [temp])
+        loop = loops[level]
+        store = ast.StoreOp(temp, [0], expr, expr.loc)
+        self.insertions.add(loop.body, loop.anchor, [store])
+        self.hoisted += 1
+        # the hoisted expression may be invariant in the outer loops
+        self.hoist_operands(store, loops[:level], alloc_at)
+        return temp
+
+    def invariant_level(self, expr, loops):
+        """The index of the outermost loop an expression can be hoisted
+        out of, or None.
+        """
+        if not loops:
+            return None
+        _, ivs, tensors, pure, trivial = self.expr_info(expr)
+        if not pure or trivial:
+            return None
+        if isinstance(expr, ast.LoadOp) and all(
+            self.expr_info(idx)[4] for idx in expr.index
+        ):
+            return None
+        dtype = expr.dtype
+        if isinstance(dtype, (Index, Struct)):
+            return None
+        for level, loop in enumerate(loops):
+            if not ivs.isdisjoint(loop.bound) or not tensors.isdisjoint(loop.written):
+                continue
+            if tensors and loop.has_call:
+                continue
+            # invariant in this loop, hence in the loops it contains
+            for target in range(level, len(loops)):
+                if loops[target].target:
+                    return target
+            return None
+        return None
+
+    def expr_info(self, expr):
+        """The iteration variables and tensors an expression uses, and
+        whether it is pure and trivial.
+        """
+        if id(expr) in self.info:
+            return self.info[id(expr)]
+
+        def pre(node):
+            return id(node) not in self.info
+
+        def post(node):
+            ivs, tensors = set(), set()
+            pure = not isinstance(node, (ast.CallOp, ast.ReduceOp))
+            trivial = isinstance(node, (ast.IterVar, ast.ConstantOp)) or isinstance(
+                node, (ast.CastOp,) + _AFFINE_OPS
+            )
+            if isinstance(node, ast.IterVar):
+                ivs.add(id(node))
+            if isinstance(node, ast.LoadOp):
+                tensors.add(id(node.tensor))
+            for child in expr_children(node):
+                _, child_ivs, child_tensors, child_pure, child_trivial = self.info[
+                    id(child)
+                ]
+                ivs |= child_ivs
+                tensors |= child_tensors
+                pure = pure and child_pure
+                trivial = trivial and child_trivial
+            self.info[id(node)] = (node, ivs, tensors, pure, trivial)
+
+        ast.walk(expr, expr_children, pre=pre, post=post)
+        return self.info[id(expr)]
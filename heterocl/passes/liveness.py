@@ -0,0 +1,175 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+from ..ast import ast
+from .pass_manager import Pass
+from .dce import referenced_stages, stage_accesses
+from .fusion import buffer_bytes
+
+
+def stage_lifetimes(top_func):
+    """Compute the lifetime of the tensors accessed by the top function.
+
+    Returns
+    -------
+    dict
+        id(tensor) -> (index of the first, index of the last operation
+        of the top function body that reads or writes the tensor)
+    """
+    lifetimes = {}
+    for i, op in enumerate(top_func.body):
+        reads, writes, _ = stage_accesses(op)
+        for tensor in reads | writes:
+            first, _ = lifetimes.get(tensor, (i, i))
+            lifetimes[tensor] = (first, i)
+    return lifetimes
+
+
+def _same_index(index, iter_vars):
+    return len(index) == len(iter_vars) and all(
+        idx is iv for idx, iv in zip(index, iter_vars)
+    )
+
+
+def _in_place(op, tensor):
+    """Whether a compute op may store its values into `tensor`, which it
+    reads, in place of its own tensor.
+
+    Each iteration must only load `tensor` at the iteration variables of
+    the compute op, and store into its own tensor last, at the same
+    index, so that no element is overwritten before it is read.
+    """
+    if not op.body:
+        return False
+    store = op.body[-1]
+    if not isinstance(store, ast.StoreOp) or store.tensor is not op.tensor:
+        return False
+    if not _same_index(store.index, op.iter_vars):
+        return False
+    legal = True
+
+    def pre(node):
+        nonlocal legal
+        if isinstance(node, ast.AllocOp):
+            return False
+        target = ast.node_tensor(node)
+        if node is not store and target is op.tensor:
+            legal = False
+        elif target is tensor and not (
+            isinstance(node, ast.LoadOp) and _same_index(node.index, op.iter_vars)
+        ):
+            legal = False
+        return legal
+
+    for body_op in op.body:
+        ast.walk(body_op, ast.node_children, pre=pre)
+    return legal
+
+
+class ShareBuffers(Pass):
+    """Let the stages whose tensors are never live at the same time share
+    their buffers.
+
+    The tensors of the top function are allocated for the whole function,
+    so that its peak memory is the total size of the intermediate tensors.
+    The lifetime of each tensor is the range of operations of the top
+    function that read or write it. A compute op at the top of the
+    function then stores its values into the buffer of an intermediate
+    tensor of the same shape and type that is no longer live, instead of
+    allocating its own, i.e., it is turned into an `hcl.update` of that
+    tensor. A tensor whose last use is an elementwise read by the compute
+    op, at its own iteration variables, is reused in place.
+
+    The arguments and return tensors of the top function, and the stages
+    referred to by a schedule primitive, keep their own buffers.
+
+    The shared tensors and the peak memory of the intermediate and return
+    tensors before and after sharing are reported by stats().
+    """
+
+    invalidates = ()
+
+    def __init__(self):
+        super().__init__("share_buffers")
+        # (tensor, buffer it is stored into) names
+        self.shared = []
+        self.peak_bytes_before = 0
+        self.peak_bytes_after = 0
+
+    def apply(self, _ast):
+        """Pass entry point"""
+        top_func = _ast.top_func
+        referenced = referenced_stages(top_func)
+        external = {id(t) for t in top_func.args + top_func.return_tensors}
+        lifetimes = stage_lifetimes(top_func)
+        # buffers allocated by the stages, which may be shared
+        buffers = []
+        for i, op in enumerate(top_func.body):
+            if not isinstance(op, ast.ComputeOp) or op.kind != "compute":
+                continue
+            tensor = op.tensor
+            self.peak_bytes_before += buffer_bytes(tensor)
+            if (
+                id(tensor) in external
+                or op.name in referenced
+                or tensor.name in referenced
+            ):
+                self.peak_bytes_after += buffer_bytes(tensor)
+                continue
+            buffer = self.find_buffer(op, i, buffers, lifetimes)
+            if buffer is None:
+                self.peak_bytes_after += buffer_bytes(tensor)
+                buffers.append(tensor)
+                continue
+            self.share(top_func, op, buffer)
+            # the buffer lives as long as the tensor stored into it
+            first, _ = lifetimes[id(buffer)]
+            lifetimes[id(buffer)] = (first, lifetimes.get(id(tensor), (i, i))[1])
+        return _ast
+
+    def stats(self):
+        return {
+            "shared": self.shared,
+            "peak_bytes_before": self.peak_bytes_before,
+            "peak_bytes_after": self.peak_bytes_after,
+        }
+
+    @staticmethod
+    def find_buffer(op, i, buffers, lifetimes):
+        """Find a buffer the i-th operation of the top function may store
+        its values into, or None.
+        """
+        in_place = None
+        for buffer in buffers:
+            if tuple(buffer.shape) != tuple(op.tensor.shape):
+                continue
+            if str(buffer.dtype) != str(op.tensor.dtype):
+                continue
+            last = lifetimes[id(buffer)][1]
+            if last < i:
+                return buffer
+            if last == i and in_place is None and _in_place(op, buffer):
+                in_place = buffer
+        return in_place
+
+    def share(self, top_func, op, buffer):
+        """Store the values of a compute op into `buffer`."""
+        tensor = op.tensor
+        self.shared.append((tensor.name, buffer.name))
+        ast.replace_tensors(top_func, [(tensor, buffer)])
+        if op.tensor is not buffer:
+            op.tensor = buffer
+        op.kind = "update"
+        buffer.fcompute = op.fcompute
+        for stage in top_func.body:
+            if not isinstance(stage, ast.ComputeOp):
+                continue
+            if any(t is tensor for t in stage.input_tensors):
+                stage.input_tensors = [
+                    t for t in stage.input_tensors if t is not tensor
+                ]
+                if not any(t is buffer for t in stage.input_tensors):
+                    stage.input_tensors.append(buffer)
+        # the outlined stage takes the buffer it updates as an argument
+        if not any(t is buffer for t in op.input_tensors):
+            op.input_tensors.append(buffer)
@@ -6,99 +6,116 @@ from .pass_manager import Pass
 from hcl_mlir.exceptions import *
 
 
+def nest_chains(body, moved):
+    """Convert the if-elif-else chains of a body into nested if-else
+    statements, and return the new body.
+
+    Parameters
+    ----------
+    body : list
+        the operations of a scope
+    moved : set
+        the ids of the operations moved into an else branch are added to
+        it, as the levels of their children must be updated
+
+    Returns
+    -------
+    list
+        the body without the elif and else operations
+    """
+    new_body = []
+    # the if statement the next elif or else is the else branch of
+    last_if = None
+    for op in body:
+        if isinstance(op, ast.ElseIfOp):
+            if last_if is None:
+                raise APIError("elif must follow an if or elif")
+            if_op = ast.IfOp(op.cond, op.loc)
+            if_op.body.extend(op.body)
+            if_op.level = last_if.level + 1
+            moved.add(id(if_op))
+            last_if.else_body.append(if_op)
+            last_if.else_branch_valid = True
+            last_if = if_op
+        elif isinstance(op, ast.ElseOp):
+            if last_if is None:
+                raise APIError("else must follow an if or elif")
+            for else_op in op.body:
+                else_op.level = last_if.level + 1
+                moved.add(id(else_op))
+            last_if.else_body.extend(op.body)
+            last_if.else_branch_valid = True
+            last_if = None
+        else:
+            if isinstance(op, ast.IfOp):
+                last_if = op
+            new_body.append(op)
+    return new_body
+
+
+def nest_scopes(op, moved):
+    """Nest the chains of the body of an operation and of its else branch,
+    which holds the body of an else moved into it.
+    """
+    for attr in ("body", "else_body"):
+        ops = getattr(op, attr, None)
+        if ops and any(
+            isinstance(body_op, (ast.ElseIfOp, ast.ElseOp)) for body_op in ops
+        ):
+            setattr(op, attr, nest_chains(ops, moved))
+
+
+def nested_ops(op):
+    """The operations nested in `op` the passes lowering the control flow
+    visit: its body, its else branch, and the body of the value it stores.
+    """
+    if isinstance(op, ast.StoreOp):
+        if op.value is not None and getattr(op.value, "body", None) is not None:
+            return [op.value]
+        return []
+    ops = list(ast.body_ops(op))
+    if isinstance(op, ast.IfOp):
+        ops.extend(op.else_body)
+    return ops
+
+
+def update_moved_levels(op, moved):
+    """Update the levels of the children of a moved operation, and mark
+    the ones that changed as moved in turn.
+    """
+    if id(op) not in moved:
+        return
+    for child in nested_ops(op):
+        if isinstance(child, ast.Operation) and child.level != op.level + 1:
+            child.level = op.level + 1
+            moved.add(id(child))
+
+
 class NestElseIf(Pass):
     """Convert all elif into nested if-else statements.
 
     We need this pass to convert all elif into nested if-else statements
     because MLIR does not support elif.
+
+    The AST is traversed once, without recursion. The chains of a scope
+    are nested before its operations are visited, and the levels of the
+    moved operations are updated as the traversal reaches them.
     """
 
+    invalidates = ()
+
     def __init__(self):
         super().__init__("nest_else_if")
 
-    def visit(self, op):
-        if isinstance(op, ast.StoreOp):
-            if op.value is not None:
-                self.visit(op.value)
-        if hasattr(op, "body") and op.body is not None:
-            for body_op in op.body:
-                self.visit(body_op)
-            self.nest_elif(op)
-        else:
-            return
-
     def apply(self, _ast):
         """Pass entry point"""
-        for op in _ast.region:
-            self.visit(op)
-
-        return _ast
+        moved = set()
 
-    def nest_elif(self, scope):
-        """Convert all elif into nested if-else statements in a given scope.
+        def pre(op):
+            update_moved_levels(op, moved)
+            nest_scopes(op, moved)
+            return True
 
-        Parameters
-        ----------
-        scope : ast.Operation
-            an operation that has a body, the body is the scope to be converted.
-        """
-
-        if not hasattr(scope, "body"):
-            return
-
-        if scope.body is None or len(scope.body) == 0:
-            return
-
-        # if-elif-else chains
-        chains = list()
-        for op in scope.body:
-            if isinstance(op, ast.IfOp):
-                chains.append([op])
-            elif isinstance(op, ast.ElseIfOp):
-                if len(chains) == 0 or not isinstance(
-                    chains[-1][-1], (ast.IfOp, ast.ElseIfOp)
-                ):
-                    raise APIError("elif must follow an if or elif")
-                chains[-1].append(op)
-            elif isinstance(op, ast.ElseOp):
-                if len(chains) == 0 or not isinstance(
-                    chains[-1][0], (ast.IfOp, ast.ElseIfOp)
-                ):
-                    raise APIError("else must follow an if or elif")
-                chains[-1].append(op)
-            else:
-                continue
-
-        # convert if-elif-else chains into nested if-else statements
-        for chain in chains:
-            if len(chain) == 1:
-                continue
-
-            for i in range(len(chain) - 1):
-                # convert elseif to if
-                if isinstance(chain[i + 1], ast.ElseIfOp):
-                    if_op = ast.IfOp(chain[i + 1].cond, chain[i + 1].loc)
-                    if_op.body.extend(chain[i + 1].body)
-                    if_op.level += 1
-                    self.update_level(if_op)
-                    chain[i].else_body.append(if_op)
-                    chain[i].else_branch_valid = True
-                    chain[i + 1] = if_op
-                elif isinstance(chain[i + 1], ast.ElseOp):
-                    chain[i].else_body.extend(chain[i + 1].body)
-                    chain[i].else_branch_valid = True
-                    for op in chain[i].else_body:
-                        op.level += 1
-                        self.update_level(op)
-                    chain.remove(chain[i + 1])
-                else:
-                    raise APIError("Invalid if-elif-else chain: " + str(chain))
-
-        # remove ElseIfOp and ElseOp
-        new_body = list()
-        for op in scope.body:
-            if isinstance(op, ast.ElseIfOp) or isinstance(op, ast.ElseOp):
-                pass
-            else:
-                new_body.append(op)
-        scope.body = new_body
+        for op in _ast.region:
+            ast.walk(op, nested_ops, pre=pre)
+        return _ast
@@ -1,6 +1,9 @@
 # Copyright HeteroCL authors. All Rights Reserved.
 # SPDX-License-Identifier: Apache-2.0
 
+import json
+import time
+
 from ..ast import ast
 from hcl_mlir.exceptions import *
 from hcl_mlir.ir import *
@@ -10,8 +13,19 @@ class Pass(object):
     """Base class for all intermediate pass.
 
     A pass is a visitor that can mutate the Intermediate Layer.
+
+    A pass declares the passes whose result it needs in `requires`, which
+    the PassManager runs first if they are not valid, and the passes whose
+    result it may undo when it changes the AST in `invalidates`, or None
+    for all of them. A pass that does the work of other passes as well,
+    e.g., by fusing their traversals, declares them in `provides`, so
+    that they are valid after it has run.
     """
 
+    requires = ()
+    invalidates = None
+    provides = ()
+
     def __init__(self, name):
         self.name = name  # name of the pass
 
@@ -21,6 +35,10 @@ class Pass(object):
             "Pass.apply() is not implemented for pass: " + self.name
         )
 
+    def stats(self):
+        """Statistics of the last application of the pass, if any."""
+        return {}
+
     def update_level(self, op):
         """Update the level of an operation and its children.
 
@@ -29,24 +47,176 @@ class Pass(object):
         op : intermediate.Operation
             the operation to be updated
         """
-        if hasattr(op, "body") and op.body is not None:
-            for body_op in op.body:
+
+        def nested(op):
+            # the else branch of an if statement is nested as its body
+            return list(ast.body_ops(op)) + list(getattr(op, "else_body", None) or [])
+
+        def update(op):
+            for body_op in nested(op):
                 body_op.level = op.level + 1
-                self.update_level(body_op)
+
+        ast.walk(op, nested, pre=update)
+
+
+def ast_fingerprint(_ast):
+    """Compute a fingerprint of the AST and count its nodes.
+
+    The fingerprint covers the identity of every node and the values of
+    its attributes, so it changes when a node is replaced, added, removed
+    or modified. It is only meaningful within a process.
+
+    Returns
+    -------
+    (int, int)
+        the fingerprint and the number of nodes
+    """
+    visited = set()
+    state = []
+
+    def key(value):
+        if value is None or isinstance(value, (bool, int, float, str)):
+            return value
+        if isinstance(value, (list, tuple)):
+            return tuple(key(v) for v in value)
+        return id(value)
+
+    def visit(node):
+        if id(node) in visited:
+            return False
+        visited.add(id(node))
+        state.append(
+            (id(node),)
+            + tuple(
+                (attr, key(value))
+                for attr, value in ast.node_attrs(node)
+                if attr not in ("uses", "_type_cache", "_canonical_cache")
+            )
+        )
+        return True
+
+    for op in _ast.region:
+        ast.walk(op, ast.node_children, pre=visit)
+    return hash((id(_ast), key(_ast.region), tuple(state))), len(visited)
 
 
 class PassManager(object):
-    """A pass manager that manages a pipeline of passes."""
+    """A pass manager that manages a pipeline of passes.
+
+    Each pass run is timed. A pass whose result is still valid, i.e., it
+    has run on this AST and no later change invalidated it, is skipped.
+    The statistics a pass reports are kept in its record under "stats".
+    The records are available as a printable table and as JSON.
+
+    When instrumented, the AST is also fingerprinted before and after each
+    pass to count its nodes and to tell whether the pass changed it, and
+    the valid passes are kept across runs on an unchanged AST. Each
+    fingerprint walks the whole AST, so lower() only instruments its
+    passes if `config.instrument_passes` is set. Otherwise, every pass is
+    assumed to change the AST, which invalidates the passes listed in its
+    `invalidates`, and no pass is valid when a run starts.
 
-    def __init__(self):
+    Parameters
+    ----------
+    instrument : bool, optional
+        whether the AST is fingerprinted around each pass
+    """
+
+    def __init__(self, instrument=True):
         self.pipeline = []
+        self.instrument = instrument
+        # one dict per pass run
+        self.records = []
+        # the AST the valid passes have run on, and its fingerprint
+        self._ast = None
+        self._fingerprint = None
+        # the classes of the passes whose result is valid
+        self.valid = set()
+        # pass class -> name of the pass, once it has run
+        self.names = {}
 
     def add_pass(self, pass_class):
         """Add a pass to the pass pipeline."""
         self.pipeline.append(pass_class)
 
     def run(self, _ast):
+        if (
+            not self.instrument
+            or _ast is not self._ast
+            or ast_fingerprint(_ast)[0] != self._fingerprint
+        ):
+            # the passes have not run on this AST as it is, or it may have
+            # changed since
+            self.valid.clear()
         for pass_class in self.pipeline:
-            pass_obj = pass_class()
-            _ast = pass_obj.apply(_ast)
+            _ast = self.run_pass(pass_class, _ast, ())
+        self._ast = _ast
+        if self.instrument:
+            self._fingerprint = ast_fingerprint(_ast)[0]
+        return _ast
+
+    def run_pass(self, pass_class, _ast, requested_by):
+        """Run a pass after the passes it requires, unless it is valid."""
+        if pass_class in requested_by:
+            raise APIError(
+                f"Circular pass dependency: {pass_class.__name__} requires itself"
+            )
+        for required in pass_class.requires:
+            if required not in self.valid:
+                _ast = self.run_pass(required, _ast, requested_by + (pass_class,))
+        if pass_class in self.valid:
+            name = self.names.get(pass_class, pass_class.__name__)
+            self.records.append({"pass": name, "time": 0.0, "skipped": True})
+            return _ast
+        pass_obj = pass_class()
+        self.names[pass_class] = pass_obj.name
+        record = {"pass": pass_obj.name}
+        if self.instrument:
+            before, record["nodes_before"] = ast_fingerprint(_ast)
+        start = time.perf_counter()
+        _ast = pass_obj.apply(_ast)
+        record["time"] = time.perf_counter() - start
+        record["skipped"] = False
+        stats = pass_obj.stats()
+        if stats:
+            record["stats"] = stats
+        if self.instrument:
+            after, record["nodes_after"] = ast_fingerprint(_ast)
+            record["changed"] = before != after
+        if record.get("changed", True):
+            if pass_class.invalidates is None:
+                self.valid.clear()
+            else:
+                self.valid.difference_update(pass_class.invalidates)
+        self.valid.add(pass_class)
+        self.valid.update(pass_class.provides)
+        self.records.append(record)
         return _ast
+
+    def table(self):
+        """Format the records as a table."""
+        rows = [("pass", "time (ms)", "nodes before", "nodes after", "changed")]
+        for record in self.records:
+            if record["skipped"]:
+                rows.append((record["pass"], "-", "-", "-", "skipped"))
+                continue
+            rows.append(
+                (
+                    record["pass"],
+                    f"{record['time'] * 1e3:.3f}",
+                    str(record.get("nodes_before", "-")),
+                    str(record.get("nodes_after", "-")),
+                    str(record.get("changed", "-")),
+                )
+            )
+        widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+        lines = []
+        for row in rows:
+            cells = [row[0].ljust(widths[0])]
+            cells += [cell.rjust(width) for cell, width in zip(row[1:], widths[1:])]
+            lines.append("  ".join(cells))
+        return "\n".join(lines)
+
+    def to_json(self):
+        """Export the records as a JSON string."""
+        return json.dumps(self.records, indent=2)
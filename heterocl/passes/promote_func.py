@@ -3,6 +3,7 @@
 
 from ..ast import ast
 from .pass_manager import Pass
+from .nest_if import nested_ops, update_moved_levels
 from hcl_mlir.exceptions import *
 
 
@@ -11,34 +12,52 @@ class PromoteFunc(Pass):
     Move all function ops to global scope.
     """
 
+    invalidates = ()
+
     def __init__(self):
-        #print("SHOULD CALL PROMOTE CONSTRUCTOR")
+        # print("SHOULD CALL PROMOTE CONSTRUCTOR")
         super().__init__("promote_func")
         self._ast = None
 
     def apply(self, _ast):
-        #print("SHOULD CALL PROMOTE APPLY")
+        # print("SHOULD CALL PROMOTE APPLY")
         """Pass entry point"""
         self._ast = _ast
-        #print("_AST: ", _ast)
-        self.visit(_ast.region)
+        # print("_AST: ", _ast)
+        # the functions to promote, in the order they are found
+        promoted = []
+        # id(op) -> functions moved out of the body of op
+        pending = {}
+        moved = set()
+
+        def pre(op):
+            update_moved_levels(op, moved)
+            if not getattr(op, "body", None):
+                return True
+            funcs = [body_op for body_op in op.body if isinstance(body_op, ast.FuncOp)]
+            if funcs:
+                op.body = [
+                    body_op
+                    for body_op in op.body
+                    if not isinstance(body_op, ast.FuncOp)
+                ]
+                for func in funcs:
+                    self.promote_func(func, promoted, moved)
+                pending[id(op)] = funcs
+            return True
+
+        def children(op):
+            # the functions defined in a body are visited after it
+            return nested_ops(op) + pending.pop(id(op), [])
+
+        for op in list(_ast.region):
+            ast.walk(op, children, pre=pre)
+        # each function is inserted before the ones found earlier
+        _ast.region[:0] = promoted[::-1]
         return _ast
 
-    def visit(self, region):
-        #print("SHOULD CALL PROMOTE VISIT")
-        for op in region:
-            if isinstance(op, ast.FuncOp):
-                self.promote_func(op, region)
-            if hasattr(op, "body") and op.body is not None:
-                self.visit(op.body)
-
-    def promote_func(self, op, region):
-        #print("SHOULD CALL PROMOTE PROMOTE_FUNC")
-        if op in self._ast.region:
-            # already promoted
-            return
-
+    def promote_func(self, op, promoted, moved):
+        # print("SHOULD CALL PROMOTE PROMOTE_FUNC")
         op.level = 0
-        self.update_level(op)
-        region.remove(op)
-        self._ast.region.insert(0, op)
+        moved.add(id(op))
+        promoted.append(op)
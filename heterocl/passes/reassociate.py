@@ -0,0 +1,316 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+from collections import deque
+
+from .. import config
+from ..ast import ast
+from ..context import UniqueName
+from ..types import Int, UInt, Index, Fixed, UFixed, Float
+from .pass_manager import Pass
+from .nest_if import NestElseIf
+from .dce import referenced_stages
+from .utils import STATEMENTS, Insertions, lookup, expr_children, operand_attrs
+
+# reduction operations combining the input into the accumulator
+_REDUCERS = (ast.Add, ast.Mul, ast.And, ast.Or, ast.XOr, ast.Max, ast.Min)
+# the ones for which combining a value twice is the same as once, so that
+# every partial result can start from the initial value
+_IDEMPOTENT = (ast.Max, ast.Min, ast.And, ast.Or)
+# the value the other partial results start from
+_IDENTITY = {ast.Add: 0, ast.XOr: 0, ast.Mul: 1}
+
+
+def _fits(src, dst):
+    """Whether every value of type `src` is a value of type `dst`."""
+    if isinstance(src, UInt) and isinstance(dst, Int):
+        return src.bits < dst.bits
+    if isinstance(src, (Int, UInt, Float)):
+        return type(src) is type(dst) and src.bits <= dst.bits
+    return str(src) == str(dst)
+
+
+def _reassociable(reducer, x_type, dtype, floats):
+    """Whether a reduction of values of type `x_type` into an accumulator
+    of type `dtype` gives the same result in any order.
+
+    The integer sums, products, and bitwise operations wrap around, so
+    they are associative in the type of the accumulator whatever the type
+    of the input. The minimum and maximum are if the input is not
+    truncated, and so are the fixed-point sums in the same type. The
+    floating-point sums and products round differently in another order,
+    and are only reassociated if `floats` is set.
+    """
+    integers = (Int, UInt)
+    if reducer in (ast.Max, ast.Min):
+        return _fits(x_type, dtype)
+    if isinstance(dtype, integers):
+        return isinstance(x_type, integers)
+    if isinstance(dtype, (Fixed, UFixed)):
+        return reducer is ast.Add and str(x_type) == str(dtype)
+    if isinstance(dtype, Float):
+        return floats and reducer in (ast.Add, ast.Mul)
+    return False
+
+
+class ReassociateReductions(Pass):
+    """Split the serial reductions into partial results combined by a
+    balanced tree.
+
+    A reduction `for r: if (where) acc = op(x, acc)`, where `op` is a sum,
+    a product, a minimum, a maximum, or a bitwise and, or, or xor, carries
+    a dependence from each iteration to the next through `acc`, so that
+    its loop cannot start an iteration before the previous one is done.
+    The innermost reduction axis is split by the width `W`: each of the
+    `W` partial results accumulates every `W`-th value into its own
+    scalar, and the reduction is replaced by a balanced tree combining
+    them, of depth `log2(W)`::
+
+        p0 = init; p1 = ... = p[W-1] = identity
+        for r_outer in range(ceil(N / W)):
+            if (where[r := r_outer * W]) p0 = op(x[r], p0)
+            ...
+            if (where[r := r_outer * W + W - 1]) p[W-1] = op(x[r], p[W-1])
+        op(op(p0, p1), op(p2, p3)) ...
+
+    The partial results start from the identity of the operation, except
+    the first, which starts from the initial value; the idempotent
+    operations start all of them from it. The iterations past the end of
+    the axis, if `W` does not divide its extent, are guarded. The outer
+    reduction axes become loops around the partial reductions.
+
+    A reduction is only reassociated if its result is the same in any
+    order, see `_reassociable`; the floating-point sums and products
+    round differently, and are reassociated if `floats` is set. The
+    reductions over a tensor accumulator, with a custom reduction
+    function, with bounds that are not constant, or whose input has
+    another reduction or a call, are left as they are. So are the
+    reductions of a stage referred to by a schedule primitive, whose
+    loops the primitive refers to.
+    """
+
+    requires = (NestElseIf,)
+    invalidates = ()
+
+    def __init__(self, width=None, floats=None):
+        super().__init__("reassociate")
+        self.width = config.reduction_width if width is None else width
+        self.floats = config.reassociate_floats if floats is None else floats
+        self.tinf = ast.TypeInference()
+        # names of the reassociated reductions
+        self.reassociated = []
+        # statements computing the partial results
+        self.insertions = Insertions()
+
+    def apply(self, _ast):
+        """Pass entry point"""
+        if self.width < 2:
+            return _ast
+        referenced = referenced_stages(_ast.top_func)
+        for func in _ast.region:
+            if not isinstance(func, ast.FuncOp):
+                continue
+            queue = deque([func.body])
+            while queue:
+                body = queue.popleft()
+                for op in body:
+                    stage = getattr(
+                        op, "tag" if isinstance(op, ast.ForOp) else "name", None
+                    )
+                    if body is func.body and stage in referenced:
+                        continue
+                    for holder, attr, i, reduce_op in self.reductions(op):
+                        if not self.rewrite(body, op, holder, attr, i, reduce_op):
+                            # the reductions nested in its input
+                            queue.append(reduce_op.body)
+                    queue.extend(
+                        getattr(op, attr)
+                        for attr in ("body", "else_body")
+                        if isinstance(getattr(op, attr, None), list)
+                    )
+        self.insertions.splice()
+        for func in _ast.region:
+            self.update_level(func)
+        return _ast
+
+    def stats(self):
+        return {"reassociated": list(self.reassociated), "width": self.width}
+
+    def reductions(self, op):
+        """The reductions evaluated by a statement, with the attribute of
+        the expression holding each of them.
+        """
+        attrs = lookup(STATEMENTS, op)
+        found = []
+        stack = [(op, attr) for attr in reversed(attrs or ())]
+        while stack:
+            holder, attr = stack.pop()
+            value = getattr(holder, attr)
+            items = (
+                list(enumerate(value)) if isinstance(value, list) else [(None, value)]
+            )
+            for i, expr in items:
+                if isinstance(expr, ast.ReduceOp):
+                    found.append((holder, attr, i, expr))
+                elif isinstance(expr, ast.Expr):
+                    stack.extend((expr, attr) for attr in operand_attrs(expr))
+        return found
+
+    def match(self, reduce_op):
+        """The condition, input, and reduction operation of a reduction
+        that can be reassociated, or None.
+        """
+        body = reduce_op.body
+        if len(body) != 1 or not isinstance(body[0], ast.IfOp) or body[0].else_body:
+            return None
+        if_op = body[0]
+        if len(if_op.body) != 1 or not isinstance(if_op.body[0], ast.StoreOp):
+            return None
+        store = if_op.body[0]
+        if store.tensor is not reduce_op.scalar or not isinstance(
+            store.value, ast.CastOp
+        ):
+            return None
+        res = store.value.expr
+        if type(res) not in _REDUCERS:
+            return None
+        if isinstance(res.rhs, ast.LoadOp) and res.rhs.tensor is reduce_op.scalar:
+            x = res.lhs
+        elif isinstance(res.lhs, ast.LoadOp) and res.lhs.tensor is reduce_op.scalar:
+            x = res.rhs
+        else:
+            return None
+        if not isinstance(x, ast.Expr) or isinstance(reduce_op.init, ast.AllocOp):
+            return None
+        if not all(self.pure(expr, reduce_op) for expr in (x, if_op.cond)):
+            return None
+        x_type = self.tinf.infer_result(x)
+        if not _reassociable(type(res), x_type, reduce_op.dtype, self.floats):
+            return None
+        return if_op.cond, x, type(res)
+
+    @staticmethod
+    def pure(expr, reduce_op):
+        """Whether an expression has no reduction or call, and does not
+        read the accumulator of `reduce_op`.
+        """
+        if not isinstance(expr, ast.Expr):
+            return True
+        pure = True
+
+        def pre(node):
+            nonlocal pure
+            if isinstance(node, (ast.ReduceOp, ast.CallOp)) or (
+                isinstance(node, ast.LoadOp) and node.tensor is reduce_op.scalar
+            ):
+                pure = False
+            return pure
+
+        ast.walk(expr, expr_children, pre=pre)
+        return pure
+
+    def rewrite(self, body, anchor, holder, attr, i, reduce_op):
+        """Compute a reduction into partial results before the statement
+        evaluating it, and replace it with the tree combining them. Return
+        whether it is rewritten.
+        """
+        matched = self.match(reduce_op)
+        if matched is None:
+            return False
+        bounds = [axis.bound for axis in reduce_op.axis]
+        if not bounds or not all(
+            bound is not None and all(isinstance(b, int) for b in bound)
+            for bound in bounds
+        ):
+            return False
+        lb, ub = bounds[-1]
+        width = min(self.width, ub - lb)
+        if width < 2:
+            return False
+        cond, x, reducer = matched
+        # the iteration variables are shared with the copies of the input
+        shared = {}
+
+        def pre(node):
+            if isinstance(node, ast.IterVar):
+                shared[id(node)] = node
+            return True
+
+        for expr in (x, cond):
+            if isinstance(expr, ast.Expr):
+                ast.walk(expr, expr_children, pre=pre)
+        loc, dtype = reduce_op.loc, reduce_op.dtype
+        stmts = []
+        partials = []
+        for j in range(width):
+            name = UniqueName.get(f"{reduce_op.name}_part{j}", "scalar")
+            partial = ast.AllocOp(name, (1,), dtype, loc)
+            init = reduce_op.init
+            if j > 0 and reducer not in _IDEMPOTENT:
+                init = _IDENTITY[reducer]
+            stmts.append(partial)
+            stmts.append(
+                ast.StoreOp(partial, [0], ast.immediate_to_constant(init, loc), loc)
+            )
+            partials.append(partial)
+
+        # the outer axes are iterated by loops
+        scope = stmts
+        for axis in reduce_op.axis[:-1]:
+            loop = ast.ForOp(None, axis.name, axis.bound[0], axis.bound[1], 1, loc)
+            loop.iter_var = axis
+            scope.append(loop)
+            scope = loop.body
+        axis = reduce_op.axis[-1]
+        extent = ub - lb
+        trips = -(-extent // width)
+        loop = ast.ForOp(None, f"{axis.name}_outer", 0, trips, 1, loc)
+        scope.append(loop)
+        for j, partial in enumerate(partials):
+            index = ast.Add(
+                ast.Mul(loop.iter_var, ast.ConstantOp(width, Index(), loc), loc),
+                ast.ConstantOp(lb + j, Index(), loc),
+                loc,
+            )
+            memo = dict(shared)
+            memo[id(axis)] = index
+            value = reducer(
+                ast.clone(x, memo, copy_tensors=False),
+                ast.LoadOp(partial, [0], loc),
+                loc,
+            )
+            lane_cond = ast.clone(cond, memo, copy_tensors=False)
+            lane = ast.IfOp(lane_cond, loc)
+            lane.body.append(
+                ast.StoreOp(partial, [0], ast.CastOp(value, dtype, loc), loc)
+            )
+            if j >= extent % width > 0:
+                # the last iteration only covers the first lanes
+                guard = ast.IfOp(
+                    ast.Cmp(
+                        "lt",
+                        loop.iter_var,
+                        ast.ConstantOp(extent // width, Index(), loc),
+                        loc,
+                    ),
+                    loc,
+                )
+                guard.body.append(lane)
+                lane = guard
+            loop.body.append(lane)
+
+        values = [ast.LoadOp(partial, [0], loc) for partial in partials]
+        while len(values) > 1:
+            values = [
+                ast.CastOp(reducer(values[k], values[k + 1], loc), dtype, loc)
+                if k + 1 < len(values)
+                else values[k]
+                for k in range(0, len(values), 2)
+            ]
+        if i is None:
+            setattr(holder, attr, values[0])
+        else:
+            getattr(holder, attr)[i] = values[0]
+        self.insertions.add(body, anchor, stmts)
+        self.reassociated.append(reduce_op.name)
+        return True
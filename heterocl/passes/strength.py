@@ -0,0 +1,288 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import sympy as sp
+
+from ..ast import ast
+from ..types import Int, UInt, Index
+from .pass_manager import Pass
+from .bitwidth import type_range, fits
+
+# operations the affine maps of the loads and stores are made of
+_AFFINE_OPS = (ast.Add, ast.Sub, ast.Mul, ast.Div, ast.Mod)
+# statements and expressions indexing a tensor
+_INDEXED = (ast.LoadOp, ast.StoreOp)
+
+
+def _log2(expr):
+    """The exponent of a constant power of two greater than one, or None."""
+    if not isinstance(expr, ast.ConstantOp) or isinstance(expr.value, bool):
+        return None
+    value = expr.value
+    if not isinstance(value, int) or value < 2 or value & (value - 1):
+        return None
+    return value.bit_length() - 1
+
+
+def _affine(expr):
+    """Whether an expression is made of iteration variables and integer
+    constants with affine operations, so that it may end up in an affine
+    map, where it costs nothing.
+    """
+    stack = [expr]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, ast.IterVar):
+            continue
+        if isinstance(node, ast.ConstantOp):
+            if not isinstance(node.value, int):
+                return False
+        elif isinstance(node, ast.CastOp):
+            stack.append(node.expr)
+        elif isinstance(node, _AFFINE_OPS):
+            stack.extend((node.lhs, node.rhs))
+        else:
+            return False
+    return True
+
+
+def _kept(op):
+    """The expressions of a node that are left as they are: the bounds of
+    the loops, and the affine indices of the loads and stores.
+    """
+    if isinstance(op, ast.ForOp):
+        return [op.low, op.high, op.step]
+    if isinstance(op, _INDEXED) and all(_affine(idx) for idx in op.index):
+        return list(op.index)
+    return []
+
+
+def _children(op):
+    # the tensors are not walked into, and are handled by their users
+    if isinstance(op, (ast.AllocOp, ast.IterVar)):
+        return ()
+    kept = {id(expr) for expr in _kept(op)}
+    return [child for child in ast.node_children(op) if id(child) not in kept]
+
+
+class StrengthReduction(Pass):
+    """Replace the integer multiplications, divisions, and remainders by
+    a constant power of two with shifts and masks.
+
+    - `x * 2**k` becomes `x << k`;
+    - `x // 2**k` becomes `x >> k`, an arithmetic shift for signed types;
+    - `x / 2**k` becomes `x >> k` if `x` is unsigned, or if it is known
+      to be non-negative, since signed division truncates towards zero;
+    - `x % 2**k` becomes `x & (2**k - 1)` under the same condition.
+
+    The operands are cast to the type of the replaced operation, so the
+    result is the same value in the same type. A signed operand is known
+    to be non-negative if it is an affine expression whose iteration
+    variables are non-negative, and `ast.simplify` finds it non-negative.
+    Since `ast.simplify` drops the casts, every cast in the operand must
+    keep its value: the interval of its source, from the types and the
+    bounds of the loops, must fit in its destination type.
+
+    The indices of the loads and stores that are affine are left as they
+    are, since the affine maps built from them already fold these
+    operations. The number of replaced operations is reported by stats().
+    """
+
+    invalidates = ()
+
+    def __init__(self):
+        super().__init__("strength_reduction")
+        self.tinf = ast.TypeInference()
+        # kind of replaced operation -> count
+        self.reduced = {"mul": 0, "div": 0, "mod": 0}
+        # id(expr) -> (expr, reduced expression)
+        self.memo = {}
+        # id(iteration variable) -> interval of its values
+        self.bounds = {}
+
+    def apply(self, _ast):
+        """Pass entry point"""
+        visited = set()
+
+        def pre(node):
+            if id(node) in visited:
+                return False
+            visited.add(id(node))
+            self.collect_iter_vars(node)
+            return True
+
+        for op in _ast.region:
+            ast.walk(op, _children, pre=pre, post=self.reduce_operands)
+        return _ast
+
+    def stats(self):
+        return dict(self.reduced)
+
+    def collect_iter_vars(self, node):
+        max_index = type_range(Index())[1]
+        if isinstance(node, ast.ComputeOp):
+            # the iteration variables of a compute op start from zero
+            for iv, dim in zip(node.iter_vars, node.shape):
+                high = dim - 1 if isinstance(dim, int) else max_index
+                self.bounds[id(iv)] = (0, max(high, 0))
+        elif isinstance(node, ast.ForOp):
+            low, high, step = (
+                bound.value if isinstance(bound, ast.ConstantOp) else bound
+                for bound in (node.low, node.high, node.step)
+            )
+            if isinstance(low, int) and isinstance(step, int) and step > 0:
+                high = high - 1 if isinstance(high, int) else max_index
+                self.bounds[id(node.iter_var)] = (low, max(high, low))
+        elif isinstance(node, ast.ReduceOp):
+            for axis in node.axis:
+                bound = axis.bound
+                if bound and isinstance(bound[0], int):
+                    high = bound[1] - 1 if isinstance(bound[1], int) else max_index
+                    self.bounds[id(axis)] = (bound[0], max(high, bound[0]))
+
+    def reduce_operands(self, node):
+        """Reduce the operands of a node, whose own operands are reduced."""
+        kept = {id(expr) for expr in _kept(node)}
+        for attr, value in list(ast.node_attrs(node)):
+            if attr in ("uses", "tensor", "iter_var", "iter_vars", "reduce_vars"):
+                continue
+            if id(value) in kept or (
+                isinstance(value, list) and value and id(value[0]) in kept
+            ):
+                continue
+            if isinstance(value, ast.Expr):
+                new_value = self.reduce(value)
+                if new_value is not value:
+                    setattr(node, attr, new_value)
+            elif isinstance(value, list):
+                for i, item in enumerate(value):
+                    if isinstance(item, ast.Expr):
+                        value[i] = self.reduce(item)
+
+    def reduce(self, expr):
+        """Return the reduced expression of `expr`, or `expr` itself."""
+        key = id(expr)
+        if key in self.memo:
+            return self.memo[key][1]
+        new_expr = expr
+        if isinstance(expr, (ast.Mul, ast.Div, ast.FloorDiv, ast.Mod)):
+            dtype = self.tinf.infer(expr)
+            if isinstance(dtype, (Int, UInt)):
+                new_expr = self.reduce_binary(expr, dtype)
+        # the expression is kept alive so that its id is not reused
+        self.memo[key] = (expr, new_expr)
+        return new_expr
+
+    def reduce_binary(self, expr, dtype):
+        loc = expr.loc
+        x, k = expr.lhs, _log2(expr.rhs)
+        if k is None and isinstance(expr, ast.Mul):
+            x, k = expr.rhs, _log2(expr.lhs)
+        signed = not isinstance(dtype, UInt)
+        # the constant must be positive in the type of the operation
+        if k is None or k >= dtype.bits - int(signed):
+            return expr
+        if str(self.tinf.infer(x)) != str(dtype):
+            x = ast.CastOp(x, dtype, loc)
+        if isinstance(expr, ast.Mul):
+            self.reduced["mul"] += 1
+            return ast.LeftShiftOp(x, ast.ConstantOp(k, dtype, loc), loc)
+        if isinstance(expr, ast.FloorDiv) or (
+            isinstance(expr, ast.Div) and (not signed or self.non_negative(x))
+        ):
+            self.reduced["div"] += 1
+            return ast.RightShiftOp(x, ast.ConstantOp(k, dtype, loc), loc)
+        if isinstance(expr, ast.Mod) and (not signed or self.non_negative(x)):
+            self.reduced["mod"] += 1
+            return ast.And(x, ast.ConstantOp((1 << k) - 1, dtype, loc), loc)
+        return expr
+
+    def interval(self, expr):
+        """The interval of the values of an affine expression, or None if
+        it is not known.
+        """
+        intervals = {}
+
+        def operands(node):
+            if isinstance(node, ast.CastOp):
+                return (node.expr,)
+            if isinstance(node, _AFFINE_OPS):
+                return (node.lhs, node.rhs)
+            return ()
+
+        def post(node):
+            intervals[id(node)] = self.node_interval(node, intervals)
+
+        ast.walk(expr, operands, post=post)
+        return intervals[id(expr)]
+
+    def node_interval(self, node, intervals):
+        if isinstance(node, ast.ConstantOp):
+            value = node.value
+            return (value, value) if isinstance(value, int) else None
+        dtype = self.tinf.infer_result(node)
+        if isinstance(node, ast.IterVar):
+            return self.bounds.get(id(node), type_range(Index()))
+        if isinstance(node, ast.CastOp):
+            inner = intervals[id(node.expr)]
+            if inner is not None and fits(inner, dtype):
+                return inner
+        elif isinstance(node, (ast.Add, ast.Sub, ast.Mul)):
+            lhs, rhs = intervals[id(node.lhs)], intervals[id(node.rhs)]
+            if lhs is not None and rhs is not None:
+                if isinstance(node, ast.Add):
+                    interval = lhs[0] + rhs[0], lhs[1] + rhs[1]
+                elif isinstance(node, ast.Sub):
+                    interval = lhs[0] - rhs[1], lhs[1] - rhs[0]
+                else:
+                    corners = [a * b for a in lhs for b in rhs]
+                    interval = min(corners), max(corners)
+                if fits(interval, dtype):
+                    return interval
+        return type_range(dtype)
+
+    def keeps_value(self, cast):
+        """Whether a cast keeps the value of its operand."""
+        interval = self.interval(cast.expr)
+        return interval is not None and fits(interval, cast.dtype)
+
+    def non_negative(self, expr):
+        """Whether a signed integer expression is known to be non-negative."""
+        if isinstance(expr, ast.CastOp):
+            src_type, dst_type = self.tinf.infer(expr.expr), expr.dtype
+            if isinstance(src_type, UInt) and src_type.bits < dst_type.bits:
+                return True
+        if not _affine(expr):
+            return False
+        symbols = {}
+        casts = []
+
+        def pre(node):
+            if isinstance(node, ast.IterVar):
+                symbols[node.name] = self.bounds.get(id(node), (-1,))[0] >= 0
+            elif isinstance(node, ast.CastOp):
+                casts.append(node)
+            return True
+
+        ast.walk(expr, _children, pre=pre)
+        if not all(symbols.values()):
+            return False
+        # simplify drops the casts, which must not wrap around
+        if not all(self.keeps_value(cast) for cast in casts):
+            return False
+        try:
+            value = ast.simplify(expr)
+        # pylint: disable=broad-exception-caught
+        except Exception:
+            return False
+        if isinstance(value, int):
+            return value >= 0
+        value = sp.sympify(value)
+        value = value.subs(
+            {
+                symbol: sp.Symbol(symbol.name, integer=True, nonnegative=True)
+                for symbol in value.free_symbols
+                if symbol.name in symbols
+            }
+        )
+        return bool(value.is_nonnegative)
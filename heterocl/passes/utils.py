@@ -0,0 +1,78 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Helpers shared by the AST passes that rewrite expressions in place."""
+
+from ..ast import ast
+
+# the attributes holding the expressions evaluated by each statement
+STATEMENTS = (
+    (ast.StoreOp, ("index", "value")),
+    (ast.SetBitOp, ("index", "value")),
+    (ast.SetSliceOp, ("start", "end", "value")),
+    (ast.IfOp, ("cond",)),
+    (ast.PrintOp, ("args",)),
+)
+
+
+def lookup(table, op):
+    """The attributes of the first class of a (class, attributes) table
+    that `op` is an instance of, or None.
+    """
+    for cls, attrs in table:
+        if isinstance(op, cls):
+            return attrs
+    return None
+
+
+def expr_children(expr):
+    """The operands of an expression, for walking expression trees."""
+    # iteration variables refer to their loop, and tensors to their users
+    if isinstance(expr, (ast.IterVar, ast.AllocOp, ast.ConstantOp, ast.ReduceOp)):
+        return ()
+    return [
+        child
+        for child in ast.node_children(expr)
+        if isinstance(child, ast.Expr) and not isinstance(child, ast.AllocOp)
+    ]
+
+
+def operand_attrs(expr):
+    """The attributes of an expression holding its operands."""
+    if not expr_children(expr):
+        return []
+    attrs = []
+    for attr, value in ast.node_attrs(expr):
+        if attr in ("uses", "tensor"):
+            continue
+        if isinstance(value, ast.Expr) or (
+            isinstance(value, list) and any(isinstance(v, ast.Expr) for v in value)
+        ):
+            attrs.append(attr)
+    return attrs
+
+
+class Insertions:
+    """Statements to insert before other statements of their body.
+
+    A pass collects them while it visits the bodies, and splices them in
+    once the visit is done, so that no body changes while it is visited.
+    """
+
+    def __init__(self):
+        # id(body) -> (body, {id(anchor): [statements inserted before]})
+        self.bodies = {}
+
+    def add(self, body, anchor, ops):
+        """Insert statements before `anchor`, after the ones added before."""
+        entry = self.bodies.setdefault(id(body), (body, {}))
+        entry[1].setdefault(id(anchor), []).extend(ops)
+
+    def splice(self):
+        """Insert the statements into their bodies."""
+        for body, anchors in self.bodies.values():
+            new_body = []
+            for op in body:
+                new_body.extend(anchors.get(id(op), ()))
+                new_body.append(op)
+            body[:] = new_body
+        self.bodies.clear()
@@ -128,6 +128,12 @@ class Schedule:
         # Dataflow Graph
         self._dfg = None
 
+        # the pass manager that lowered the AST, with its records
+        self._pass_manager = None
+
+        # bytes saved by sharing the constant globals of identical tables
+        self._dedup_const_bytes = 0
+
         # Used by Stages to refer to the current schedule
         Schedule._CurrentSchedule = self
         Schedule._TopFunction = func
@@ -168,6 +174,14 @@ class Schedule:
     def DataflowGraph(self):
         return self._dfg
 
+    @property
+    def pass_manager(self):
+        return self._pass_manager
+
+    @property
+    def dedup_const_bytes(self):
+        return self._dedup_const_bytes
+
     def set_lowered(self):
         self.lowered = True
 
@@ -530,12 +544,7 @@ class _CreateStagesFromAST:
         self.visit(top_func)
 
     def visit(self, op):
-        self.create_stage(op)
-        if hasattr(op, "body") and op.body is not None:
-            # pylint: disable=redefined-argument-from-local
-            for op in op.body:
-                # recursively visit the body
-                self.visit(op)
+        ast.walk(op, ast.body_ops, pre=self.create_stage)
 
     def create_stage(self, op):
         if isinstance(op, ast.ComputeOp):
@@ -584,15 +593,12 @@ class _CreateStagesFromAST:
             setattr(top_func, op.tag, stage)
 
         # create handles
-        nested_for_loops = [op]
-
-        def get_nested_for_loops(op):
-            for body_op in op.body:
-                if isinstance(body_op, ast.ForOp):
-                    nested_for_loops.append(body_op)
-                    get_nested_for_loops(body_op)
-
-        get_nested_for_loops(op)
+        nested_for_loops = []
+        ast.walk(
+            op,
+            lambda loop: [x for x in loop.body if isinstance(x, ast.ForOp)],
+            pre=nested_for_loops.append,
+        )
         stage_hdl = ast.OpHandle(op.tag, op.loc)
         stage.stage_handle = stage_hdl
         for loop in nested_for_loops:
@@ -602,6 +608,14 @@ class _CreateStagesFromAST:
 
 
 class _CreateDFGFromAST:
+    """Create the dataflow graph of the stages of a function.
+
+    A stage depends on the tensors its loads and stores refer to, which
+    are found in the use-def index of the tensors, see UseList.staged,
+    rather than by walking the expressions of the stages. The stages
+    that were not traced by compute_body fall back to their input tensors.
+    """
+
     def __init__(self, _ast):
         self._ast = _ast
         self.dfg = DataflowGraph(name=_ast.top_func.name, inputs=_ast.top_func.args)
@@ -609,25 +623,44 @@ class _CreateDFGFromAST:
     def apply(self):
         """Pass entry point"""
         top_func = self._ast.top_func
-        self.visit(top_func, self.create_edge)
-
-    def visit(self, op, callback, *args, **kwargs):
-        callback(op, *args, **kwargs)
-        if hasattr(op, "body") and op.body is not None:
-            # pylint: disable=redefined-argument-from-local
-            for op in op.body:
-                self.visit(op, callback, *args, **kwargs)
+        stages = []
+        # id(tensor) -> tensor, for the tensors the stages may refer to
+        tensors = {id(t): t for t in top_func.args}
+
+        def pre(op):
+            if isinstance(op, ast.ComputeOp):
+                stages.append(op)
+                for t in [op.tensor, op.aux_tensor] + op.input_tensors:
+                    if isinstance(t, ast.AllocOp):
+                        tensors.setdefault(id(t), t)
+            elif isinstance(op, ast.AllocOp):
+                tensors.setdefault(id(op), op)
+
+        ast.walk(top_func, ast.body_ops, pre=pre)
+        # id(stage) -> {id(tensor): tensor referred to by the stage}
+        inputs = {id(op): {} for op in stages}
+        traced = set()
+        for tensor in tensors.values():
+            for user, stage in tensor.uses.staged():
+                if stage is None or id(stage) not in inputs:
+                    continue
+                traced.add(id(stage))
+                # the stage itself, or the store of its result
+                if isinstance(user, ast.ComputeOp) or (
+                    isinstance(user, ast.StoreOp) and tensor is stage.tensor
+                ):
+                    continue
+                inputs[id(stage)].setdefault(id(tensor), tensor)
+        for op in stages:
+            if id(op) in traced:
+                self.create_edges(op, inputs[id(op)].values())
+            else:
+                self.create_edges(op, op.input_tensors)
 
-    def create_edge(self, op):
-        if isinstance(op, ast.ComputeOp):
-            if op.kind == "compute":
-                for t in op.input_tensors:
-                    self.dfg.add_edge(t, op.tensor)
-                    # print("add edge", t, op.tensor)
-            else:  # update, mutate
-                for t in op.input_tensors:
-                    self.dfg.add_edge(t, op.aux_tensor, stateful=True)
-                    # print("add edge", t, op.aux_tensor)
-        elif isinstance(op, ast.ForOp):
-            # raise HCLNotImplementedError("ForOp is not supported in DFG")
-            pass
+    def create_edges(self, op, input_tensors):
+        if op.kind == "compute":
+            for t in input_tensors:
+                self.dfg.add_edge(t, op.tensor)
+        else:  # update, mutate
+            for t in input_tensors:
+                self.dfg.add_edge(t, op.aux_tensor, stateful=True)
@@ -0,0 +1,292 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Save a traced schedule and load it back without re-running Python.
+
+The AST of the schedule, including the schedule primitives applied to it,
+its dataflow graph and its stages are stored in a compressed pickle.
+Every AST node is written once in a flat table and referred to by its
+index, so the sharing between nodes is preserved and arbitrarily deep
+ASTs do not hit the recursion limit.
+
+Python callables cannot be stored. The `fcompute` of a tensor computed
+by a single store, which is what `simplify` evaluates to fold scalars and
+indices, is replaced by the traced expression of the store; the other
+callables and the MLIR objects are dropped and loaded as None. A single
+node, e.g., a function built in a worker process, is serialized the same
+way by `dumps_op`.
+
+Like pickle, only load data from a trusted source.
+"""
+
+import hashlib
+import io
+import pickle
+import types
+import zlib
+
+from hcl_mlir.exceptions import APIError, HCLValueError
+
+from .ast import ast
+from .dfg import DFGNode
+from .schedule import Schedule, Stage
+
+_MAGIC = "heterocl-schedule"
+_VERSION = 1
+
+# objects stored in the node table
+_TABLE_TYPES = (ast.Operation, ast.Expr, ast.AST, DFGNode)
+# attributes recomputed when a node is loaded
+_SKIPPED_ATTRS = ("uses", "_type_cache", "_canonical_cache")
+_CALLABLE_TYPES = (
+    types.FunctionType,
+    types.MethodType,
+    types.BuiltinFunctionType,
+)
+
+
+class TracedCompute:
+    """Stand-in for the `fcompute` of a loaded tensor.
+
+    Calling it substitutes the indices for the iteration variables in a
+    copy of the expression stored by the compute op.
+
+    Parameters
+    ----------
+    iter_vars : list of IterVar
+        the iteration variables of the compute op
+    value : Expr
+        the value stored at the iteration variables
+    """
+
+    def __init__(self, iter_vars, value):
+        self.iter_vars = iter_vars
+        self.value = value
+
+    def __call__(self, *index):
+        memo = {
+            id(iter_var): ast.immediate_to_constant(idx, iter_var.loc)
+            for iter_var, idx in zip(self.iter_vars, index)
+        }
+        return ast.clone(self.value, memo, copy_tensors=False)
+
+
+def _dropped():
+    return None
+
+
+def _traced_computes(top_func):
+    """Map the id of each fcompute to its traced replacement, if any."""
+    traced = {}
+
+    def visit(op):
+        if not isinstance(op, ast.ComputeOp) or op.fcompute is None:
+            return
+        body = op.body
+        if (
+            len(body) == 1
+            and isinstance(body[0], ast.StoreOp)
+            and all(idx is iv for idx, iv in zip(body[0].index, op.iter_vars))
+        ):
+            traced[id(op.fcompute)] = TracedCompute(op.iter_vars, body[0].value)
+
+    ast.walk(top_func, ast.body_ops, pre=visit)
+    return traced
+
+
+class _Pickler(pickle.Pickler):
+    def __init__(self, file, traced):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.traced = traced
+        # nodes in the order they are referred to
+        self.table = []
+        self.index = {}
+
+    def persistent_id(self, obj):
+        if not isinstance(obj, _TABLE_TYPES):
+            return None
+        idx = self.index.get(id(obj))
+        if idx is None:
+            idx = self.index[id(obj)] = len(self.table)
+            self.table.append(obj)
+        return idx, type(obj)
+
+    def reducer_override(self, obj):
+        if obj is _dropped:
+            # pickled by reference
+            return NotImplemented
+        if isinstance(obj, _CALLABLE_TYPES):
+            traced = self.traced.get(id(obj))
+            if traced is not None:
+                return TracedCompute, (traced.iter_vars, traced.value)
+            return _dropped, ()
+        if type(obj).__module__.split(".")[0] in {"hcl_mlir", "mlir"}:
+            return _dropped, ()
+        return NotImplemented
+
+
+class _Unpickler(pickle.Unpickler):
+    def __init__(self, file):
+        super().__init__(file)
+        self.table = []
+
+    def persistent_load(self, pid):
+        idx, cls = pid
+        if idx == len(self.table):
+            # the state of the node is loaded after the payload
+            self.table.append(object.__new__(cls))
+        return self.table[idx]
+
+
+def _node_state(node):
+    if isinstance(node, (ast.Operation, ast.Expr)):
+        return [
+            (attr, value)
+            for attr, value in ast.node_attrs(node)
+            if attr not in _SKIPPED_ATTRS
+        ]
+    return node.__dict__
+
+
+def _restore_node(node, state):
+    if isinstance(node, (ast.Operation, ast.Expr)):
+        if isinstance(node, ast.Expr):
+            object.__setattr__(node, "_type_cache", None)
+            object.__setattr__(node, "_canonical_cache", None)
+        if isinstance(node, ast.AllocOp):
+            object.__setattr__(node, "uses", ast.UseList())
+        for attr, value in state:
+            # setting `tensor` registers the node as a use of the tensor
+            setattr(node, attr, value)
+    else:
+        node.__dict__.update(state)
+
+
+def _dump(payload, traced):
+    buf = io.BytesIO()
+    pickler = _Pickler(buf, traced)
+    pickler.dump((_MAGIC, _VERSION))
+    pickler.dump(payload)
+    # dumping a state may add nodes to the table
+    i = 0
+    while i < len(pickler.table):
+        pickler.dump(_node_state(pickler.table[i]))
+        i += 1
+    return zlib.compress(buf.getvalue())
+
+
+def _load(data):
+    try:
+        buf = io.BytesIO(zlib.decompress(data))
+    except zlib.error as exc:
+        raise HCLValueError("Not a serialized HeteroCL schedule") from exc
+    unpickler = _Unpickler(buf)
+    if unpickler.load() != (_MAGIC, _VERSION):
+        raise HCLValueError(f"Not a serialized HeteroCL schedule of version {_VERSION}")
+    payload = unpickler.load()
+    i = 0
+    while i < len(unpickler.table):
+        _restore_node(unpickler.table[i], unpickler.load())
+        i += 1
+    return payload
+
+
+def dumps(schedule):
+    """Serialize a schedule that has not been lowered yet.
+
+    Parameters
+    ----------
+    schedule : Schedule
+        the schedule to serialize
+
+    Returns
+    -------
+    bytes
+        the serialized schedule
+    """
+    if schedule.is_lowered():
+        raise APIError("Cannot serialize a schedule that has been lowered")
+    top_func = schedule.ast.top_func
+    ops = set()
+    ast.walk(top_func, ast.body_ops, pre=lambda op: ops.add(id(op)))
+    stages = [
+        (tensor, stage) for tensor, stage in Stage._mapping if id(stage._ast_op) in ops
+    ]
+    payload = {
+        "name": schedule.name,
+        "ast": schedule.ast,
+        "dfg": schedule.DataflowGraph,
+        "stages": stages,
+    }
+    return _dump(payload, _traced_computes(top_func))
+
+
+def loads(data):
+    """Load a schedule serialized by `dumps`.
+
+    The loaded schedule becomes the current schedule, and its stages can
+    be looked up and scheduled further. The stages of the other schedules
+    are kept, except those named like a loaded stage.
+
+    Parameters
+    ----------
+    data : bytes
+        the serialized schedule
+
+    Returns
+    -------
+    Schedule
+        the loaded schedule
+    """
+    payload = _load(data)
+    _ast = payload["ast"]
+    schedule = Schedule(payload["name"], _ast.top_func.args)
+    schedule._ast = _ast
+    schedule._dfg = payload["dfg"]
+    stages = payload["stages"]
+    names = {op.name for op, _ in stages}
+    Stage._mapping[:] = [
+        (op, stage) for op, stage in Stage._mapping if op.name not in names
+    ]
+    Stage._mapping.extend(stages)
+    return schedule
+
+
+def dumps_op(op):
+    """Serialize an AST node and the nodes it refers to, e.g., a function
+    to build in another process. The callables are dropped.
+
+    Parameters
+    ----------
+    op : Operation or Expr
+        the node to serialize
+
+    Returns
+    -------
+    bytes
+        the serialized node
+    """
+    return _dump({"op": op}, {})
+
+
+def loads_op(data):
+    """Load a node serialized by `dumps_op`."""
+    return _load(data)["op"]
+
+
+def save(schedule, path):
+    """Serialize a schedule to a file."""
+    with open(path, "wb") as f:
+        f.write(dumps(schedule))
+
+
+def load(path):
+    """Load a schedule from a file written by `save`."""
+    with open(path, "rb") as f:
+        return loads(f.read())
+
+
+def fingerprint(schedule):
+    """A hex digest identifying the traced program and its schedule,
+    usable as a build cache key.
+    """
+    return hashlib.sha256(dumps(schedule)).hexdigest()
@@ -3,6 +3,7 @@
 """Define HeteroCL data types"""
 # pylint: disable=no-name-in-module
 
+import itertools
 import numbers
 import types as python_types
 from collections import OrderedDict
@@ -120,6 +121,9 @@ class Struct(Type):
         return "Struct(" + str(self.dtype_dict) + ")"
 
     def __getattr__(self, key):
+        if key.startswith("__"):
+            # e.g., __setstate__ looked up by copy and pickle
+            raise AttributeError(key)
         try:
             return self.dtype_dict[key]
         except KeyError as exc:
@@ -324,6 +328,15 @@ class TypeRule:
                     )
                 # add the rule to the dictionary
                 self.inf_rules[itype] = inf_rule
+        # a lookup table keyed on the exact input type classes,
+        # which has every ordering of the input types if commutative
+        self._lookup = {}
+        for itype, inf_rule in self.inf_rules.items():
+            if commutative:
+                for perm in itertools.permutations(itype):
+                    self._lookup.setdefault(perm, inf_rule)
+            else:
+                self._lookup[itype] = inf_rule
 
     def __call__(self, *args):
         """Call the inference rule with the given input types.
@@ -340,18 +353,16 @@ class TypeRule:
         Type
             The inferred output type
         """
-        if self.commutative:
-            itype_classes = sort_type_classes([type(t) for t in args])
-        else:
-            itype_classes = [type(t) for t in args]
-        itype_classes = tuple(itype_classes)
-        if itype_classes not in self.inf_rules:
+        rule = self._lookup.get(tuple(type(t) for t in args))
+        if rule is None:
+            if self.commutative:
+                itype_classes = tuple(sort_type_classes([type(t) for t in args]))
+            else:
+                itype_classes = tuple(type(t) for t in args)
             raise APIError(
                 f"Typing rule is not defined with input types {itype_classes}"
             )
-        rule = self.inf_rules[itype_classes]
-        res_type = rule(*args)
-        return res_type
+        return rule(*args)
 
     # def __repr__(self):
     # TODO: make type rule printable
@@ -5,7 +5,6 @@
 import gc
 import inspect
 import sys
-import os
 import numpy as np
 
 import hcl_mlir
@@ -13,6 +12,7 @@ from hcl_mlir.dialects import hcl as hcl_d
 from hcl_mlir.ir import IntegerType, F16Type, F32Type, F64Type
 from hcl_mlir.exceptions import DTypeError
 
+from . import config
 from .config import init_dtype
 from .types import Fixed, Float, Int, Type, UFixed, UInt, Struct, Index, dtype_to_str
 
@@ -125,9 +125,21 @@ def remove_moved_attr(module):
         _visit_op(func_op)
 
 
+# the location of the operations traced with config.src_loc disabled
+_UNKNOWN_SRC_LOC = ("unknown", 0)
+
+
 def get_src_loc(frame=0):
+    """Return the (file, line number) of the traced operation.
+
+    The file is returned as the code object of the caller, and its name is
+    only resolved when the ast.Location built from it is read, e.g., when
+    the IR is emitted or an error is reported.
+    """
+    if not config.src_loc:
+        return _UNKNOWN_SRC_LOC
     fr = sys._getframe(frame + 1)  # +1 to ignore this function call
-    return (os.path.basename(fr.f_code.co_filename), fr.f_lineno)
+    return (fr.f_code, fr.f_lineno)
 
 
 def make_const_tensor(val, dtype):
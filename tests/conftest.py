@@ -3,6 +3,8 @@
 
 import pytest
 
+from heterocl.passes.pass_manager import PassManager
+
 
 def pytest_addoption(parser):
     parser.addoption("--vhls", action="store", default=False)
@@ -11,3 +13,17 @@ def pytest_addoption(parser):
 @pytest.fixture
 def vhls(request):
     return request.config.getoption("--vhls")
+
+
+@pytest.fixture
+def run_pass():
+    """Run a single pass on the AST of a schedule, and return the top
+    function and the statistics of the pass.
+    """
+
+    def run(s, pass_cls):
+        pm = PassManager()
+        pm.add_pass(pass_cls)
+        return pm.run(s.ast).top_func, pm.records[-1]["stats"]
+
+    return run
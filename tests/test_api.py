@@ -4,6 +4,8 @@
 import heterocl as hcl
 import numpy as np
 import pytest
+from hcl_mlir.exceptions import APIError
+from heterocl import config
 
 
 def test_schedule_no_return():
@@ -251,3 +253,40 @@ def test_str_fmt_asarray():
     assert np.array_equal(ret_C, golden_C)
     assert np.array_equal(ret_D, golden_D)
     assert np.array_equal(ret_E, golden_E)
+
+
+def test_src_loc():
+    def kernel(A):
+        return hcl.compute(A.shape, lambda x: A[x] + 1, "B")
+
+    hcl.init()
+    A = hcl.placeholder((10,), "A")
+    s = hcl.create_schedule([A], kernel)
+    # placeholders record the location of their caller
+    assert A.loc.filename == "test_api.py" and A.loc.lineno > 0
+    loc = s.ast.top_func.body[0].loc
+    assert loc.filename.endswith(".py") and loc.lineno > 0
+
+    hcl.init(src_loc=False)
+    A = hcl.placeholder((10,), "A")
+    s = hcl.create_schedule([A], kernel)
+    loc = s.ast.top_func.body[0].loc
+    assert loc.filename == "unknown" and loc.lineno == 0
+    assert A.loc.filename == "unknown"
+    hcl.init()
+
+
+def test_init_passes():
+    hcl.init(passes={"cse": True}, reduction_width=4)
+    assert config.cse and config.reduction_width == 4
+    # the passes left out are reset
+    hcl.init(passes={"licm": True})
+    assert config.licm and not config.cse
+    assert config.reduction_width == 1
+    with pytest.raises(APIError):
+        hcl.init(passes={"cse": True, "unroll": True})
+    # the parameters of the passes are not switches
+    with pytest.raises(APIError):
+        hcl.init(passes={"reduction_width": 4})
+    hcl.init()
+    assert not config.licm
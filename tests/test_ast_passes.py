@@ -3,6 +3,10 @@
 
 import heterocl as hcl
 import numpy as np
+from heterocl.ast import ast
+from heterocl.ast.build_cleaner import ASTCleaner
+from heterocl.passes.pass_manager import Pass, PassManager
+from heterocl.passes.cse import CSE
 
 
 def test_nested_if_else():
@@ -142,3 +146,372 @@ def test_nested_if_elif_else():
             f(hcl_x, hcl_y, hcl_z)
             golden = x_v * 10 + y_v
             assert hcl_z.asnumpy()[0] == golden
+
+
+def test_cse():
+    def build(cse):
+        hcl.init(passes={"cse": cse})
+        A = hcl.placeholder((10, 10), "A")
+
+        def kernel(A):
+            return hcl.compute(
+                A.shape,
+                lambda x, y: A[x, y] * A[x, y] + A[x, y] * A[x, y] + (x + 1) * (x + 1),
+                "B",
+            )
+
+        s = hcl.create_schedule([A], kernel)
+        return s, hcl.build(s)
+
+    np_A = np.random.randint(0, 10, size=(10, 10))
+    golden = 2 * np_A * np_A + (np.arange(10).reshape(10, 1) + 1) ** 2
+    n_muls = []
+    for cse in [False, True]:
+        s, f = build(cse)
+        hcl_A = hcl.asarray(np_A)
+        hcl_B = hcl.asarray(np.zeros((10, 10)))
+        f(hcl_A, hcl_B)
+        assert np.array_equal(hcl_B.asnumpy(), golden)
+        n_muls.append(str(s.module).count("arith.muli"))
+    assert n_muls[1] < n_muls[0]
+    hcl.init()
+
+
+def test_cse_deep_chain():
+    hcl.init()
+    depth = 3000
+    A = hcl.placeholder((10, 10), "A")
+
+    def kernel(A):
+        def expr(x, y):
+            e = A[x, y]
+            for _ in range(depth):
+                e = hcl.cast(hcl.Int(32), e + x * 2)
+            return e + e
+
+        return hcl.compute(A.shape, expr, "B")
+
+    s = hcl.create_schedule([A], kernel)
+    pm = PassManager()
+    pm.add_pass(CSE)
+    pm.run(s.ast)
+    assert pm.records[-1]["stats"]["eliminated"] == depth
+
+
+def test_deep_ast_traversal():
+    hcl.init()
+    depth = 100000
+    loc = ast.Location("test", 0)
+    A = ast.AllocOp("A", (1,), hcl.Float(32), loc)
+    expr = ast.LoadOp(A, [0], loc)
+    for _ in range(depth):
+        expr = ast.Add(expr, ast.ConstantOp(1.0, hcl.Float(32), loc), loc)
+    # drop the types memoized while tracing
+    ast.TypeInference.epoch += 1
+    assert isinstance(ast.TypeInference().infer(expr), hcl.Float)
+    expr.result = 0
+    ASTCleaner().visit(expr)
+    assert expr.result is None
+    B = ast.AllocOp("B", (1,), hcl.Float(32), loc)
+    ast.replace_all_uses_with(expr, A, B)
+    leaf = expr
+    while isinstance(leaf, ast.Add):
+        leaf = leaf.lhs
+    assert leaf.tensor is B
+
+    root = op = ast.IfOp(True, loc)
+    root.level = 0
+    for _ in range(depth):
+        op.body.append(ast.IfOp(True, loc))
+        op = op.body[0]
+    Pass("test").update_level(root)
+    assert op.level == depth
+
+
+def test_tensor_uses():
+    hcl.init()
+    A = hcl.placeholder((10,), "A")
+
+    def kernel(A):
+        B = hcl.compute(A.shape, lambda x: A[x] + A[x], "B")
+        with hcl.for_(0, 10) as i:
+            B[i] = B[i] * 2
+        return B
+
+    s = hcl.create_schedule([A], kernel)
+    B = kernel.B
+    assert [type(use) for use in A.uses] == [ast.LoadOp, ast.LoadOp]
+    assert sum(isinstance(use, ast.StoreOp) for use in B.uses) == 2
+    C = ast.AllocOp("C", B.shape, B.dtype, B.loc)
+    ast.replace_all_uses_with(s.ast.top_func, B, C)
+    assert not B.uses
+    assert sum(isinstance(use, (ast.LoadOp, ast.StoreOp)) for use in C.uses) == 3
+    assert s.ast.top_func.return_tensors[0] is C
+    f = hcl.build(s)
+    hcl_A = hcl.asarray(np.arange(10))
+    hcl_C = hcl.asarray(np.zeros(10))
+    f(hcl_A, hcl_C)
+    assert np.array_equal(hcl_C.asnumpy(), np.arange(10) * 4)
+
+
+def test_tensor_uses_discarded():
+    hcl.init()
+    A = hcl.placeholder((10,), "A")
+
+    def kernel(A):
+        B = hcl.compute((10,), lambda x: x + 1, "B")
+        C = hcl.compute((10,), lambda x: B[x] * 2, "C")
+        for _ in range(100):
+            # built but never inserted into the program
+            _ = A[0] + 1
+        # simplify loads B from the fcompute of C
+        assert ast.simplify(C[3]) == 8
+        return hcl.compute((10,), lambda x: A[x] + C[x], "D")
+
+    hcl.create_schedule([A], kernel)
+    assert [type(use) for use in A.uses] == [ast.LoadOp]
+    for tensor in (kernel.B, kernel.C):
+        assert sum(isinstance(use, ast.LoadOp) for use in tensor.uses) == 1
+
+
+def test_tensor_uses_removed():
+    hcl.init()
+    A = hcl.placeholder((10,), "A")
+    loads = [A[i] for i in range(1000)]
+    assert len(A.uses) == 1000
+    for load in loads[::2]:
+        A.uses.remove(load)
+    assert len(A.uses) == 500
+    assert all(a is b for a, b in zip(A.uses, loads[1::2]))
+    del loads
+    # the freed loads leave the list
+    assert len(A.uses) == 0
+
+
+def test_dataflow_graph():
+    hcl.init()
+    A = hcl.placeholder((10,), "A")
+    B = hcl.placeholder((10,), "B")
+
+    def kernel(A, B):
+        C = hcl.compute(A.shape, lambda x: A[x] + 1, "C")
+        # B is captured by the fcompute of D, but never loaded
+        D = hcl.compute(A.shape, lambda x: C[x] * 2 if B is not None else 0, "D")
+
+        def double(x):
+            D[x] = D[x] * 2
+
+        hcl.mutate(A.shape, double, "E")
+        return D
+
+    s = hcl.create_schedule([A, B], kernel)
+    nodes = s.DataflowGraph.node_map
+
+    def parents(tensor):
+        return [node.tensor for node in nodes[tensor.name].parents]
+
+    C, D, E = kernel.C, kernel.D, kernel.E._ast_op.aux_tensor
+    assert len(parents(C)) == 1 and parents(C)[0] is A
+    assert len(parents(D)) == 1 and parents(D)[0] is C
+    assert len(parents(E)) == 1 and parents(E)[0] is D
+    assert not nodes[B.name].children
+
+
+def test_clone():
+    hcl.init()
+    A = hcl.placeholder((10,), "A")
+
+    def kernel(A):
+        B = hcl.compute(A.shape, lambda x: A[x] + A[x], "B")
+        with hcl.for_(0, 10) as i:
+            B[i] = B[i] * 2
+        return B
+
+    s = hcl.create_schedule([A], kernel)
+    top_func = s.ast.top_func
+    n_uses = len(A.uses)
+    new_func = ast.clone(top_func)
+    compute, loop = new_func.body
+    assert compute is not top_func.body[0]
+    new_A = new_func.args[0]
+    assert new_A is not A and len(new_A.uses) == n_uses == len(A.uses)
+    # the loads of a tensor share the copied tensor
+    assert all(use.tensor is new_A for use in new_A.uses)
+    assert new_func.return_tensors[0] is compute.tensor
+    assert loop.body[0].tensor is compute.tensor
+    assert loop.body[0].index[0] is loop.iter_var
+
+    # tensors can be kept or substituted
+    C = ast.AllocOp("C", (10,), A.dtype, A.loc)
+    new_func = ast.clone(top_func, {id(kernel.B): C}, copy_tensors=False)
+    assert new_func.args[0] is A and len(A.uses) == 2 * n_uses
+    assert new_func.body[1].body[0].tensor is C
+    assert top_func.body[1].body[0].tensor is kernel.B
+
+
+def test_parallel_build():
+    def kernel(A):
+        B = hcl.compute(A.shape, lambda x: A[x] + 1, "B")
+        C = hcl.compute(A.shape, lambda x: B[x] * 2, "C")
+        D = hcl.compute(A.shape, lambda x: (C[x] >> 1) + B[x], "D")
+        return D
+
+    modules = []
+    for jobs in [1, 2]:
+        hcl.init(build_jobs=jobs)
+        A = hcl.placeholder((10,), "A")
+        s = hcl.create_schedule([A], kernel)
+        modules.append(str(hcl.lower(s)))
+    hcl.init()
+    assert modules[0] == modules[1]
+
+
+def test_pass_manager():
+    import json
+    from heterocl.passes.pass_manager import PassManager
+    from heterocl.passes.nest_if import NestElseIf
+    from heterocl.passes.expand_func import ExpandFunc
+
+    hcl.init()
+    A = hcl.placeholder((10,), "A")
+
+    def kernel(A):
+        B = hcl.compute(A.shape, lambda x: A[x] + 1, "B")
+        return hcl.compute(A.shape, lambda x: B[x] * 2, "C")
+
+    s = hcl.create_schedule([A], kernel)
+    pm = PassManager()
+    pm.add_pass(NestElseIf)
+    pm.add_pass(ExpandFunc)
+    _ast = pm.run(s.ast)
+    # promote_func is required by expand_func
+    records = pm.records
+    assert [r["pass"] for r in records] == [
+        "nest_else_if",
+        "promote_func",
+        "expand_func",
+    ]
+    assert not records[0]["changed"] and records[2]["changed"]
+    assert records[2]["nodes_after"] > records[2]["nodes_before"]
+    assert len(_ast.region) == 3
+
+    # the passes are still valid on their own output
+    _ast = pm.run(_ast)
+    assert all(r["skipped"] for r in pm.records[3:])
+    assert len(_ast.region) == 3
+    assert "expand_func" in pm.table()
+    assert json.loads(pm.to_json())[2]["changed"]
+
+    class Rename(Pass):
+        def __init__(self):
+            super().__init__("rename")
+
+        def apply(self, _ast):
+            _ast.top_func.body[0].name = "renamed"
+            return _ast
+
+    # a pass invalidating the others makes them run again
+    pm = PassManager()
+    pm.add_pass(NestElseIf)
+    pm.add_pass(Rename)
+    pm.add_pass(NestElseIf)
+    pm.run(_ast)
+    assert [r["skipped"] for r in pm.records] == [False, False, False]
+    assert pm.records[1]["changed"]
+
+    class Check(Pass):
+        requires = (NestElseIf,)
+        invalidates = ()
+
+        def __init__(self):
+            super().__init__("check")
+
+        def apply(self, _ast):
+            return _ast
+
+    # without instrumentation, the passes are assumed to change the AST
+    pm = PassManager(instrument=False)
+    pm.add_pass(Check)
+    pm.add_pass(Check)
+    pm.add_pass(Rename)
+    pm.add_pass(Check)
+    pm.run(_ast)
+    assert [r["pass"] for r in pm.records] == [
+        "nest_else_if",
+        "check",
+        "check",
+        "rename",
+        "nest_else_if",
+        "check",
+    ]
+    assert [r["skipped"] for r in pm.records] == [False] * 2 + [True] + [False] * 3
+    assert "changed" not in pm.records[0]
+
+
+def test_legalize():
+    import sys
+    from heterocl.passes.pass_manager import PassManager
+    from heterocl.passes.nest_if import NestElseIf
+    from heterocl.passes.promote_func import PromoteFunc
+    from heterocl.passes.expand_func import ExpandFunc
+    from heterocl.passes.legalize import LegalizeAndExpand
+
+    depth = 100
+
+    def kernel(A):
+        B = hcl.compute(A.shape, lambda i: A[i] + 1, "B")
+
+        def nest(i, k):
+            with hcl.if_(A[i] == k):
+                B[i] = k
+            with hcl.elif_(A[i] == -k):
+                B[i] = -k
+            with hcl.else_():
+                if k < depth:
+                    nest(i, k + 1)
+                else:
+                    B[i] = 0
+
+        def body(A, B):
+            with hcl.for_(0, 10, name="i") as i:
+                nest(i, 0)
+
+        hcl.mutate((1,), lambda _: body(A, B), "M")
+        return B
+
+    asts = []
+    for passes in [(NestElseIf, PromoteFunc, ExpandFunc), (LegalizeAndExpand,)]:
+        hcl.init()
+        A = hcl.placeholder((10,), "A")
+        s = hcl.create_schedule([A], kernel)
+        pm = PassManager()
+        for pass_class in passes:
+            pm.add_pass(pass_class)
+        limit = sys.getrecursionlimit()
+        # the passes do not recurse on the depth of the AST
+        sys.setrecursionlimit(200)
+        try:
+            asts.append(pm.run(s.ast))
+        finally:
+            sys.setrecursionlimit(limit)
+        # the fused pass makes the separate ones valid
+        pm.add_pass(ExpandFunc)
+        pm.run(asts[-1])
+        assert pm.records[-1]["skipped"]
+
+    levels = []
+    for _ast in asts:
+        names = [op.name for op in _ast.region]
+        assert names == ["top", "sub_func1", "sub_func0"]
+        loop = _ast.region[1].body[0].body[0]
+        # each elif is nested in the else branch of the previous if, one
+        # level deeper
+        if_op, chain = loop.body[0], []
+        while if_op is not None:
+            chain.append(if_op.level)
+            assert if_op.body[0].level == if_op.level + 1
+            nested = [op for op in if_op.else_body if isinstance(op, ast.IfOp)]
+            if_op = nested[0] if nested else None
+        assert chain == list(range(loop.level + 1, loop.level + 2 * depth + 3))
+        levels.append(chain)
+    assert levels[0] == levels[1]
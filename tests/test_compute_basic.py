@@ -484,6 +484,56 @@ def test_const_tensor_fixed():
         test_kernel(hcl.UFixed(bit, 4), (20, 20, 3))
 
 
+def test_const_tensor_dedup():
+    hcl.init(hcl.Int(16))
+    np_A = np.random.randint(-15, 15, size=(8, 8), dtype=np.int32)
+    np_B = np_A + 1
+
+    def kernel():
+        cp1 = hcl.const_tensor(np_A)
+        cp2 = hcl.const_tensor(np_A.tolist())
+        cp3 = hcl.const_tensor(np_B)
+        return hcl.compute(np_A.shape, lambda *x: cp1[x] + cp2[x] + cp3[x])
+
+    s = hcl.create_schedule([], kernel)
+    f = hcl.build(s)
+    from hcl_mlir.dialects import memref as memref_d
+
+    globals_ = [
+        op for op in s.module.body.operations if isinstance(op, memref_d.GlobalOp)
+    ]
+    # identical tables share one global
+    assert len(globals_) == 2
+    # cp2 reuses the 8x8 16-bit table of cp1
+    assert s.dedup_const_bytes == np_A.size * 2
+
+    hcl_O = hcl.asarray(np.zeros(np_A.shape))
+    f(hcl_O)
+    assert np.array_equal(hcl_O.asnumpy(), np_A * 2 + np_B)
+
+
+def test_encode_int_tensor():
+    from heterocl.ast.ir_builder import encode_int_tensor
+
+    values = np.random.randint(-(2**15), 2**15, size=(6, 10))
+    for array in [
+        values,
+        values.astype(">i4")[:, ::3],
+        values.astype(np.int16).T,
+        values.astype(np.uint16),
+    ]:
+        for bits in [7, 16, 20, 48]:
+            n_bytes = (bits + 7) // 8
+            encoded = encode_int_tensor(array, bits)
+            assert encoded.shape == array.shape
+            # the least significant bytes, sign-extended, in little-endian
+            expected = b"".join(
+                (int(v) % 2**64).to_bytes(8, "little")[:n_bytes]
+                for v in array.astype(np.int64).reshape(-1)
+            )
+            assert np.ascontiguousarray(encoded).tobytes() == expected
+
+
 def test_double_mutate_call():
     hcl.init()
 
@@ -555,3 +605,42 @@ def test_expr_as_ub():
 
     s = hcl.create_schedule([], kernel)
     hcl.lower(s)
+
+
+def test_compute_closure_reused():
+    hcl.init()
+    A = hcl.placeholder((10,), "A")
+    B = hcl.placeholder((10,), "B")
+
+    def kernel(A, B):
+        # the same fcompute code captures a different tensor each time
+        for src in [A, B, A]:
+            C = hcl.compute((10,), lambda x: src[x] + 1)
+        hcl.compute((10,), lambda *x: C[x])
+
+    s = hcl.create_schedule([A, B], kernel)
+    computes = s.ast.top_func.body
+    assert [op.input_tensors[0].name for op in computes[:3]] == ["A", "B", "A"]
+    assert len(computes[3].iter_vars) == 1
+
+
+def test_compute_affine_index():
+    hcl.init()
+    A = hcl.placeholder((10, 12), "A")
+
+    def kernel(A):
+        # the dims of each map are numbered in the order they appear
+        return hcl.compute(
+            (12, 8), lambda y, x: A[x, y] + A[x + 1, y] + A[x + 2, y] + A[x, y], "B"
+        )
+
+    s = hcl.create_schedule([A], kernel)
+    ir = str(hcl.lower(s))
+    assert "affine.load" in ir and "memref.load" not in ir
+    f = hcl.build(s)
+    np_A = np.random.randint(0, 10, size=(10, 12))
+    hcl_A = hcl.asarray(np_A)
+    hcl_B = hcl.asarray(np.zeros((12, 8)))
+    f(hcl_A, hcl_B)
+    np_B = (2 * np_A[0:8] + np_A[1:9] + np_A[2:10]).T
+    assert np.array_equal(hcl_B.asnumpy(), np_B)
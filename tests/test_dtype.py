@@ -736,5 +736,24 @@ def test_fp_to_index_cast():
     assert np_B.asnumpy().tolist() == [0b01100101]
 
 
+def test_type_inference_cache():
+    from heterocl.ast import ast
+
+    hcl.init()
+    loc = ast.Location("test", 0)
+    A = ast.AllocOp("A", (64,), hcl.Int(8), loc)
+    expr = ast.LoadOp(A, [0], loc)
+    for i in range(1, 64):
+        expr = expr + ast.LoadOp(A, [i], loc)
+    tinf_engine = ast.TypeInference()
+    assert tinf_engine.infer(expr) == hcl.Int(8 + 63)
+    # re-typing a tensor invalidates the memoized types
+    A.dtype = hcl.Int(16)
+    assert tinf_engine.infer(expr) == hcl.Int(16 + 63)
+    # so does replacing an operand
+    expr.rhs = ast.ConstantOp(1, hcl.Int(100), loc)
+    assert tinf_engine.infer(expr) == hcl.Int(101)
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
@@ -0,0 +1,80 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import heterocl as hcl
+import numpy as np
+from heterocl.ast import ast
+from heterocl.passes.bitwidth import MinimizeBitwidth
+
+
+def _kernel(A, B):
+    C = hcl.compute((16,), lambda i: A[i] * 3 + B[i] * 5 + 7 + i, "C")
+    D = hcl.compute((16,), lambda i: A[i] - B[i], "D")
+    E = hcl.compute((16,), lambda i: hcl.cast(hcl.Int(16), A[i]) - 300, "E")
+    return C, D, E
+
+
+def _schedule():
+    A = hcl.placeholder((16,), "A", hcl.UInt(8))
+    B = hcl.placeholder((16,), "B", hcl.UInt(8))
+    return hcl.create_schedule([A, B], _kernel)
+
+
+def _type(expr):
+    return str(ast.TypeInference().infer(expr))
+
+
+def test_bitwidth_stats(run_pass):
+    hcl.init()
+    _, stats = run_pass(_schedule(), MinimizeBitwidth)
+    assert set(stats["bits_saved"]) == {"C", "E"}
+    assert stats["bits_saved"]["C"] > 100
+
+
+def test_bitwidth_sum_of_products(run_pass):
+    hcl.init()
+    top_func, _ = run_pass(_schedule(), MinimizeBitwidth)
+    # the constants and the iteration variable are narrowed, and the sum of
+    # the products is computed in at most 12 bits
+    value = top_func.body[0].body[0].value
+    assert _type(value) == str(hcl.UInt(12))
+    assert isinstance(value.rhs, ast.CastOp) and value.rhs.dtype.bits == 4
+    products = value.lhs.expr.lhs.expr
+    assert [_type(p) for p in (products.lhs, products.rhs)] == [
+        str(hcl.UInt(10)),
+        str(hcl.UInt(11)),
+    ]
+
+
+def test_bitwidth_wraparound(run_pass):
+    hcl.init()
+    top_func, _ = run_pass(_schedule(), MinimizeBitwidth)
+    # the unsigned difference wraps around, and is left as it is
+    assert _type(top_func.body[1].body[0].value) == str(hcl.UInt(9))
+
+
+def test_bitwidth_signed(run_pass):
+    hcl.init()
+    top_func, _ = run_pass(_schedule(), MinimizeBitwidth)
+    # the negative difference is computed in a signed type
+    assert _type(top_func.body[2].body[0].value) == str(hcl.Int(11))
+
+
+def test_bitwidth_build():
+    hcl.init(passes={"minimize_bitwidth": True})
+    f = hcl.build(_schedule())
+    np_A = np.random.randint(0, 256, size=(16,))
+    np_B = np.random.randint(0, 256, size=(16,))
+    hcl_C = hcl.asarray(np.zeros((16,)))
+    hcl_D = hcl.asarray(np.zeros((16,)))
+    hcl_E = hcl.asarray(np.zeros((16,)))
+    f(
+        hcl.asarray(np_A, hcl.UInt(8)),
+        hcl.asarray(np_B, hcl.UInt(8)),
+        hcl_C,
+        hcl_D,
+        hcl_E,
+    )
+    assert np.array_equal(hcl_C.asnumpy(), np_A * 3 + np_B * 5 + 7 + np.arange(16))
+    assert np.array_equal(hcl_D.asnumpy(), (np_A - np_B) % 512)
+    assert np.array_equal(hcl_E.asnumpy(), np_A - 300)
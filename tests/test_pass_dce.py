@@ -0,0 +1,58 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import heterocl as hcl
+import numpy as np
+from heterocl.ast import ast
+from heterocl.passes.dce import DeadCodeElimination
+
+
+def _kernel(A):
+    one = hcl.cast(hcl.Int(32), 1)
+    B = hcl.compute(A.shape, lambda x: A[x] + one * 3, "B")
+    D = hcl.compute(A.shape, lambda x: A[x] * 5, "D")
+    E = hcl.compute(A.shape, lambda x: D[x] + 1, "E")
+    F = hcl.compute(A.shape, lambda x: A[x] - 1, "F")
+    with hcl.for_(0, 10, tag="G") as i:
+        with hcl.if_(one == 0):
+            B[i] = E[i]
+        with hcl.else_():
+            B[i] = B[i] + 1
+    with hcl.for_(5, 5, tag="H") as i:
+        B[i] = F[i]
+    return hcl.compute(A.shape, lambda x: B[x] * 2, "C")
+
+
+def _schedule():
+    A = hcl.placeholder((10,), "A")
+    s = hcl.create_schedule([A], _kernel)
+    # stages referred to by a schedule primitive are kept
+    s[_kernel.F].split(_kernel.F.axis[0], factor=2)
+    return s
+
+
+def test_dce(run_pass):
+    hcl.init()
+    top_func, stats = run_pass(_schedule(), DeadCodeElimination)
+    stages = [op for op in top_func.body if isinstance(op, (ast.ComputeOp, ast.ForOp))]
+    assert [op.name for op in stages] == ["B", "F", "loop_0", "C"]
+    # one * 3 is folded
+    value = stages[0].body[0].value
+    assert isinstance(value.rhs, ast.ConstantOp) and value.rhs.value == 3
+    # the branch that is never taken is removed
+    loop = stages[2]
+    assert len(loop.body) == 1 and isinstance(loop.body[0], ast.StoreOp)
+    assert stats["eliminated"] == ["D", "E"]
+    assert stats["nodes_after"] < stats["nodes_before"]
+    # the loads of the eliminated stages are no longer uses of A
+    assert len(top_func.args[0].uses) == 2
+
+
+def test_dce_build():
+    hcl.init(passes={"dce": True})
+    f = hcl.build(_schedule())
+    np_A = np.random.randint(-10, 10, size=(10,))
+    hcl_C = hcl.asarray(np.zeros((10,)))
+    f(hcl.asarray(np_A), hcl_C)
+    assert np.array_equal(hcl_C.asnumpy(), (np_A + 4) * 2)
+    hcl.init()
@@ -0,0 +1,67 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import heterocl as hcl
+import numpy as np
+from heterocl.passes.fusion import FuseElementwise
+
+
+def _kernel(A, b):
+    B = hcl.compute(A.shape, lambda i, j: A[i, j] + b[j], "bias")
+    E = hcl.compute(A.shape, lambda i, j: hcl.exp(B[i, j]), "exp")
+    Q = hcl.compute(A.shape, lambda i, j: E[i, j] * 2, "scale")
+    # loaded in a reduction, not fused
+    T = hcl.compute(A.shape, lambda i, j: hcl.tanh(A[i, j]), "T")
+    k = hcl.reduce_axis(0, 2)
+    P = hcl.compute((4, 4), lambda i, j: hcl.max(T[i, j * 2 + k], axis=k), "P")
+    return hcl.compute((4, 4), lambda i, j: P[i, j] + Q[i, j + 4], "S")
+
+
+def _schedule():
+    A = hcl.placeholder((4, 8), "A")
+    b = hcl.placeholder((8,), "b")
+    return hcl.create_schedule([A, b], _kernel)
+
+
+def test_fuse_chain(run_pass):
+    hcl.init(hcl.Float())
+    top_func, stats = run_pass(_schedule(), FuseElementwise)
+    assert [op.name for op in top_func.body] == ["T", "P", "S"]
+    assert stats["fused"] == [("bias", "exp"), ("exp", "scale"), ("scale", "S")]
+    assert stats["bytes_saved"] == 3 * 4 * 8 * 4
+
+
+def test_fuse_replaces_loads(run_pass):
+    hcl.init(hcl.Float())
+    top_func, _ = run_pass(_schedule(), FuseElementwise)
+    # the loads of the fused stages are replaced by their values
+    assert [t.name for t in top_func.body[-1].input_tensors] == ["P", "A", "b"]
+    assert len(top_func.args[1].uses) == 1
+
+
+def test_fuse_shared_producer(run_pass):
+    hcl.init()
+    A = hcl.placeholder((8,), "A")
+
+    def kernel(A):
+        B = hcl.compute((8,), lambda i: A[i] + 1, "B")
+        C = hcl.compute((8,), lambda i: B[i] * 2, "C")
+        return hcl.compute((8,), lambda i: B[i] + C[i], "D")
+
+    top_func, stats = run_pass(hcl.create_schedule([A], kernel), FuseElementwise)
+    # B has two consumers, and is computed once
+    assert [op.name for op in top_func.body] == ["B", "D"]
+    assert stats["fused"] == [("C", "D")]
+
+
+def test_fuse_build():
+    hcl.init(hcl.Float(), passes={"fuse": True})
+    f = hcl.build(_schedule())
+    np_A = np.random.rand(4, 8)
+    np_b = np.random.rand(8)
+    hcl_S = hcl.asarray(np.zeros((4, 4)))
+    f(hcl.asarray(np_A), hcl.asarray(np_b), hcl_S)
+    np_T = np.tanh(np_A)
+    np_P = np.maximum(np_T[:, 0::2], np_T[:, 1::2])
+    np_Q = np.exp(np_A + np_b) * 2
+    assert np.allclose(hcl_S.asnumpy(), np_P + np_Q[:, 4:], atol=1e-5)
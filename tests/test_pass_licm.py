@@ -0,0 +1,84 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import heterocl as hcl
+import numpy as np
+from heterocl.ast import ast
+from heterocl.passes.licm import LoopInvariantCodeMotion
+
+
+def _kernel(A, n, W):
+    def update(A, n):
+        with hcl.for_(0, 10, name="i") as i:
+            with hcl.for_(0, 10, name="j") as j:
+                A[i, j] = A[i, j] + n[0] * 3 + (n[1] + i) * 2 + j
+
+    hcl.mutate((1,), lambda _: update(A, n), "M")
+    k = hcl.reduce_axis(0, 3)
+    return hcl.compute(
+        (10, 8),
+        lambda x, y: hcl.sum(A[x, y + k] * W[k] * (n[0] + x), axis=k),
+        "C",
+    )
+
+
+def _schedule():
+    A = hcl.placeholder((10, 10), "A")
+    n = hcl.placeholder((2,), "n")
+    W = hcl.placeholder((3,), "W")
+    return hcl.create_schedule([A, n, W], _kernel)
+
+
+def test_licm_loops(run_pass):
+    hcl.init()
+    top_func, stats = run_pass(_schedule(), LoopInvariantCodeMotion)
+    assert stats == {"hoisted": 3}
+    mutate, _ = top_func.body
+    # n[0] * 3 is computed before the outer loop, (n[1] + i) * 2 before
+    # the inner one
+    alloc, _, store, loop_i = mutate.body
+    assert isinstance(alloc, ast.AllocOp) and isinstance(loop_i, ast.ForOp)
+    assert isinstance(store.value, ast.Mul) and store.value.rhs.value == 3
+    assert isinstance(loop_i.body[0], ast.StoreOp)
+    assert isinstance(loop_i.body[1], ast.ForOp)
+
+
+def test_licm_reduction(run_pass):
+    hcl.init()
+    top_func, _ = run_pass(_schedule(), LoopInvariantCodeMotion)
+    _, compute = top_func.body
+    # n[0] + x is computed once per output, not per reduction step
+    assert isinstance(compute.body[1], ast.StoreOp)
+    assert isinstance(compute.body[1].value, ast.Add)
+
+
+def test_licm_variant(run_pass):
+    hcl.init()
+    A = hcl.placeholder((10,), "A")
+
+    def kernel(A):
+        return hcl.compute((10,), lambda i: A[i] * 2 + i, "B")
+
+    top_func, stats = run_pass(
+        hcl.create_schedule([A], kernel), LoopInvariantCodeMotion
+    )
+    # every operation depends on the iteration variable
+    assert stats == {"hoisted": 0}
+    assert [op.name for op in top_func.body] == ["B"]
+
+
+def test_licm_build():
+    hcl.init(passes={"licm": True})
+    f = hcl.build(_schedule())
+    np_A = np.random.randint(0, 10, size=(10, 10))
+    np_n = np.array([2, 5])
+    np_W = np.random.randint(0, 10, size=(3,))
+    hcl_A = hcl.asarray(np_A)
+    hcl_C = hcl.asarray(np.zeros((10, 8)))
+    f(hcl_A, hcl.asarray(np_n), hcl.asarray(np_W), hcl_C)
+    i, j = np.indices((10, 10))
+    np_A = np_A + np_n[0] * 3 + (np_n[1] + i) * 2 + j
+    np_C = sum(np_A[:, k : k + 8] * np_W[k] for k in range(3))
+    np_C = np_C * (np_n[0] + np.arange(10))[:, None]
+    assert np.array_equal(hcl_A.asnumpy(), np_A)
+    assert np.array_equal(hcl_C.asnumpy(), np_C)
@@ -0,0 +1,101 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import heterocl as hcl
+import numpy as np
+from heterocl.ast import ast
+from heterocl.passes.reassociate import ReassociateReductions
+
+
+def _kernel(A, F):
+    k = hcl.reduce_axis(0, 10, "k")
+    B = hcl.compute((4,), lambda i: hcl.sum(A[i, k], axis=k, where=A[i, k] > 0), "B")
+    m = hcl.reduce_axis(0, 10, "m")
+    C = hcl.compute((4,), lambda i: hcl.max(A[i, m], axis=m), "C")
+    f = hcl.reduce_axis(0, 10, "f")
+    D = hcl.compute(
+        (4,),
+        lambda i: hcl.sum(F[i, f], axis=f, dtype=hcl.Float()),
+        "D",
+        hcl.Float(),
+    )
+    x = hcl.reduce_axis(0, 4, "x")
+    y = hcl.reduce_axis(1, 9, "y")
+    E = hcl.compute((1,), lambda _: hcl.sum(A[x, y], axis=[x, y]), "E")
+    return B, C, D, E
+
+
+def _schedule():
+    A = hcl.placeholder((4, 10), "A")
+    F = hcl.placeholder((4, 10), "F", hcl.Float())
+    return hcl.create_schedule([A, F], _kernel)
+
+
+def test_reassociate_partial_results(run_pass):
+    hcl.init(reduction_width=4)
+    top_func, _ = run_pass(_schedule(), ReassociateReductions)
+    B = top_func.body[0]
+    # four partial sums, and a loop over the split axis
+    allocs = [op for op in B.body if isinstance(op, ast.AllocOp)]
+    loops = [op for op in B.body if isinstance(op, ast.ForOp)]
+    assert len(allocs) == 4 and len(loops) == 1
+    assert loops[0].name == "k_outer" and loops[0].high == 3
+    # the last two lanes are past the end of the axis in the last iteration
+    lanes = loops[0].body
+    guarded = [isinstance(lane.body[0], ast.IfOp) for lane in lanes]
+    assert guarded == [False, False, True, True]
+
+
+def test_reassociate_tree(run_pass):
+    hcl.init(reduction_width=4)
+    top_func, _ = run_pass(_schedule(), ReassociateReductions)
+    # combined by a tree of depth two
+    tree = top_func.body[0].body[-1].value
+    assert isinstance(tree.expr, ast.Add)
+    assert all(isinstance(op.expr, ast.Add) for op in (tree.expr.lhs, tree.expr.rhs))
+
+
+def test_reassociate_outer_axes(run_pass):
+    hcl.init(reduction_width=4)
+    top_func, _ = run_pass(_schedule(), ReassociateReductions)
+    # the outer reduction axis is a loop around the split one
+    E = top_func.body[3]
+    outer = [op for op in E.body if isinstance(op, ast.ForOp)][0]
+    assert outer.iter_var.name == "x" and outer.body[0].name == "y_outer"
+
+
+def test_reassociate_floats(run_pass):
+    hcl.init(reduction_width=4)
+    top_func, stats = run_pass(_schedule(), ReassociateReductions)
+    # the float sum is only reassociated with reassociate_floats
+    assert stats["reassociated"] == ["sum", "max", "sum_1"]
+    assert isinstance(top_func.body[2].body[0].value, ast.ReduceOp)
+
+    hcl.init(reduction_width=4, reassociate_floats=True)
+    _, stats = run_pass(_schedule(), ReassociateReductions)
+    assert len(stats["reassociated"]) == 4
+
+
+def test_reassociate_scheduled(run_pass):
+    hcl.init(reduction_width=4)
+    s = _schedule()
+    s[_kernel.B].split(_kernel.B.axis[0], factor=2)
+    _, stats = run_pass(s, ReassociateReductions)
+    # the stages referred to by a schedule primitive are left as they are
+    assert "sum" not in stats["reassociated"]
+
+
+def test_reassociate_build():
+    hcl.init(reduction_width=4)
+    f = hcl.build(_schedule())
+    np_A = np.random.randint(-10, 10, size=(4, 10))
+    np_F = np.random.rand(4, 10)
+    hcl_B = hcl.asarray(np.zeros((4,)))
+    hcl_C = hcl.asarray(np.zeros((4,)))
+    hcl_D = hcl.asarray(np.zeros((4,)), hcl.Float())
+    hcl_E = hcl.asarray(np.zeros((1,)))
+    f(hcl.asarray(np_A), hcl.asarray(np_F, hcl.Float()), hcl_B, hcl_C, hcl_D, hcl_E)
+    assert np.array_equal(hcl_B.asnumpy(), np.where(np_A > 0, np_A, 0).sum(axis=1))
+    assert np.array_equal(hcl_C.asnumpy(), np_A.max(axis=1))
+    assert np.allclose(hcl_D.asnumpy(), np_F.sum(axis=1), rtol=1e-5)
+    assert np.array_equal(hcl_E.asnumpy(), [np_A[:, 1:9].sum()])
@@ -0,0 +1,140 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import heterocl as hcl
+import numpy as np
+from heterocl.ast import ast
+from heterocl.passes.strength import StrengthReduction
+
+
+def _ops(op):
+    """The shifts, the masks, and the other multiplicative operations."""
+    shifts, masks, kept = [], [], []
+
+    def visit(node):
+        if isinstance(node, (ast.LeftShiftOp, ast.RightShiftOp)):
+            shifts.append(node)
+        elif isinstance(node, ast.And):
+            masks.append(node)
+        elif isinstance(node, (ast.Div, ast.Mod, ast.Mul)):
+            kept.append(node)
+        return not isinstance(node, ast.AllocOp)
+
+    ast.walk(op, ast.node_children, pre=visit)
+    return shifts, masks, kept
+
+
+def _kernel(A, U):
+    B = hcl.compute(
+        (16,),
+        lambda i: A[i] * 4
+        + A[i] / 8
+        + A[i] % 4
+        + U[i] % 16
+        + hcl.cast(hcl.Int(32), i + 3) / 2
+        + A[i // 2],
+        "B",
+    )
+    C = hcl.compute((4,), lambda i: A[i * 4], "C")
+    return B, C
+
+
+def _schedule():
+    A = hcl.placeholder((16,), "A")
+    U = hcl.placeholder((16,), "U", hcl.UInt(8))
+    return hcl.create_schedule([A, U], _kernel)
+
+
+def test_strength_reduction(run_pass):
+    hcl.init()
+    top_func, stats = run_pass(_schedule(), StrengthReduction)
+    assert stats == {"mul": 1, "div": 2, "mod": 1}
+    shifts, masks, kept = _ops(top_func.body[0].body[0])
+    # the signed division and remainder of A[i] may be negative, and the
+    # index of A[i // 2] is not affine
+    assert len(shifts) == 3 and len(masks) == 1
+    assert len(kept) == 2 and all(isinstance(k.lhs, ast.LoadOp) for k in kept)
+
+
+def test_strength_affine_index(run_pass):
+    hcl.init()
+    top_func, _ = run_pass(_schedule(), StrengthReduction)
+    # the affine index of C is left to the affine map
+    assert isinstance(top_func.body[1].body[0].value.index[0], ast.Mul)
+
+
+def test_strength_non_power_of_two(run_pass):
+    hcl.init()
+    U = hcl.placeholder((16,), "U", hcl.UInt(8))
+
+    def kernel(U):
+        return hcl.compute((16,), lambda i: U[i] * 3 + U[i] / 6 + U[i] % 5, "B")
+
+    top_func, stats = run_pass(hcl.create_schedule([U], kernel), StrengthReduction)
+    assert stats == {"mul": 0, "div": 0, "mod": 0}
+    shifts, masks, kept = _ops(top_func.body[0].body[0])
+    assert not shifts and not masks and len(kept) == 3
+
+
+def test_strength_wrapping_cast(run_pass):
+    hcl.init()
+
+    def kernel():
+        # i wraps around in Int(8) from 128 on, e.g., 129 is -127
+        B = hcl.compute(
+            (256,),
+            lambda i: hcl.cast(hcl.Int(8), i) / 4 + hcl.cast(hcl.Int(8), i) % 4,
+            "B",
+        )
+        # but not below 100
+        C = hcl.compute(
+            (100,),
+            lambda i: hcl.cast(hcl.Int(8), i) / 4 + hcl.cast(hcl.Int(8), i) % 4,
+            "C",
+        )
+        return B, C
+
+    top_func, stats = run_pass(hcl.create_schedule([], kernel), StrengthReduction)
+    assert stats == {"mul": 0, "div": 1, "mod": 1}
+    shifts, masks, kept = _ops(top_func.body[0].body[0])
+    assert not shifts and not masks and len(kept) == 2
+    shifts, masks, kept = _ops(top_func.body[1].body[0])
+    assert len(shifts) == 1 and len(masks) == 1 and not kept
+
+
+def test_strength_build():
+    hcl.init(passes={"strength_reduction": True})
+    f = hcl.build(_schedule())
+    np_A = np.random.randint(-100, 100, size=(16,))
+    np_U = np.random.randint(0, 256, size=(16,))
+    hcl_B = hcl.asarray(np.zeros((16,)))
+    hcl_C = hcl.asarray(np.zeros((4,)))
+    f(hcl.asarray(np_A), hcl.asarray(np_U, hcl.UInt(8)), hcl_B, hcl_C)
+    i = np.arange(16)
+    np_B = (
+        np_A * 4
+        + np.trunc(np_A / 8).astype(int)
+        + np.fmod(np_A, 4)
+        + np_U % 16
+        + (i + 3) // 2
+        + np_A[i // 2]
+    )
+    assert np.array_equal(hcl_B.asnumpy(), np_B)
+    assert np.array_equal(hcl_C.asnumpy(), np_A[::4])
+
+
+def test_strength_wrapping_cast_build():
+    hcl.init(passes={"strength_reduction": True})
+
+    def kernel():
+        return hcl.compute(
+            (256,),
+            lambda i: hcl.cast(hcl.Int(8), i) / 4 + hcl.cast(hcl.Int(8), i) % 4,
+            "B",
+        )
+
+    f = hcl.build(hcl.create_schedule([], kernel))
+    hcl_B = hcl.asarray(np.zeros((256,)))
+    f(hcl_B)
+    x = np.arange(256).astype(np.int8).astype(int)
+    assert np.array_equal(hcl_B.asnumpy(), np.trunc(x / 4).astype(int) + np.fmod(x, 4))
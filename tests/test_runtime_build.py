@@ -5,6 +5,7 @@ import heterocl as hcl
 import os
 import numpy as np
 import pytest
+from hcl_mlir.exceptions import APIError
 
 
 def test_debug_mode():
@@ -299,6 +300,68 @@ def test_project():
     assert os.path.isdir("gemm-s2.prj/out.prj")
 
 
+def test_llvm_stream():
+    hcl.init(hcl.Int(32))
+    A = hcl.placeholder((4, 8), "A")
+    B = hcl.placeholder((8,), "B")
+
+    def kernel(A, B):
+        return hcl.compute(A.shape, lambda x, y: A[x, y] + B[y], "C")
+
+    s = hcl.create_schedule([A, B], kernel)
+    f = hcl.build(s)
+
+    np_A = np.random.randint(0, 10, size=(10, 8))
+    np_B = np.random.randint(0, 10, size=(8,))
+    hcl_B = hcl.asarray(np_B)
+    for prefetch in [True, False]:
+        tiles = list(f.stream(np_A, hcl_B, prefetch=prefetch))
+        assert [tile.shape for tile in tiles] == [(4, 8), (4, 8), (2, 8)]
+        assert np.array_equal(np.concatenate(tiles), np_A + np_B)
+
+    blocks = (np_A[i : i + 4] for i in range(0, 10, 4))
+    tiles = list(f.stream(blocks, hcl_B))
+    assert np.array_equal(np.concatenate(tiles), np_A + np_B)
+
+    # every input of the kernel needs a source
+    with pytest.raises(APIError):
+        list(f.stream(np_A))
+
+
+def test_llvm_stream_untiled_output():
+    hcl.init(hcl.Int(32))
+    A = hcl.placeholder((4, 8), "A")
+
+    def kernel(A):
+        C = hcl.compute(A.shape, lambda x, y: A[x, y] + 1, "C")
+        # one value per column, whose extent happens to be the tile's
+        D = hcl.compute((4,), lambda y: A[0, y], "D")
+        return C, D
+
+    s = hcl.create_schedule([A], kernel)
+    f = hcl.build(s)
+
+    np_A = np.random.randint(0, 10, size=(10, 8))
+    tiles = list(f.stream(np_A, tiled_outputs=[0]))
+    assert [c.shape for c, _ in tiles] == [(4, 8), (4, 8), (2, 8)]
+    assert [d.shape for _, d in tiles] == [(4,), (4,), (4,)]
+    assert np.array_equal(np.concatenate([c for c, _ in tiles]), np_A + 1)
+    assert np.array_equal(tiles[-1][1], np_A[8, :4])
+
+    with pytest.raises(APIError):
+        list(f.stream(np_A, tiled_outputs=[2]))
+
+    def add(A, B):
+        return hcl.compute(A.shape, lambda x, y: A[x, y] + B[x, y], "C")
+
+    A = hcl.placeholder((4, 8), "A")
+    B = hcl.placeholder((4, 8), "B")
+    g = hcl.build(hcl.create_schedule([A, B], add))
+    # the blocks of a tile have the same extent
+    with pytest.raises(APIError):
+        list(g.stream(iter([np_A[:4], np_A[4:6]]), iter([np_A[:4], np_A[4:8]])))
+
+
 if __name__ == "__main__":
     test_debug_mode()
     test_vivado_hls()
@@ -307,3 +370,5 @@ if __name__ == "__main__":
     test_xilinx_sdsoc()
     test_intel_aocl()
     test_project()
+    test_llvm_stream()
+    test_llvm_stream_untiled_output()
@@ -0,0 +1,95 @@
+# Copyright HeteroCL authors. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import heterocl as hcl
+import numpy as np
+import pytest
+from heterocl.ast import ast
+from hcl_mlir.exceptions import HCLValueError
+
+
+def _schedule():
+    hcl.init()
+    A = hcl.placeholder((10, 10), "A")
+
+    def kernel(A):
+        n = hcl.scalar(4, "n")
+        B = hcl.compute(A.shape, lambda x, y: A[x, y] + n.v, "B")
+        C = hcl.compute(A.shape, lambda x, y: B[x, y] * 2, "C")
+        return C
+
+    s = hcl.create_schedule([A], kernel)
+    s[kernel.B].split(kernel.B.axis[0], factor=2)
+    return s
+
+
+def test_serialize_roundtrip():
+    s = _schedule()
+    text = str(s.ast)
+    data = hcl.serialize.dumps(s)
+    assert hcl.serialize.fingerprint(s) == hcl.serialize.fingerprint(s)
+
+    new_s = hcl.serialize.loads(data)
+    assert str(new_s.ast) == text
+    top_func = new_s.ast.top_func
+    A = top_func.args[0]
+    compute_b = top_func.body[1]
+    assert compute_b.name == "B"
+    # callables are replaced by the traced expressions, or dropped
+    assert isinstance(compute_b.fcompute, hcl.serialize.TracedCompute)
+    assert top_func.python_callable is None
+    # the use-def index is rebuilt
+    assert any(use is compute_b.body[0].value.lhs for use in A.uses)
+    assert all(use.tensor is A for use in A.uses)
+    # scalars can still be folded by simplify
+    assert ast.simplify(compute_b.body[0].value.rhs) == 4
+    # the loaded schedule can be scheduled further
+    C = top_func.return_tensors[0]
+    new_s[C].reorder(C.axis[1], C.axis[0])
+    assert isinstance(top_func.body[-1], ast.ReorderOp)
+    assert hcl.serialize.loads(data) is not new_s
+
+
+def test_serialize_op():
+    s = _schedule()
+    top_func = s.ast.top_func
+    new_func = hcl.serialize.loads_op(hcl.serialize.dumps_op(top_func))
+    assert new_func is not top_func
+    assert str(new_func) == str(top_func)
+    assert new_func.body[1].fcompute is None
+    A = new_func.args[0]
+    assert all(use.tensor is A for use in A.uses)
+
+
+def test_serialize_keeps_stages():
+    hcl.init()
+    A = hcl.placeholder((10,), "A")
+
+    def other(A):
+        return hcl.compute(A.shape, lambda x: A[x] + 1, "D")
+
+    data = hcl.serialize.dumps(hcl.create_schedule([A], other))
+    s = _schedule()
+    stage_b = hcl.Stage.lookup("B")
+    new_s = hcl.serialize.loads(data)
+    # the stages of the live schedule are still found
+    assert hcl.Stage.lookup("B") is stage_b
+    assert hcl.Stage.lookup("D")._ast_op is new_s.ast.top_func.body[0]
+    assert hcl.serialize.loads(hcl.serialize.dumps(s)) is not s
+    assert hcl.Stage.lookup("B") is not stage_b
+
+
+def test_serialize_build():
+    s = _schedule()
+    new_s = hcl.serialize.loads(hcl.serialize.dumps(s))
+    f = hcl.build(new_s)
+    np_A = np.random.randint(0, 10, size=(10, 10))
+    hcl_A = hcl.asarray(np_A)
+    hcl_C = hcl.asarray(np.zeros((10, 10)))
+    f(hcl_A, hcl_C)
+    assert np.array_equal(hcl_C.asnumpy(), (np_A + 4) * 2)
+
+
+def test_serialize_invalid():
+    with pytest.raises(HCLValueError):
+        hcl.serialize.loads(b"not a schedule")
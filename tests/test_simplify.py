@@ -364,3 +364,53 @@ def test_neg():
     np_B = hcl.asarray([0, 0])
     f(np_A, np_B)
     assert np_B.asnumpy().tolist() == [0b10101, 0b01110]
+
+
+def test_simplify_integer_affine():
+    from heterocl.ast import ast
+
+    hcl.init()
+    loc = ast.Location("test", 0)
+    x = ast.IterVar("x", None, loc)
+    y = ast.IterVar("y", None, loc)
+
+    def const(value):
+        return ast.ConstantOp(value, hcl.Int(32), loc)
+
+    assert ast.simplify(x * 4 + y - x * 4 - y + const(3)) == 3
+    assert ast.simplify(ast.LeftShiftOp(const(1), const(3), loc) + 1) == 9
+    assert ast.simplify((x * 8 + y * 8) // 8 - y) == ast.simplify(x + 0)
+    assert ast.simplify((x * 8) % 4 + const(-7) % 2) == 1
+    assert ast.simplify((x + 1) * (x - 1) - x * x) == -1
+    # non-affine floor division falls back to sympy
+    assert not ast.simplify((x * 3 + 1) // 2).is_constant()
+
+
+def test_simplify_memoized():
+    from heterocl.ast import ast
+
+    hcl.init()
+    loc = ast.Location("test", 0)
+    x = ast.IterVar("x", None, loc)
+    calls = []
+
+    def fcompute(i):
+        calls.append(i)
+        return i * 2
+
+    A = ast.AllocOp("A", (8,), hcl.Int(32), loc)
+    A.fcompute = fcompute
+    load = ast.LoadOp(A, [x], loc)
+    expr = load - x
+    assert ast.simplify(expr) == ast.simplify(x + 0)
+    # the polynomials are reused by the next simplifications
+    assert ast.simplify(expr + 1) == ast.simplify(x + 1)
+    assert len(calls) == 1
+    # re-assigning an operand invalidates them
+    expr.rhs = load
+    assert ast.simplify(expr) == 0
+    assert len(calls) == 2
+    # and so does replacing an index in place
+    load.index[0] = ast.ConstantOp(3, hcl.Index(), loc)
+    assert ast.simplify(load) == 6
+    assert len(calls) == 3